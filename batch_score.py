@@ -0,0 +1,414 @@
+"""
+Batch Churn Scoring
+Streams a customer file (CSV or Parquet) in fixed-size chunks, scores every
+chunk with the saved pipeline across a process pool and writes the results
+to a Parquet file. Only a bounded number of chunks is in memory at any time.
+
+With ``--explain`` (tree models) each row also gets the tree-path
+contribution of every model feature (``contrib_<feature>``, in the
+model's raw output units) and its ``top_driver``, the feature that raised
+its churn score the most.
+
+With ``--incremental`` the output is also the previous run's state: each
+row carries a hash of its model inputs, and only new or changed customers
+(by CustomerId) are rescored. A different model file or threshold
+invalidates every stored score. Contributions are kept if the previous table
+has them (``--explain``/``--no-explain`` overrides this).
+
+Usage:
+    python batch_score.py customers.csv churn_scores.parquet
+    python batch_score.py customers.parquet churn_scores.parquet --chunksize 200000 --workers 8
+    python batch_score.py customers.csv churn_scores.parquet --incremental
+    python batch_score.py customers.csv churn_scores.parquet --explain
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from churn_data import file_hash, iter_csv_typed
+from churn_features import (
+    FEATURE_INFO_PATH, CATEGORICAL_FEATURES, MODEL_FEATURES,
+    RAW_FEATURES, add_engineered_features, model_filename, risk_segment
+)
+from fast_scorer import CompiledScorer
+
+ID_COLUMNS = ["RowNumber", "CustomerId"]
+
+# Parquet schema metadata keys of a score table: the model fingerprint, and
+# whether the rows carry contributions (b"1"/b"0")
+SCORE_META_KEY = b"churn_model_fingerprint"
+SCORE_EXPLAIN_KEY = b"churn_scores_explained"
+
+# Per-process model state, set by _init_worker
+_MODEL = None
+_THRESHOLD = None
+_EXPLAIN = False
+_EXPLAINER = None
+
+
+def score_frame(model, df, threshold, explain=False, explainer=None):
+    """
+    Score a DataFrame of customers
+
+    Parameters:
+    -----------
+    model : trained pipeline or CompiledScorer
+        Pipeline exposing predict_proba on MODEL_FEATURES, or its compiled form
+    df : pd.DataFrame
+        Raw customer rows; EngagementScore/CLV_Proxy are added if missing
+    threshold : float
+        Probability threshold for will_churn
+    explain : bool
+        Add ``contrib_<feature>`` columns and ``top_driver`` (tree models)
+    explainer : CompiledScorer, optional
+        Computes the contributions (default: ``model``, compiled here if it
+        is a pipeline); pass one compiled up front when scoring many chunks
+
+    Returns:
+    --------
+    pd.DataFrame : churn_probability, will_churn and risk_segment per row
+    """
+    if 'EngagementScore' not in df.columns or 'CLV_Proxy' not in df.columns:
+        df = add_engineered_features(df.copy())
+
+    missing = [c for c in MODEL_FEATURES if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required feature: {missing[0]}")
+
+    if isinstance(model, CompiledScorer):
+        proba = model.predict_proba_frame(df)
+    else:
+        proba = model.predict_proba(df[MODEL_FEATURES])[:, 1]
+    scores = pd.DataFrame({
+        'churn_probability': proba,
+        'will_churn': proba >= threshold,
+        'risk_segment': risk_segment(proba),
+    }, index=df.index)
+    if explain:
+        if explainer is None:
+            explainer = model if isinstance(model, CompiledScorer) else CompiledScorer.from_pipeline(model)
+        _, contrib = explainer.explain_frame(df)
+        scores['top_driver'] = contrib.idxmax(axis=1)
+        scores = scores.join(contrib.add_prefix('contrib_'))
+    return scores
+
+
+def _init_worker(model_path, threshold, engine="compiled", explain=False):
+    """Load (and optionally compile) the model once per worker process"""
+    global _MODEL, _THRESHOLD, _EXPLAIN, _EXPLAINER
+    _MODEL = joblib.load(model_path)
+    clf = _MODEL.named_steps.get("clf") if hasattr(_MODEL, "named_steps") else None
+    # Parallelism comes from the pool; keep each worker single-threaded
+    if clf is not None and "n_jobs" in clf.get_params():
+        clf.set_params(n_jobs=1)
+    if engine == "compiled":
+        _MODEL = CompiledScorer.from_pipeline(_MODEL)
+    # Contributions always come from the compiled form; compile it once, not per chunk
+    _EXPLAINER = (_MODEL if isinstance(_MODEL, CompiledScorer) else CompiledScorer.from_pipeline(_MODEL)
+                  ) if explain else None
+    _THRESHOLD = threshold
+    _EXPLAIN = explain
+
+
+def score_with_ids(model, df, threshold, explain=False, explainer=None):
+    """``score_frame`` output with the id columns of ``df`` alongside"""
+    scores = score_frame(model, df, threshold, explain, explainer)
+    ids = df[[c for c in ID_COLUMNS if c in df.columns]]
+    return pd.concat([ids.reset_index(drop=True), scores.reset_index(drop=True)], axis=1)
+
+
+def _score_chunk(chunk):
+    """Score one chunk in a worker and keep the id columns alongside"""
+    return score_with_ids(_MODEL, chunk, _THRESHOLD, _EXPLAIN, _EXPLAINER)
+
+
+def row_hashes(df):
+    """
+    uint64 hash of each row's model inputs (NUMERIC_FEATURES + CATEGORICAL_FEATURES)
+
+    EngagementScore and CLV_Proxy are functions of the raw columns, so the
+    raw inputs are hashed. Numerics are hashed at the loader's float32
+    precision and categoricals as strings, so the hash does not depend on
+    how the file was parsed (int8 vs int64, float32 vs float64, category vs
+    object).
+    """
+    numeric = [c for c in RAW_FEATURES if c not in CATEGORICAL_FEATURES]
+    inputs = df[numeric].astype(np.float32)
+    for feature in CATEGORICAL_FEATURES:
+        inputs[feature] = df[feature].astype(str)
+    return pd.util.hash_pandas_object(inputs, index=False).to_numpy()
+
+
+def model_fingerprint(model_path, threshold):
+    """Identifies the model file content and threshold a score table came from"""
+    return f"{file_hash(model_path)}:{float(threshold)!r}"
+
+
+def write_score_table(scores, path, fingerprint, explain=False):
+    """Write ``scores`` to Parquet with the model fingerprint (and whether they are explained) in the schema metadata"""
+    path = Path(path)
+    table = pa.Table.from_pandas(scores, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           SCORE_META_KEY: fingerprint.encode(),
+                                           SCORE_EXPLAIN_KEY: b"1" if explain else b"0"})
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def read_score_table(path, fingerprint):
+    """
+    Previous scores at ``path`` if they came from the same model and threshold, else None
+
+    ``attrs['explained']`` tells whether the rows carry contributions.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    pf = pq.ParquetFile(path)
+    metadata = pf.schema_arrow.metadata or {}
+    if (metadata.get(SCORE_META_KEY) != fingerprint.encode() or
+            not {'CustomerId', 'feature_hash'} <= set(pf.schema_arrow.names)):
+        return None
+    previous = pf.read().to_pandas()
+    previous.attrs['explained'] = metadata.get(SCORE_EXPLAIN_KEY) == b"1"
+    return previous
+
+
+def iter_chunks(path, chunksize, extra_columns=()):
+    """Yield DataFrame chunks with only the columns needed for scoring (plus ``extra_columns``)"""
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        pf = pq.ParquetFile(path)
+        available = pf.schema_arrow.names
+        columns = [c for c in ID_COLUMNS + RAW_FEATURES + list(extra_columns) if c in available]
+        if pf.metadata.num_rows == 0:  # One empty chunk, so the output still gets its schema
+            yield pf.schema_arrow.empty_table().select(columns).to_pandas()
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from iter_csv_typed(path, chunksize, usecols=set(ID_COLUMNS + RAW_FEATURES + list(extra_columns)))
+
+
+def resolve_model(model_path=None, info_path=FEATURE_INFO_PATH, threshold=None):
+    """Return (model_path, threshold), defaulting to the saved best model"""
+    feature_info = joblib.load(info_path) if Path(info_path).exists() else {}
+    if model_path is None:
+        if 'best_model_name' not in feature_info:
+            raise FileNotFoundError(
+                f"No --model given and '{info_path}' does not name a best model"
+            )
+        model_path = model_filename(feature_info['best_model_name'])
+    if threshold is None:
+        threshold = feature_info.get('optimal_threshold', 0.5)
+    return Path(model_path), float(threshold)
+
+
+def score_file(input_path, output_path, model_path=None, info_path=FEATURE_INFO_PATH,
+               chunksize=100_000, workers=None, threshold=None, engine="compiled", explain=False):
+    """
+    Score ``input_path`` chunk by chunk and write the results to ``output_path``
+
+    At most ``2 * workers`` chunks are in flight, so memory stays bounded
+    regardless of the input size. Chunks are written in input order.
+    ``engine="compiled"`` scores with the numpy CompiledScorer (flat tree
+    arrays for RF/XGBoost); ``engine="pipeline"`` uses the sklearn pipeline.
+    An input without rows still gets an output table (empty, same columns).
+
+    Returns:
+    --------
+    dict : rows scored, chunks, elapsed seconds and rows per second
+    """
+    model_path, threshold = resolve_model(model_path, info_path, threshold)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    n_rows = n_chunks = 0
+    writer = None
+
+    def write(table_df):
+        nonlocal writer, n_rows, n_chunks
+        table = pa.Table.from_pandas(table_df, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema)
+        writer.write_table(table)
+        n_rows += len(table_df)
+        n_chunks += 1
+
+    try:
+        if workers == 1:
+            _init_worker(model_path, threshold, engine, explain)
+            for chunk in iter_chunks(input_path, chunksize):
+                write(_score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path, threshold, engine, explain)) as pool:
+                pending = deque()
+                for chunk in iter_chunks(input_path, chunksize):
+                    pending.append(pool.submit(_score_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': n_rows,
+        'chunks': n_chunks,
+        'seconds': elapsed,
+        'rows_per_second': n_rows / elapsed if elapsed > 0 else float('nan'),
+    }
+
+
+def score_file_incremental(input_path, output_path, model_path=None, info_path=FEATURE_INFO_PATH,
+                           chunksize=100_000, threshold=None, engine="compiled", explain=None):
+    """
+    Rescore only the customers in ``input_path`` that are new or whose model
+    inputs changed since the score table at ``output_path`` was written
+
+    Unchanged customers keep their stored scores; customers missing from the
+    input are dropped, so the table always mirrors the latest extract, id
+    columns (e.g. RowNumber) included. If the table was produced by a
+    different model file or threshold (or has no row hashes), every customer
+    is rescored.
+
+    ``explain=None`` keeps the previous table's layout: contributions are
+    computed if it has them. Asking for contributions the table lacks
+    rescores everyone; ``explain=False`` drops stored ones.
+
+    Returns:
+    --------
+    dict : rows, rescored (new + changed), new, changed, removed, reused,
+        full_rescore, explain and elapsed seconds
+
+    Raises:
+    -------
+    ValueError
+        If a CustomerId appears more than once in ``input_path``
+    """
+    model_path, threshold = resolve_model(model_path, info_path, threshold)
+    fingerprint = model_fingerprint(model_path, threshold)
+    start = time.perf_counter()
+
+    previous = read_score_table(output_path, fingerprint)
+    if explain is None:
+        explain = previous is not None and previous.attrs['explained']
+    elif previous is not None and previous.attrs['explained'] != explain:
+        # Stored contributions can be dropped, missing ones only computed by rescoring
+        previous = None if explain else previous.drop(
+            columns=[c for c in previous.columns if c == 'top_driver' or c.startswith('contrib_')])
+    if previous is None:
+        prev_index, prev_hashes = pd.Index([]), np.empty(0, dtype=np.uint64)
+    else:
+        # A table written by score_file may repeat a customer; the last row wins, as in the input
+        previous = previous.drop_duplicates('CustomerId', keep='last', ignore_index=True)
+        prev_index = pd.Index(previous['CustomerId'].to_numpy())
+        prev_hashes = previous['feature_hash'].to_numpy()
+    seen = np.zeros(len(prev_index), dtype=bool)
+
+    _init_worker(model_path, threshold, engine, explain)
+    parts = []
+    n_new = n_changed = 0
+    for chunk in iter_chunks(input_path, chunksize):
+        hashes = row_hashes(chunk)
+        pos = prev_index.get_indexer(chunk['CustomerId'].to_numpy())
+        known = pos >= 0
+        unchanged = known.copy()
+        unchanged[known] = prev_hashes[pos[known]] == hashes[known]
+        seen[pos[known]] = True
+        n_new += int((~known).sum())
+        n_changed += int((known & ~unchanged).sum())
+
+        # Scores are rescored or reused; the id columns always come from the current file
+        ids = chunk[[c for c in ID_COLUMNS if c in chunk.columns]].reset_index(drop=True)
+        pieces = []
+        todo = ~unchanged
+        if todo.any():
+            scored = score_frame(_MODEL, chunk[todo], _THRESHOLD, _EXPLAIN, _EXPLAINER).reset_index(drop=True)
+            scored.index = np.flatnonzero(todo)
+            pieces.append(scored)
+        if unchanged.any():
+            reused = previous.iloc[pos[unchanged]].drop(
+                columns=[c for c in ID_COLUMNS + ['feature_hash'] if c in previous.columns])
+            reused.index = np.flatnonzero(unchanged)
+            pieces.append(reused)
+        part = pd.concat([ids, pd.concat(pieces).sort_index()], axis=1)
+        part['feature_hash'] = hashes
+        parts.append(part)
+
+    scores = pd.concat(parts, ignore_index=True)
+    duplicated = scores['CustomerId'].duplicated(keep=False)
+    if duplicated.any():
+        examples = ", ".join(map(str, scores.loc[duplicated, 'CustomerId'].unique()[:5]))
+        raise ValueError(f"{int(duplicated.sum()):,} rows of '{input_path}' share a CustomerId "
+                         f"(e.g. {examples}); incremental scoring needs one row per customer")
+    write_score_table(scores, output_path, fingerprint, explain)
+    return {
+        'rows': len(scores),
+        'rescored': n_new + n_changed,
+        'new': n_new,
+        'changed': n_changed,
+        'removed': int((~seen).sum()),
+        'reused': len(scores) - n_new - n_changed,
+        'full_rescore': previous is None,
+        'explain': explain,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch churn scoring")
+    parser.add_argument("input", help="Customer file (.csv or .parquet)")
+    parser.add_argument("output", help="Output Parquet file")
+    parser.add_argument("--model", default=None,
+                        help="Saved pipeline (default: best model named in the feature info)")
+    parser.add_argument("--feature-info", default=FEATURE_INFO_PATH)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Override optimal_threshold from the feature info")
+    parser.add_argument("--engine", choices=["compiled", "pipeline"], default="compiled",
+                        help="Score with the compiled numpy scorer or the sklearn pipeline")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Rescore only new/changed customers (by CustomerId) in the existing output")
+    parser.add_argument("--explain", action=argparse.BooleanOptionalAction, default=None,
+                        help="Add per-feature tree-path contributions and the top churn driver (RF/XGBoost); "
+                             "with --incremental the default follows the existing output")
+    args = parser.parse_args()
+
+    if args.incremental:
+        stats = score_file_incremental(args.input, args.output, model_path=args.model,
+                                       info_path=args.feature_info, chunksize=args.chunksize,
+                                       threshold=args.threshold, engine=args.engine,
+                                       explain=args.explain)
+        mode = "full rescore (no matching previous table)" if stats['full_rescore'] else "incremental"
+        print(f"✓ {mode}: rescored {stats['rescored']:,} of {stats['rows']:,} customers "
+              f"({stats['new']:,} new, {stats['changed']:,} changed, {stats['removed']:,} removed) "
+              f"in {stats['seconds']:.1f}s" + (", with contributions" if stats['explain'] else ""))
+        print(f"✓ Results saved as '{args.output}'")
+        return
+
+    stats = score_file(args.input, args.output, model_path=args.model,
+                       info_path=args.feature_info, chunksize=args.chunksize,
+                       workers=args.workers, threshold=args.threshold,
+                       engine=args.engine, explain=bool(args.explain))
+    print(f"✓ Scored {stats['rows']:,} customers in {stats['chunks']} chunks "
+          f"({stats['seconds']:.1f}s, {stats['rows_per_second']:,.0f} rows/s)")
+    print(f"✓ Results saved as '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
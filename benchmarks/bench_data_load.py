@@ -0,0 +1,59 @@
+"""
+Benchmark: loading Churn_Modelling.csv
+Compares the default ``pd.read_csv`` with the typed parse and the
+content-hashed Parquet cache from churn_data.py (time and in-memory size).
+
+Usage:
+    python benchmarks/bench_data_load.py Churn_Modelling.csv
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from churn_data import load_customers, read_csv_typed  # noqa: E402
+
+
+def timed(fn, repeat):
+    """(best seconds, result of the last call)"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer table load benchmark")
+    parser.add_argument("csv", help="Churn_Modelling-shaped CSV")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        load_customers(args.csv, cache_dir=cache_dir)  # Warm the cache
+        cases = [
+            ("pd.read_csv (default)", lambda: pd.read_csv(args.csv)),
+            ("typed CSV parse", lambda: read_csv_typed(args.csv)),
+            ("Parquet cache", lambda: load_customers(args.csv, cache_dir=cache_dir)),
+        ]
+        rows = []
+        for name, fn in cases:
+            seconds, df = timed(fn, args.repeat)
+            rows.append((name, seconds, df.memory_usage(deep=True).sum() / 1e6))
+
+    base_s, base_mb = rows[0][1], rows[0][2]
+    print(f"{'Loader':<24} {'time (s)':>10} {'memory (MB)':>12} {'speedup':>9} {'mem cut':>9}")
+    print("-" * 68)
+    for name, seconds, mb in rows:
+        print(f"{name:<24} {seconds:>10.3f} {mb:>12.1f} {base_s / seconds:>8.1f}x {base_mb / mb:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Model load benchmark: pickled pipeline vs memory-mapped scorer
+Starts N fresh processes per format (like N Streamlit server processes on one
+host). Each loads the model, scores one customer and then a batch, and
+reports load time, first-prediction latency, RSS and PSS. PSS splits shared
+pages between the processes that map them, so it shows how much of the
+mmap'ed model the processes share through the page cache.
+
+Usage:
+    python benchmarks/bench_model_load.py best_churn_model_random_forest.pkl --processes 4
+"""
+
+import argparse
+import multiprocessing as mp
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synth_data import sample_customers  # noqa: E402
+
+
+def _proc_kb(path, field):
+    with open(path) as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _rss_mb():
+    return _proc_kb("/proc/self/status", "VmRSS") / 1024
+
+
+def _pss_mb():
+    return _proc_kb("/proc/self/smaps_rollup", "Pss") / 1024
+
+
+def make_customers(n, seed=0):
+    """Synthetic customers (synth_data.py), so scoring touches many tree paths"""
+    return sample_customers(n, seed)
+
+
+def _child(fmt, path, n_rows, barrier, queue):
+    customers = make_customers(n_rows)
+    base_rss, base_pss = _rss_mb(), _pss_mb()
+    start = time.perf_counter()
+    if fmt == "pickle":
+        import joblib
+        from fast_scorer import compile_pipeline
+
+        model = joblib.load(path)
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        scorer = compile_pipeline(model)
+    else:
+        from fast_scorer import CompiledScorer
+
+        scorer = CompiledScorer.load(path, mmap_mode="r")
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+    scorer.predict_proba_one(customers[0])
+    first_s = time.perf_counter() - start
+    scorer.predict_proba(customers)  # Touch the model like a busy app would
+
+    barrier.wait()  # Measure while every process is alive and mapping the model
+    queue.put({"load_s": load_s, "first_s": first_s,
+               "rss_mb": _rss_mb() - base_rss, "pss_mb": _pss_mb() - base_pss})
+    barrier.wait()
+
+
+def run_format(fmt, path, processes, n_rows):
+    ctx = mp.get_context("spawn")  # Fresh interpreters: nothing preloaded
+    barrier = ctx.Barrier(processes)
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_child, args=(fmt, str(path), n_rows, barrier, queue))
+             for _ in range(processes)]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pickle vs memory-mapped model load benchmark")
+    parser.add_argument("model", help="Saved pipeline (.pkl)")
+    parser.add_argument("--scorer-dir", default=None,
+                        help="Saved CompiledScorer directory (default: compile the model into a temp dir)")
+    parser.add_argument("--processes", type=int, default=4, help="Concurrent app processes to simulate")
+    parser.add_argument("--rows", type=int, default=1000, help="Customers each process scores")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    scorer_dir = args.scorer_dir
+    if scorer_dir is None:
+        import joblib
+        from fast_scorer import CompiledScorer
+
+        tmp_dir = tempfile.mkdtemp()
+        scorer_dir = CompiledScorer.from_pipeline(joblib.load(args.model)).save(Path(tmp_dir) / "scorer")
+
+    pkl_mb = Path(args.model).stat().st_size / 2**20
+    mmap_mb = sum(f.stat().st_size for f in Path(scorer_dir).rglob("*") if f.is_file()) / 2**20
+    print(f"Artifacts: pickle {pkl_mb:.1f} MB, mmap scorer {mmap_mb:.1f} MB; "
+          f"{args.processes} processes, {args.rows} rows each\n")
+    print(f"{'Format':<8} {'load':>9} {'1st call':>9} {'RSS/proc':>10} {'PSS/proc':>10} {'PSS total':>10}")
+    try:
+        for fmt, path in (("pickle", args.model), ("mmap", scorer_dir)):
+            res = run_format(fmt, path, args.processes, args.rows)
+            load = np.median([r["load_s"] for r in res])
+            first = np.median([r["first_s"] for r in res])
+            rss = np.mean([r["rss_mb"] for r in res])
+            pss = np.mean([r["pss_mb"] for r in res])
+            print(f"{fmt:<8} {load:>8.3f}s {first * 1000:>7.1f}ms {rss:>8.1f}MB {pss:>8.1f}MB "
+                  f"{pss * args.processes:>8.1f}MB")
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    print("\nRSS/PSS are the growth over a bare interpreter. PSS counts each shared page "
+          "once across the processes that map it.")
+
+
+if __name__ == "__main__":
+    main()
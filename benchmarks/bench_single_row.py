@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: single-row churn scoring latency
+Compares the sklearn pipeline on a one-row DataFrame (what predict_churn and
+the Streamlit form do) against the compiled scorer from fast_scorer.py, and
+checks that both return the same probabilities.
+
+Usage:
+    python benchmarks/bench_single_row.py best_churn_model_random_forest.pkl --data Churn_Modelling.csv
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from churn_features import MODEL_FEATURES, add_engineered_features  # noqa: E402
+from fast_scorer import CompiledScorer  # noqa: E402
+
+SAMPLE_CUSTOMER = {
+    'CreditScore': 650, 'Age': 45, 'Tenure': 5, 'Balance': 75000.0,
+    'NumOfProducts': 2, 'HasCrCard': 1, 'IsActiveMember': 0,
+    'EstimatedSalary': 100000.0, 'Geography': 'Germany', 'Gender': 'Female',
+}
+
+
+def time_calls(fn, customers, repeat):
+    """Per-call latencies in microseconds"""
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        customer = customers[i % len(customers)]
+        start = time.perf_counter_ns()
+        fn(customer)
+        timings[i] = (time.perf_counter_ns() - start) / 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-row scoring micro-benchmark")
+    parser.add_argument("model", help="Saved pipeline (.pkl)")
+    parser.add_argument("--data", default=None, help="CSV to draw customers from")
+    parser.add_argument("--rows", type=int, default=200, help="Distinct customers to score")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    clf = pipeline.named_steps["clf"]
+    if "n_jobs" in clf.get_params():
+        clf.set_params(n_jobs=1)  # Thread dispatch only adds overhead for one row
+    scorer = CompiledScorer.from_pipeline(pipeline)
+
+    if args.data:
+        df = add_engineered_features(pd.read_csv(args.data, nrows=args.rows))
+        customers = df[MODEL_FEATURES].to_dict('records')
+    else:
+        customers = [SAMPLE_CUSTOMER]
+
+    # Correctness: the compiled path must match the pipeline
+    expected = pipeline.predict_proba(pd.DataFrame(customers)[MODEL_FEATURES])[:, 1]
+    got_dict = np.array([scorer.predict_proba_one(c) for c in customers])
+    got_tuple = np.array([scorer.predict_proba_one(tuple(c[f] for f in MODEL_FEATURES))
+                          for c in customers])
+    got_batch = scorer.predict_proba(customers)
+    max_diff = max(np.abs(expected - got).max() for got in (got_dict, got_tuple, got_batch))
+    print(f"Max |pipeline - compiled| over {len(customers)} customers: {max_diff:.2e}")
+    # XGBoost itself returns float32 probabilities, so allow float32 rounding
+    if max_diff > 1e-6:
+        sys.exit("❌ Compiled scorer disagrees with the pipeline")
+
+    def pipeline_one(customer):
+        return pipeline.predict_proba(pd.DataFrame([customer])[MODEL_FEATURES])[:, 1][0]
+
+    repeat_pipeline = max(args.repeat // 10, 50)  # The slow path gets fewer calls
+    baseline = time_calls(pipeline_one, customers, repeat_pipeline)
+    compiled = time_calls(scorer.predict_proba_one, customers, args.repeat)
+
+    print(f"\n{'Path':<22} {'p50 (µs)':>10} {'p99 (µs)':>10} {'mean (µs)':>10}")
+    print("-" * 56)
+    for name, t in [("pipeline + DataFrame", baseline), ("compiled scorer", compiled)]:
+        print(f"{name:<22} {np.percentile(t, 50):>10.1f} {np.percentile(t, 99):>10.1f} "
+              f"{t.mean():>10.1f}")
+    print(f"\n🚀 Speedup (p50): {np.percentile(baseline, 50) / np.percentile(compiled, 50):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Startup benchmark: cold import + first prediction
+Runs each scenario in a fresh interpreter (so nothing is already imported)
+and times importing the scoring entry point plus the first ``predict_churn``
+call. Fails if the lightweight churn_scoring path exceeds the budget or pulls
+in plotting/training libraries.
+
+Usage (from the directory holding the saved model and model_feature_info.pkl):
+    python benchmarks/bench_startup.py --budget 3.0
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Libraries the scoring path should never import
+HEAVY_MODULES = ["matplotlib", "seaborn", "plotly", "streamlit"]
+
+SCENARIOS = {
+    "churn_scoring": "from churn_scoring import predict_churn",
+    "churn_prediction_complete": "from churn_prediction_complete import predict_churn",
+}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{import_line}
+imported = time.perf_counter()
+predict_churn({customer!r})
+done = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "first_predict_s": done - imported,
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+SAMPLE_CUSTOMER = {
+    'CreditScore': 650, 'Age': 45, 'Tenure': 5, 'Balance': 75000.0,
+    'NumOfProducts': 2, 'HasCrCard': 1, 'IsActiveMember': 0,
+    'EstimatedSalary': 100000.0, 'Geography': 'Germany', 'Gender': 'Female',
+}
+
+
+def run_probe(import_line):
+    code = PROBE.format(import_line=import_line, customer=SAMPLE_CUSTOMER, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {str(REPO_ROOT)!r})\n{code}"],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "MPLBACKEND": "Agg"},
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import + first prediction benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per scenario")
+    parser.add_argument("--budget", type=float, default=3.0,
+                        help="Max median seconds for churn_scoring import + first prediction")
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="Only time churn_scoring, not the training script import")
+    args = parser.parse_args()
+
+    scenarios = ["churn_scoring"] if args.skip_legacy else list(SCENARIOS)
+    summary = {}
+    print(f"{'Entry point':<28} {'import':>9} {'1st call':>9} {'total':>9}  heavy modules")
+    for name in scenarios:
+        runs = [run_probe(SCENARIOS[name]) for _ in range(args.repeat)]
+        imp = np.median([r["import_s"] for r in runs])
+        first = np.median([r["first_predict_s"] for r in runs])
+        total = np.median([r["import_s"] + r["first_predict_s"] for r in runs])
+        heavy = runs[-1]["heavy"]
+        summary[name] = {"total": total, "heavy": heavy}
+        print(f"{name:<28} {imp:>8.3f}s {first:>8.3f}s {total:>8.3f}s  {', '.join(heavy) or '-'}")
+
+    scoring = summary["churn_scoring"]
+    ok = scoring["total"] <= args.budget and not scoring["heavy"]
+    if "churn_prediction_complete" in summary:
+        speedup = summary["churn_prediction_complete"]["total"] / scoring["total"]
+        print(f"\nchurn_scoring starts {speedup:.1f}x faster than importing the training script")
+    print(f"Budget {args.budget:.2f}s: {'PASS' if ok else 'FAIL'} "
+          f"(median {scoring['total']:.3f}s, heavy imports: {', '.join(scoring['heavy']) or 'none'})")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
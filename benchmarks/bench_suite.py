@@ -0,0 +1,369 @@
+"""
+End-to-end performance benchmark suite
+Times and memory-profiles each step of the churn pipeline at several dataset
+sizes: CSV load (and cached reload), feature engineering, preprocessing
+fit/transform, every candidate's fit, batch ``predict_proba`` and
+single-row ``predict_churn`` latency percentiles. Results are written to
+JSON; ``--baseline`` (or ``--compare OLD NEW``) flags regressions against a
+stored run.
+
+Each step reports its best time over ``--repeat`` runs (slow steps run once)
+and its peak memory above the resident set size it started from (the
+kernel's high-water mark, reset before every step; Linux only).
+
+Datasets are generated by synth_data.py (from the shipped spec, or from a
+spec fitted to ``--source``) with a fixed seed, so every run times the same
+rows.
+
+Usage:
+    python benchmarks/bench_suite.py --sizes 10k,100k,1m,10m --output bench.json
+    python benchmarks/bench_suite.py --sizes 10k,100k --baseline bench.json
+    python benchmarks/bench_suite.py --source Churn_Modelling.csv --sizes 1m
+    python benchmarks/bench_suite.py --compare bench_old.json bench_new.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from churn_data import load_customers, read_csv_typed  # noqa: E402
+from churn_features import MODEL_FEATURES, TARGET, add_engineered_features  # noqa: E402
+from churn_models import make_classifiers, make_preprocessor  # noqa: E402
+from churn_scoring import predict_churn  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+from synth_data import fit_spec, load_spec, parse_size, sample_customers, write_synthetic  # noqa: E402
+from xgb_fast import QuantizedSplit  # noqa: E402
+
+SUFFIXES = {"k": 10**3, "m": 10**6}
+MAX_REPEAT_SECONDS = 5.0     # Steps slower than this run only once
+
+# A change is a regression when it is both relatively and absolutely larger
+DEFAULT_TOLERANCE = 0.15
+MIN_DELTA = {"seconds": 0.005, "peak_mb": 5.0, "us": 5.0}
+
+
+def size_label(n_rows):
+    for suffix, factor in sorted(SUFFIXES.items(), key=lambda item: -item[1]):
+        if n_rows >= factor and n_rows % factor == 0:
+            return f"{n_rows // factor}{suffix}"
+    return str(n_rows)
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+def _status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak():
+    """Reset the kernel's peak-RSS counter (VmHWM) to the current RSS"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure(fn, repeat=3, setup=None):
+    """
+    Best time and peak extra memory of ``fn``
+
+    Parameters:
+    -----------
+    fn : callable
+        The step; called with the output of ``setup`` when given
+    repeat : int
+        Runs to take the best time of (a step slower than MAX_REPEAT_SECONDS runs once)
+    setup : callable, optional
+        Untimed preparation before each run (e.g. a fresh copy of the input)
+
+    Returns:
+    --------
+    tuple : ({'seconds', 'peak_mb'}, result of the last run)
+    """
+    best, peak, result = float("inf"), None, None
+    for i in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        gc.collect()
+        rss = _status_mb("VmRSS")
+        tracked = _reset_peak()
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        if i == 0 and tracked and rss is not None:
+            peak = max(0.0, _status_mb("VmHWM") - rss)
+        if elapsed > MAX_REPEAT_SECONDS:
+            break
+    return {"seconds": best, "peak_mb": peak}, result
+
+
+def latency_percentiles(model, customers, threshold=0.5):
+    """predict_churn latency percentiles in microseconds (after one warm-up call)"""
+    predict_churn(customers[0], model=model, threshold=threshold)
+    timings = np.empty(len(customers))
+    for i, customer in enumerate(customers):
+        start = time.perf_counter_ns()
+        predict_churn(customer, model=model, threshold=threshold)
+        timings[i] = (time.perf_counter_ns() - start) / 1000
+    p50, p90, p99 = np.percentile(timings, [50, 90, 99])
+    return {"p50_us": p50, "p90_us": p90, "p99_us": p99, "calls": len(customers)}
+
+
+# ----------------------------------------------------------------------
+# Suite
+# ----------------------------------------------------------------------
+def run_size(csv_path, repeat=3, max_fit_rows=1_000_000, single_row_calls=1000, report=print):
+    """
+    Benchmark every step on one dataset
+
+    Returns:
+    --------
+    dict : step name -> metrics ('seconds'/'peak_mb', latency percentiles
+        for single_row/*, or {'skipped': reason})
+    """
+    results = {}
+
+    def record(step, metrics):
+        results[step] = metrics
+        if 'seconds' in metrics:
+            peak = f"{metrics['peak_mb']:8.1f} MB" if metrics['peak_mb'] is not None else ""
+            report(f"  {step:<40} {metrics['seconds']:>10.4f}s {peak}")
+        elif 'p50_us' in metrics:
+            report(f"  {step:<40} p50 {metrics['p50_us']:.0f}us  p90 {metrics['p90_us']:.0f}us  "
+                   f"p99 {metrics['p99_us']:.0f}us")
+        else:
+            report(f"  {step:<40} skipped ({metrics['skipped']})")
+
+    metrics, df = measure(lambda: read_csv_typed(csv_path), repeat)
+    record("csv_load", metrics)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        load_customers(csv_path, cache_dir=cache_dir)  # Write the Parquet copy
+        metrics, _ = measure(lambda: load_customers(csv_path, cache_dir=cache_dir), repeat)
+    record("cached_load", metrics)
+
+    metrics, df = measure(add_engineered_features, repeat, setup=df.copy)
+    record("feature_engineering", metrics)
+    X, y = df[MODEL_FEATURES], df[TARGET].astype(int).to_numpy()
+
+    metrics, pre = measure(lambda: make_preprocessor().fit(X), repeat)
+    record("preprocess_fit", metrics)
+    metrics, X_matrix = measure(
+        lambda: np.ascontiguousarray(pre.transform(X), dtype=np.float32), repeat)
+    record("preprocess_transform", metrics)
+
+    # Fit on every row (no split): this times the steps, it does not evaluate models
+    models = {}
+    fit_skipped = {'skipped': f"more than --max-fit-rows={max_fit_rows:,} rows"}
+    for name, clf in make_classifiers().items():
+        if len(X) > max_fit_rows:
+            record(f"fit/{name}", fit_skipped)
+            continue
+        metrics, fitted = measure(lambda: clf.fit(X_matrix, y), repeat)
+        record(f"fit/{name}", metrics)
+        models[name] = Pipeline([("pre", pre), ("clf", fitted)])
+
+    if len(X) > max_fit_rows:
+        record("fit/XGBoost (fast path)", fit_skipped)
+    else:
+        params = make_classifiers()["XGBoost"].get_params()
+        metrics, (split, clf) = measure(lambda: _fit_fast_xgb(X, y, params), repeat)
+        record("fit/XGBoost (fast path)", metrics)
+        models["XGBoost (fast path)"] = split.pipeline(clf)
+
+    for name, model in models.items():
+        metrics, _ = measure(lambda: model.predict_proba(X), repeat)
+        record(f"predict_proba/{name}", metrics)
+
+    customers = sample_customers(single_row_calls)
+    for name, model in models.items():
+        record(f"single_row/{name}", latency_percentiles(model, customers))
+    return results
+
+
+def _fit_fast_xgb(X, y, params):
+    split = QuantizedSplit(X, y)
+    return split, split.fit(params)
+
+
+def environment():
+    """Machine and library versions, so comparisons across machines can be spotted"""
+    import sklearn
+    import xgboost
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit-learn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def run_suite(sizes, source_csv=None, repeat=3, max_fit_rows=1_000_000, single_row_calls=1000,
+              workdir=None, seed=0):
+    """
+    Run run_size for every dataset size
+
+    Parameters:
+    -----------
+    source_csv : str, optional
+        Real customer file to fit the synthetic data spec to (default: the
+        spec shipped with synth_data.py)
+
+    Returns:
+    --------
+    dict : {'environment': ..., 'settings': ..., 'results': {size label: steps}}
+    """
+    spec = fit_spec(load_customers(source_csv, use_cache=False)) if source_csv else load_spec()
+    report = {
+        'environment': environment(),
+        'settings': {'repeat': repeat, 'max_fit_rows': max_fit_rows, 'single_row_calls': single_row_calls,
+                     'data': {'source': str(source_csv) if source_csv else "synth_spec.json", 'seed': seed}},
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for n_rows in sizes:
+            label = size_label(n_rows)
+            print(f"\n📏 {label} rows")
+            path = write_synthetic(spec, n_rows, Path(tmp) / f"customers_{label}.csv", seed=seed)
+            report['results'][label] = run_size(path, repeat, max_fit_rows, single_row_calls)
+            path.unlink()
+    return report
+
+
+# ----------------------------------------------------------------------
+# Comparison
+# ----------------------------------------------------------------------
+def _min_delta(metric):
+    if metric.endswith("_us"):
+        return MIN_DELTA["us"]
+    return MIN_DELTA.get(metric, 0.0)
+
+
+def compare_results(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Steps whose cost changed between two suite runs
+
+    Every metric is a cost (lower is better). A change counts when it is
+    more than ``tolerance`` (relative) and more than MIN_DELTA (absolute),
+    so tiny steps do not flag on timer noise.
+
+    Returns:
+    --------
+    list of dict : size, step, metric, baseline, current, ratio and
+        status ('regression' or 'improvement')
+    """
+    changes = []
+    for size, steps in current['results'].items():
+        for step, metrics in steps.items():
+            base = baseline['results'].get(size, {}).get(step, {})
+            for metric, value in metrics.items():
+                old = base.get(metric)
+                if metric == "calls" or not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                    continue
+                if abs(value - old) <= _min_delta(metric) or old <= 0:
+                    continue
+                ratio = value / old
+                if ratio > 1 + tolerance:
+                    status = "regression"
+                elif ratio < 1 / (1 + tolerance):
+                    status = "improvement"
+                else:
+                    continue
+                changes.append({'size': size, 'step': step, 'metric': metric, 'baseline': old,
+                                'current': value, 'ratio': ratio, 'status': status})
+    return changes
+
+
+def print_comparison(baseline, current, changes, tolerance):
+    base_env, cur_env = baseline.get('environment', {}), current.get('environment', {})
+    differs = [key for key in ('platform', 'cpu_count', 'python', 'numpy', 'pandas', 'scikit-learn', 'xgboost')
+               if base_env.get(key) != cur_env.get(key)]
+    if differs:
+        print(f"⚠️  Environments differ ({', '.join(differs)}); timings may not be comparable")
+    print(f"\nBaseline {base_env.get('git_commit') or '?'} ({base_env.get('created_at', '?')}) vs "
+          f"current {cur_env.get('git_commit') or '?'} ({cur_env.get('created_at', '?')}), "
+          f"tolerance {tolerance:.0%}")
+    if not changes:
+        print("✓ No step changed beyond the tolerance")
+        return
+    print(f"{'size':<6} {'step':<40} {'metric':<8} {'baseline':>11} {'current':>11} {'ratio':>7}")
+    for c in sorted(changes, key=lambda c: (c['status'] != "regression", -c['ratio'])):
+        marker = "❌" if c['status'] == "regression" else "✅"
+        print(f"{c['size']:<6} {c['step']:<40} {c['metric']:<8} {c['baseline']:>11.4g} "
+              f"{c['current']:>11.4g} {c['ratio']:>6.2f}x {marker}")
+    n_regressions = sum(c['status'] == "regression" for c in changes)
+    print(f"\n{n_regressions} regression(s), {len(changes) - n_regressions} improvement(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end churn pipeline benchmark suite")
+    parser.add_argument("--source", default=None,
+                        help="Real CSV to fit the synthetic data to (default: the shipped synth_spec.json)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic datasets")
+    parser.add_argument("--sizes", default="10k,100k,1m,10m", help="Comma-separated row counts (k/m suffixes)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per step (best time is kept)")
+    parser.add_argument("--max-fit-rows", type=parse_size, default=1_000_000,
+                        help="Skip model fits (and their scoring) above this many rows")
+    parser.add_argument("--single-row-calls", type=int, default=1000,
+                        help="predict_churn calls per model for the latency percentiles")
+    parser.add_argument("--workdir", default=None, help="Where the generated CSVs are written")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file for this run's results")
+    parser.add_argument("--baseline", help="Stored results to compare this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two stored result files without running anything")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown/memory growth that counts as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (json.loads(Path(p).read_text()) for p in args.compare)
+    else:
+        sizes = [parse_size(s) for s in args.sizes.split(",")]
+        current = run_suite(sizes, args.source, args.repeat, args.max_fit_rows,
+                            args.single_row_calls, args.workdir, args.seed)
+        Path(args.output).write_text(json.dumps(current, indent=2))
+        print(f"\n✓ Results saved to '{args.output}'")
+        if not args.baseline:
+            return
+        baseline = json.loads(Path(args.baseline).read_text())
+
+    changes = compare_results(baseline, current, args.tolerance)
+    print_comparison(baseline, current, changes, args.tolerance)
+    sys.exit(1 if any(c['status'] == "regression" for c in changes) else 0)
+
+
+if __name__ == "__main__":
+    main()
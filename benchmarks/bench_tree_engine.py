@@ -0,0 +1,73 @@
+"""
+Benchmark: flat tree engine vs sklearn/XGBoost predict_proba
+Scores the preprocessed matrix at several batch sizes with the fitted
+classifier and with the FlatForest exported from it (loaded memory-mapped).
+
+Usage:
+    python benchmarks/bench_tree_engine.py best_churn_model_random_forest.pkl --data Churn_Modelling.csv
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from churn_data import load_customers  # noqa: E402
+from churn_features import MODEL_FEATURES, add_engineered_features  # noqa: E402
+from tree_engine import ARRAYS, FlatForest  # noqa: E402
+
+
+def best_of(fn, repeat):
+    """Fastest of ``repeat`` runs in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flat tree engine benchmark")
+    parser.add_argument("model", help="Saved RF/XGBoost pipeline (.pkl)")
+    parser.add_argument("--data", required=True, help="Customer CSV")
+    parser.add_argument("--batch-sizes", default="1,100,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    clf = pipeline.named_steps["clf"]
+    df = add_engineered_features(load_customers(args.data))
+    X = pipeline.named_steps["pre"].transform(df[MODEL_FEATURES])
+
+    start = time.perf_counter()
+    forest = FlatForest.from_model(pipeline)
+    export_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        forest.save(tmp)
+        size_mb = sum((Path(tmp) / f"{name}.npy").stat().st_size for name in ARRAYS) / 1e6
+        flat = FlatForest.load(tmp, mmap_mode="r")
+
+        max_diff = np.abs(clf.predict_proba(X)[:, 1] - flat.predict_proba(X)).max()
+        print(f"Trees: {flat.n_trees}, nodes: {flat.n_nodes:,}, max depth: {flat.max_depth}")
+        print(f"Export: {export_s:.2f}s, artifact: {size_mb:.1f} MB "
+              f"(pickle: {Path(args.model).stat().st_size / 1e6:.1f} MB)")
+        print(f"Max |model - flat| probability difference: {max_diff:.2e}\n")
+
+        print(f"{'Batch':>8} {'model (ms)':>12} {'flat (ms)':>12} {'speedup':>9}")
+        print("-" * 44)
+        for size in [int(s) for s in args.batch_sizes.split(",")]:
+            batch = X[:size]
+            t_model = best_of(lambda: clf.predict_proba(batch), args.repeat)
+            t_flat = best_of(lambda: flat.predict_proba(batch), args.repeat)
+            print(f"{size:>8,} {t_model:>12.2f} {t_flat:>12.2f} {t_model / t_flat:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test for scoring_service.py
+Opens C keep-alive connections to the service and has each one send requests
+back to back for a fixed duration (a closed-loop test: concurrency, not
+arrival rate, is the knob). Reports throughput, latency percentiles and
+status codes. Pure asyncio, so the client itself is cheap enough to run on
+the same box.
+
+Usage:
+    python scoring_service.py --port 8000 &
+    python benchmarks/load_test_service.py --port 8000 --connections 64 --duration 10
+
+    # Or let the script start (and stop) the service itself
+    python benchmarks/load_test_service.py --spawn --max-batch 128 --max-wait-ms 2
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_model_load import make_customers  # noqa: E402
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line[:15].lower() == b"content-length:":
+            length = int(line[15:])
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, path, bodies, stop_at, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < stop_at:
+            body = bodies[i % len(bodies)]
+            i += 1
+            request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                       f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, connections, duration, batch_size, n_bodies=2000):
+    customers = make_customers(n_bodies)
+    if batch_size > 1:
+        path = "/score/batch"
+        bodies = [json.dumps({"customers": customers[i:i + batch_size]}).encode()
+                  for i in range(0, len(customers) - batch_size + 1, batch_size)]
+    else:
+        path = "/score"
+        bodies = [json.dumps(c).encode() for c in customers]
+
+    latencies, statuses = [], Counter()
+    start = time.perf_counter()
+    stop_at = start + duration
+    await asyncio.gather(*(_client(host, port, path, bodies, stop_at, latencies, statuses)
+                           for _ in range(connections)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+async def _health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    head = await reader.readuntil(b"\r\n\r\n")
+    body = await reader.read()
+    writer.close()
+    return json.loads(body) if head[9:12] == b"200" else None
+
+
+def _spawn(args):
+    service = Path(__file__).resolve().parent.parent / "scoring_service.py"
+    proc = subprocess.Popen([sys.executable, str(service), "--host", args.host, "--port", str(args.port),
+                             "--max-batch", str(args.max_batch), "--max-wait-ms", str(args.max_wait_ms)])
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if asyncio.run(_health(args.host, args.port)) is not None:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Scoring service did not start within 30s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop load test for the churn scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--connections", type=int, default=64, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Customers per request (>1 uses /score/batch)")
+    parser.add_argument("--spawn", action="store_true", help="Start the service for the duration of the test")
+    parser.add_argument("--max-batch", type=int, default=128, help="Service --max-batch (with --spawn)")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Service --max-wait-ms (with --spawn)")
+    args = parser.parse_args()
+
+    proc = _spawn(args) if args.spawn else None
+    try:
+        latencies, statuses, elapsed = asyncio.run(
+            run_load(args.host, args.port, args.connections, args.duration, args.batch_size))
+        health = asyncio.run(_health(args.host, args.port))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    lat_ms = np.asarray(latencies) * 1000
+    n = len(lat_ms)
+    print(f"\n{args.connections} connections, {args.batch_size} customer(s)/request, {elapsed:.1f}s")
+    print(f"Requests:   {n:,} ({n / elapsed:,.0f} req/s, {n * args.batch_size / elapsed:,.0f} customers/s)")
+    if n:
+        p50, p90, p99 = np.percentile(lat_ms, [50, 90, 99])
+        print(f"Latency:    p50 {p50:.2f}ms  p90 {p90:.2f}ms  p99 {p99:.2f}ms  max {lat_ms.max():.2f}ms")
+    print("Statuses:   " + ", ".join(f"{code}: {count:,}" for code, count in sorted(statuses.items())))
+    if health:
+        print(f"Service:    model {health['model_version']}, {health['batches']:,} batches, "
+              f"mean batch size {health['mean_batch_size']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Precomputed churn aggregate cube
+One pass over the customer table produces customer and churner counts for
+every observed combination of Geography x Gender x NumOfProducts x
+IsActiveMember x HasCrCard x Tenure x age bin x balance bin. The EDA figure
+and the dashboard charts are roll-ups of this cube, so they cost the same
+however large the customer table grows.
+
+Alongside the cells, a value profile keeps, per numeric column and churn
+status, the count, sum, sum of squares and range of each value bin, which
+is enough for the summary statistics and quartiles the dashboard shows.
+
+Usage:
+    python churn_cube.py Churn_Modelling.csv churn_cube.parquet
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from churn_data import SCHEMA, load_customers
+from churn_features import TARGET
+
+CUBE_PATH = 'churn_cube.parquet'
+
+# Age bins: <20, 20-24, ..., 90-94, 95+
+AGE_EDGES = list(range(20, 100, 5))
+AGE_LABELS = ['<20'] + [f'{lo}-{lo + 4}' for lo in AGE_EDGES[:-1]] + [f'{AGE_EDGES[-1]}+']
+
+# Balance bins: exactly zero, 25k-wide bins up to 250k, then 250k+
+BALANCE_EDGES = list(range(0, 250_001, 25_000))
+BALANCE_LABELS = (['0'] +
+                  [f'{lo // 1000}k-{hi // 1000}k' for lo, hi in zip(BALANCE_EDGES[:-1], BALANCE_EDGES[1:])] +
+                  [f'{BALANCE_EDGES[-1] // 1000}k+'])
+
+RAW_DIMENSIONS = ['Geography', 'Gender', 'NumOfProducts', 'IsActiveMember', 'HasCrCard', 'Tenure']
+DIMENSIONS = RAW_DIMENSIONS + ['AgeBin', 'BalanceBin']
+MEASURES = ['customers', 'churned']
+
+# Profiled columns and their value bin width: integer columns keep every
+# value (exact quartiles), money columns are binned to the nearest 100
+PROFILE_COLUMNS = {'CreditScore': 1, 'Age': 1, 'Tenure': 1, 'Balance': 100, 'NumOfProducts': 1,
+                   'HasCrCard': 1, 'IsActiveMember': 1, 'EstimatedSalary': 100}
+PROFILE_MEASURES = ['customers', 'total', 'total_sq', 'min', 'max']
+SOURCE_COLUMNS = list(dict.fromkeys(RAW_DIMENSIONS + ['Age', 'Balance'] + list(PROFILE_COLUMNS) + [TARGET]))
+
+
+def age_bin(age):
+    """Ordered categorical age bin for each age"""
+    codes = np.digitize(np.asarray(age, dtype=np.float64), AGE_EDGES)
+    return pd.Categorical.from_codes(codes, categories=AGE_LABELS, ordered=True)
+
+
+def balance_bin(balance):
+    """Ordered categorical balance bin for each balance (zero balances get their own bin)"""
+    codes = np.digitize(np.asarray(balance, dtype=np.float64), BALANCE_EDGES, right=True)
+    return pd.Categorical.from_codes(codes, categories=BALANCE_LABELS, ordered=True)
+
+
+def _aggregate(df):
+    """Cube cells (DIMENSIONS + MEASURES) for one frame of customers"""
+    keys = df[RAW_DIMENSIONS].assign(AgeBin=age_bin(df['Age']), BalanceBin=balance_bin(df['Balance']))
+    keys['churned'] = df[TARGET].to_numpy(dtype=np.int64)
+    cells = keys.groupby(DIMENSIONS, observed=True, sort=False)['churned'].agg(['size', 'sum'])
+    return cells.rename(columns={'size': 'customers', 'sum': 'churned'}).reset_index()
+
+
+def _profile(df):
+    """Value profile rows (column, TARGET, value bin + PROFILE_MEASURES) for one frame of customers"""
+    parts = []
+    for column, width in PROFILE_COLUMNS.items():
+        values = df[column].to_numpy(dtype=np.float64)
+        part = pd.DataFrame({TARGET: df[TARGET].to_numpy(dtype=np.int8),
+                             'value': np.floor(values / width) * width,
+                             'x': values, 'x_sq': values * values})
+        part = part.groupby([TARGET, 'value'], sort=False).agg(
+            customers=('x', 'size'), total=('x', 'sum'), total_sq=('x_sq', 'sum'),
+            min=('x', 'min'), max=('x', 'max'))
+        parts.append(part.reset_index().assign(column=column))
+    return pd.concat(parts, ignore_index=True)
+
+
+def _merge_profiles(parts):
+    """Combine profile rows of several chunks (counts and sums add, ranges widen)"""
+    profile = pd.concat(parts, ignore_index=True).groupby(['column', TARGET, 'value'], sort=True).agg(
+        customers=('customers', 'sum'), total=('total', 'sum'), total_sq=('total_sq', 'sum'),
+        min=('min', 'min'), max=('max', 'max'))
+    return profile.reset_index()
+
+
+def _quantiles(bins, qs):
+    """
+    Quantiles (pandas' linear interpolation) from sorted value bins
+
+    A bin holding one distinct value gives it exactly; within a wider bin the
+    ranks are spread evenly between its min and max.
+    """
+    counts = bins['customers'].to_numpy()
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    lo, hi = bins['min'].to_numpy(), bins['max'].to_numpy()
+
+    def at_rank(rank):
+        i = np.searchsorted(ends, rank, side='right')
+        spread = (rank - starts[i]) / max(counts[i] - 1, 1)
+        return lo[i] + (hi[i] - lo[i]) * spread
+
+    positions = (ends[-1] - 1) * np.asarray(qs, dtype=np.float64)
+    below, frac = np.floor(positions).astype(np.int64), positions % 1
+    return np.array([at_rank(b) + f * (at_rank(min(b + 1, ends[-1] - 1)) - at_rank(b))
+                     for b, f in zip(below, frac)])
+
+
+def _describe(bins):
+    """count/mean/std/min/quartiles/max (as DataFrame.describe) of one column's value bins"""
+    n = bins['customers'].sum()
+    mean = bins['total'].sum() / n
+    var = max(bins['total_sq'].sum() - n * mean * mean, 0.0) / (n - 1) if n > 1 else np.nan
+    q1, median, q3 = _quantiles(bins, [0.25, 0.5, 0.75])
+    return pd.Series({'count': float(n), 'mean': mean, 'std': np.sqrt(var), 'min': bins['min'].min(),
+                      '25%': q1, '50%': median, '75%': q3, 'max': bins['max'].max()})
+
+
+class ChurnCube:
+    """
+    Customer/churner counts per combination of the cube DIMENSIONS
+
+    Roll-ups are memoised, so repeated chart queries (e.g. Streamlit reruns)
+    are dictionary lookups. ``profile`` holds the value bins of the
+    PROFILE_COLUMNS (None for a cube saved without one).
+    """
+
+    def __init__(self, cells, profile=None):
+        self.cells = cells
+        self.profile = profile
+        self._rollups = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the cube from a customer DataFrame in one pass"""
+        return cls(_aggregate(df), _merge_profiles([_profile(df)]))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build the cube from an iterable of customer DataFrames (e.g. a streamed file)"""
+        partial, profiles = [], []
+        for chunk in chunks:
+            partial.append(_aggregate(chunk))
+            profiles.append(_profile(chunk))
+        cells = (pd.concat(partial, ignore_index=True)
+                 .groupby(DIMENSIONS, observed=True, sort=False)[MEASURES].sum()
+                 .reset_index())
+        return cls(cells, _merge_profiles(profiles))
+
+    @classmethod
+    def from_file(cls, path, chunksize=None):
+        """
+        Build the cube from a Churn_Modelling-shaped CSV or Parquet file
+
+        Parameters:
+        -----------
+        path : str or Path
+            Customer table
+        chunksize : int, optional
+            Stream the file in chunks of this many rows instead of loading it
+            whole (for tables larger than memory)
+
+        Returns:
+        --------
+        ChurnCube
+        """
+        if chunksize is None:
+            return cls.from_frame(load_customers(path))
+        return cls.from_chunks(_iter_source_chunks(path, chunksize))
+
+    def save(self, path=CUBE_PATH):
+        """Write the cells to ``path`` and the value profile next to it (see profile_path)"""
+        path = Path(path)
+        for frame, target in ((self.profile, profile_path(path)), (self.cells, path)):
+            if frame is None:
+                continue
+            tmp = target.with_suffix(".tmp")
+            frame.to_parquet(tmp, index=False)
+            tmp.replace(target)
+        return path
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        profile = profile_path(path)
+        return cls(pd.read_parquet(path), pd.read_parquet(profile) if profile.exists() else None)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def totals(self):
+        """(customers, churned) over the whole table"""
+        customers, churned = self.cells[MEASURES].sum()
+        return int(customers), int(churned)
+
+    def rollup(self, by):
+        """
+        Counts and churn rate grouped by one or more dimensions
+
+        Parameters:
+        -----------
+        by : str or list of str
+            Cube DIMENSIONS to keep
+
+        Returns:
+        --------
+        pd.DataFrame : indexed by ``by``, with customers, churned, retained
+            and churn_rate (fraction)
+        """
+        key = (by,) if isinstance(by, str) else tuple(by)
+        result = self._rollups.get(key)
+        if result is None:
+            unknown = set(key) - set(DIMENSIONS)
+            if unknown:
+                raise ValueError(f"Not cube dimensions: {sorted(unknown)}. Dimensions: {DIMENSIONS}")
+            result = self.cells.groupby(list(key), observed=True)[MEASURES].sum()
+            result['retained'] = result['customers'] - result['churned']
+            result['churn_rate'] = result['churned'] / result['customers']
+            self._rollups[key] = result
+        return result
+
+    def churn_rate(self, by):
+        """Churn rate (%) per value of ``by``"""
+        return self.rollup(by)['churn_rate'] * 100
+
+    def _column_bins(self, column):
+        if self.profile is None:
+            raise ValueError("This cube was saved without a value profile; rebuild it")
+        if column not in PROFILE_COLUMNS:
+            raise ValueError(f"Not a profiled column: {column}. Columns: {list(PROFILE_COLUMNS)}")
+        return self.profile[self.profile['column'] == column]
+
+    def describe(self, columns=None):
+        """
+        Summary statistics of the profiled columns, laid out like DataFrame.describe()
+
+        Counts, means, standard deviations and ranges are exact; quartiles are
+        exact for integer columns and interpolated within the 100-wide bins of
+        the money columns.
+        """
+        columns = list(PROFILE_COLUMNS) if columns is None else columns
+        stats = {}
+        for column in columns:
+            bins = self._column_bins(column)
+            stats[column] = _describe(bins.groupby('value', sort=True).agg(
+                customers=('customers', 'sum'), total=('total', 'sum'), total_sq=('total_sq', 'sum'),
+                min=('min', 'min'), max=('max', 'max')))
+        return pd.DataFrame(stats)
+
+    def box_stats(self, column):
+        """
+        Box-plot statistics of ``column`` per churn status
+
+        Returns:
+        --------
+        pd.DataFrame : indexed by TARGET, with q1, median, q3, mean and the
+            whisker ends lowerfence/upperfence (the furthest values within
+            1.5 IQR of the box)
+        """
+        rows = {}
+        for status, bins in self._column_bins(column).groupby(TARGET, sort=True):
+            bins = bins.sort_values('value')
+            q1, median, q3 = _quantiles(bins, [0.25, 0.5, 0.75])
+            reach = 1.5 * (q3 - q1)
+            inside_lo = bins[bins['max'] >= q1 - reach]
+            inside_hi = bins[bins['min'] <= q3 + reach]
+            rows[status] = {'q1': q1, 'median': median, 'q3': q3,
+                            'mean': bins['total'].sum() / bins['customers'].sum(),
+                            'lowerfence': max(inside_lo['min'].iloc[0], q1 - reach),
+                            'upperfence': min(inside_hi['max'].iloc[-1], q3 + reach)}
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis(TARGET)
+
+    def __len__(self):
+        return len(self.cells)
+
+
+def profile_path(path=CUBE_PATH):
+    """Value profile file saved next to the cube at ``path``"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_profile{path.suffix}")
+
+
+def _iter_source_chunks(path, chunksize):
+    """Yield chunks of just the columns the cube needs, with compact dtypes"""
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=SOURCE_COLUMNS):
+            yield batch.to_pandas()
+    else:
+        dtype = {col: SCHEMA[col] for col in SOURCE_COLUMNS}
+        yield from pd.read_csv(path, usecols=SOURCE_COLUMNS, dtype=dtype, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the churn aggregate cube")
+    parser.add_argument("input", nargs="?", default="Churn_Modelling.csv", help="Customer CSV or Parquet file")
+    parser.add_argument("output", nargs="?", default=CUBE_PATH, help="Cube Parquet file")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the input in chunks of this many rows")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cube = ChurnCube.from_file(args.input, chunksize=args.chunksize)
+    cube.save(args.output)
+    customers, churned = cube.totals()
+    print(f"✓ Cube with {len(cube):,} cells from {customers:,} customers "
+          f"({churned / customers * 100:.2f}% churned) in {time.perf_counter() - start:.2f}s")
+    print(f"✓ Saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
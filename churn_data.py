@@ -0,0 +1,141 @@
+"""
+Typed, compact loader for Churn_Modelling.csv
+Parses the raw CSV with an explicit schema (categories for strings, small
+integers for flags/counts, float32 for money) and keeps a content-hashed
+Parquet copy, so repeat loads read the columnar file instead of the text.
+When a source file's content changes, the copies of its old content are
+deleted, so the cache holds one copy per source file.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+CSV_PATH = Path("Churn_Modelling.csv")
+CACHE_DIR = Path(".cache") / "churn_data"
+
+# Bump when SCHEMA changes so stale cache files are not reused
+SCHEMA_VERSION = 1
+SCHEMA = {
+    "RowNumber": "int32",
+    "CustomerId": "int32",
+    "Surname": "category",
+    "CreditScore": "int16",
+    "Geography": "category",
+    "Gender": "category",
+    "Age": "int16",
+    "Tenure": "int8",
+    "Balance": "float32",
+    "NumOfProducts": "int8",
+    "HasCrCard": "int8",
+    "IsActiveMember": "int8",
+    "EstimatedSalary": "float32",
+    "Exited": "int8",
+}
+
+_HASH_BLOCK = 1 << 20
+
+
+def file_hash(path):
+    """BLAKE2b hex digest of the file's content"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cached_file_hash(path, cache_dir):
+    """Content hash, recomputed only when the file's size or mtime changes"""
+    stat = path.stat()
+    index_path = cache_dir / "index.json"
+    try:
+        index = json.loads(index_path.read_text())
+    except (FileNotFoundError, ValueError):
+        index = {}
+    key = str(path.resolve())
+    entry = index.get(key)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["hash"]
+
+    digest = file_hash(path)
+    index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+    tmp = index_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(index, indent=2))
+    os.replace(tmp, index_path)
+    if entry and entry["hash"] != digest:
+        _prune(cache_dir, path.stem, entry["hash"], index)
+    return digest
+
+
+def _prune(cache_dir, stem, digest, index):
+    """Delete the Parquet copies of ``stem`` at content ``digest``, unless an indexed file of that name still has it"""
+    if any(Path(key).stem == stem and entry["hash"] == digest for key, entry in index.items()):
+        return
+    for stale in cache_dir.glob(f"{stem}-v*-{digest}.parquet"):
+        stale.unlink(missing_ok=True)
+
+
+def read_csv_typed(path, **kwargs):
+    """Parse a Churn_Modelling-shaped CSV with the compact SCHEMA"""
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {col: SCHEMA[col] for col in header if col in SCHEMA}
+    return pd.read_csv(path, dtype=dtype, engine="pyarrow", **kwargs)
+
+
+def iter_csv_typed(path, chunksize, usecols=None):
+    """Chunks of a Churn_Modelling-shaped CSV with the compact SCHEMA, for files too large to load at once"""
+    header = pd.read_csv(path, nrows=0).columns
+    columns = [col for col in header if usecols is None or col in usecols]
+    dtype = {col: SCHEMA[col] for col in columns if col in SCHEMA}
+    yield from pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunksize)
+
+
+def content_hash(path, cache_dir=CACHE_DIR):
+    """Content hash of ``path``, recomputed only when its size or mtime changes"""
+    path, cache_dir = Path(path), Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return _cached_file_hash(path, cache_dir)
+
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    """Parquet cache file for the current content of ``path``"""
+    digest = content_hash(path, cache_dir)
+    return Path(cache_dir) / f"{Path(path).stem}-v{SCHEMA_VERSION}-{digest}.parquet"
+
+
+def load_customers(path=CSV_PATH, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Load the customer table with compact dtypes
+
+    Parameters:
+    -----------
+    path : str or Path
+        Churn_Modelling-shaped CSV (or a Parquet file, read as is)
+    cache_dir : str or Path
+        Where the content-hashed Parquet copies live
+    use_cache : bool
+        Read from / write to the Parquet cache
+
+    Returns:
+    --------
+    pd.DataFrame : customers with SCHEMA dtypes
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    if not use_cache:
+        return read_csv_typed(path)
+
+    cached = cache_path(path, cache_dir)
+    if cached.exists():
+        return pd.read_parquet(cached)
+
+    df = read_csv_typed(path)
+    tmp = cached.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, cached)
+    return df
@@ -0,0 +1,71 @@
+"""
+Shared feature definitions for the Churn Prediction System
+Used by the training script, the Streamlit app and the batch scorer so that
+engineered features and risk segments are computed the same way everywhere
+"""
+
+import numpy as np
+
+TARGET = "Exited"
+
+NUMERIC_FEATURES = [
+    "CreditScore", "Age", "Tenure", "Balance",
+    "NumOfProducts", "HasCrCard", "IsActiveMember", "EstimatedSalary",
+    "EngagementScore", "CLV_Proxy"  # Engineered numeric features
+]
+CATEGORICAL_FEATURES = ["Geography", "Gender"]
+MODEL_FEATURES = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+
+# Raw columns needed to build MODEL_FEATURES
+RAW_FEATURES = [c for c in MODEL_FEATURES if c not in ("EngagementScore", "CLV_Proxy")]
+
+# Risk segment cut points: p < 0.3 is Low, 0.3 <= p < 0.7 is Medium, p >= 0.7 is High
+RISK_THRESHOLDS = [0.3, 0.7]
+RISK_LABELS = ['Low Risk', 'Medium Risk', 'High Risk']
+
+FEATURE_INFO_PATH = 'model_feature_info.pkl'
+
+# Memory-mappable compiled scorer for the best model (see fast_scorer.CompiledScorer.save)
+SCORER_DIR = 'best_churn_model_scorer'
+
+# Scores for the whole customer base, written by the training script
+SCORE_TABLE_PATH = 'churn_scores.parquet'
+
+# Permutation importance of the best model, written by the training script
+IMPORTANCE_PATH = 'feature_importance.json'
+
+# Quality, curves and serving cost of every candidate, written by the training script
+METRICS_PATH = 'run_metrics.json'
+
+
+def engineered_values(customer):
+    """
+    (EngagementScore, CLV_Proxy) of a customer dict or a DataFrame of customers
+
+    The single definition of both formulas, shared by training, batch and
+    single-row scoring. Raises KeyError if a raw input is missing.
+    """
+    engagement = (customer['IsActiveMember'] * 2 +
+                  customer['HasCrCard'] +
+                  customer['NumOfProducts']) / 4
+    clv_proxy = customer['Balance'] * customer['Tenure'] * 0.0001  # Normalized
+    return engagement, clv_proxy
+
+
+def add_engineered_features(df):
+    """Add EngagementScore and CLV_Proxy to ``df`` in place and return it"""
+    df['EngagementScore'], df['CLV_Proxy'] = engineered_values(df)
+    return df
+
+
+def risk_segment(proba):
+    """Map churn probabilities to Low/Medium/High risk labels (vectorised)"""
+    import pandas as pd  # Deferred so scoring-only imports stay numpy-only
+
+    codes = np.digitize(np.asarray(proba, dtype=float), RISK_THRESHOLDS)
+    return pd.Categorical.from_codes(codes, categories=RISK_LABELS)
+
+
+def model_filename(model_name):
+    """File name the training script uses for a saved model"""
+    return f'best_churn_model_{model_name.replace(" ", "_").lower()}.pkl'
@@ -0,0 +1,155 @@
+"""
+Candidate model definitions for the Churn Prediction System
+Shared by the training script and the training scheduler
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import (
+    roc_auc_score, accuracy_score, precision_score, recall_score, f1_score
+)
+from xgboost import XGBClassifier
+
+from churn_features import NUMERIC_FEATURES, CATEGORICAL_FEATURES
+
+
+def make_preprocessor(numeric_features=NUMERIC_FEATURES,
+                      categorical_features=CATEGORICAL_FEATURES, categories="auto"):
+    """
+    StandardScaler for numerics, OneHotEncoder for categoricals
+
+    ``categories`` (one list per categorical feature) fixes the one-hot
+    columns up front instead of learning them in fit, e.g. when they were
+    collected while streaming the data.
+    """
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), numeric_features),
+            ("cat", OneHotEncoder(categories=categories, handle_unknown="ignore", sparse_output=False),
+             categorical_features),
+        ],
+        remainder="drop",
+    )
+
+
+class CategoryCaster(TransformerMixin, BaseEstimator):
+    """
+    Model features as a DataFrame for XGBoost's native categorical support
+
+    Numerics become float32 and each categorical column a pandas Categorical
+    with the categories seen in fit (sorted, like OneHotEncoder), so the codes
+    are stable between training and scoring; unseen categories become missing.
+    As in OneHotEncoder, ``categories`` can fix them up front instead.
+    """
+
+    def __init__(self, numeric_features=NUMERIC_FEATURES, categorical_features=CATEGORICAL_FEATURES,
+                 categories="auto"):
+        self.numeric_features = numeric_features
+        self.categorical_features = categorical_features
+        self.categories = categories
+
+    def fit(self, X, y=None):
+        if isinstance(self.categories, str) and self.categories == "auto":
+            self.categories_ = [np.sort(pd.unique(X[col].dropna())) for col in self.categorical_features]
+        else:
+            self.categories_ = [np.sort(np.asarray(cats)) for cats in self.categories]
+        return self
+
+    def transform(self, X):
+        out = X[list(self.numeric_features)].astype(np.float32)
+        for col, cats in zip(self.categorical_features, self.categories_):
+            out[col] = pd.Categorical(X[col], categories=cats)
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(list(self.numeric_features) + list(self.categorical_features), dtype=object)
+
+
+def make_classifiers(n_jobs=-1, params=None):
+    """
+    The three candidate classifiers (Logistic Regression, Random Forest, XGBoost)
+
+    ``params`` maps a candidate name to hyperparameters that override the
+    defaults below (e.g. the output of hyperparam_search.tune_candidates).
+    """
+    models = {
+        "Logistic Regression": LogisticRegression(
+            max_iter=500, class_weight="balanced", random_state=42
+        ),
+        "Random Forest": RandomForestClassifier(
+            n_estimators=300, random_state=42, n_jobs=n_jobs,
+            class_weight="balanced", max_depth=15
+        ),
+        "XGBoost": XGBClassifier(
+            n_estimators=300, learning_rate=0.1, max_depth=6, tree_method="hist",
+            random_state=42, n_jobs=n_jobs, eval_metric='logloss'
+        ),
+    }
+    for name, overrides in (params or {}).items():
+        models[name].set_params(**overrides)
+    return models
+
+
+class PreprocessedSplit:
+    """
+    Preprocessor fitted once on a training split, plus its design matrices
+
+    The transformed train/test matrices are cached as dense C-contiguous
+    float32 arrays, so every candidate classifier reuses them instead of
+    refitting the scaler/encoder and re-transforming the data.
+    """
+
+    def __init__(self, preprocessor, X_train, X_test=None, dtype=np.float32):
+        self.preprocessor = clone(preprocessor).fit(X_train)
+        self.X_train = self.transform(X_train, dtype)
+        self.X_test = self.transform(X_test, dtype) if X_test is not None else None
+
+    def transform(self, X, dtype=np.float32):
+        return np.ascontiguousarray(self.preprocessor.transform(X), dtype=dtype)
+
+    def pipeline(self, clf):
+        """Deployable Pipeline combining the fitted preprocessor and a fitted classifier"""
+        return Pipeline([("pre", self.preprocessor), ("clf", clf)])
+
+
+class PreprocessingCache:
+    """PreprocessedSplit per split key (e.g. 'holdout' or a CV fold number)"""
+
+    def __init__(self, preprocessor):
+        self.preprocessor = preprocessor
+        self._splits = {}
+
+    def get(self, key, X_train, X_test=None):
+        split = self._splits.get(key)
+        if split is None:
+            split = PreprocessedSplit(self.preprocessor, X_train, X_test)
+            self._splits[key] = split
+        return split
+
+    def __len__(self):
+        return len(self._splits)
+
+
+def evaluate_model(model, X_test, y_test, threshold=0.5):
+    """Test-set metrics in the shape of the training script's ``results`` entries"""
+    return {'model': model, **evaluate_scores(y_test, model.predict_proba(X_test)[:, 1], threshold)}
+
+
+def evaluate_scores(y_test, y_pred_proba, threshold=0.5):
+    """evaluate_model for already computed churn probabilities"""
+    y_pred = (y_pred_proba >= threshold).astype(int)
+    return {
+        'auc': roc_auc_score(y_test, y_pred_proba),
+        'accuracy': accuracy_score(y_test, y_pred),
+        'precision': precision_score(y_test, y_pred, zero_division=0),
+        'recall': recall_score(y_test, y_pred, zero_division=0),
+        'f1': f1_score(y_test, y_pred, zero_division=0),
+        'predictions_proba': y_pred_proba,
+        'predictions': y_pred
+    }
@@ -1,10 +1,25 @@
 # Churn Prediction System - Complete Enhanced Version
 # This notebook includes all required components for the internship project
+#
+# The analysis runs as named stages (load -> explore -> cube -> eda -> features ->
+# split -> preprocess -> tune -> cv -> train -> compare -> evaluate -> metrics ->
+# importance -> segment -> save -> score -> insights). Each stage's outputs are checkpointed under
+# .cache/stages, keyed by the data's content hash, the stage's code and
+# config, and its upstream stages, so a rerun only redoes what changed:
+#
+#   python churn_prediction_complete.py                 # run stale stages
+#   python churn_prediction_complete.py --from segment  # rerun segment onward
+#   python churn_prediction_complete.py --only eda      # redraw one figure
+#   python churn_prediction_complete.py --list          # show stage status
 
 # ============================================================================
 # 1. IMPORTS AND SETUP
 # ============================================================================
 
+import argparse
+import textwrap
+import time
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -14,759 +29,1030 @@ import warnings
 warnings.filterwarnings('ignore')
 
 # ML Libraries
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     classification_report, confusion_matrix, ConfusionMatrixDisplay,
-    RocCurveDisplay, roc_auc_score, precision_recall_curve, auc,
-    accuracy_score, precision_score, recall_score, f1_score, roc_curve
+    RocCurveDisplay, precision_recall_curve, auc, roc_curve
 )
 import joblib
 
-# XGBoost
-try:
-    from xgboost import XGBClassifier
-    print("✓ XGBoost imported successfully")
-except ImportError:
-    print("⚠ XGBoost not installed. Installing...")
-    import subprocess
-    subprocess.check_call(["pip", "install", "xgboost", "--break-system-packages"])
-    from xgboost import XGBClassifier
+from churn_cube import CUBE_PATH, ChurnCube, profile_path
+from churn_data import CSV_PATH, load_customers, content_hash
+from churn_features import (
+    TARGET, NUMERIC_FEATURES, CATEGORICAL_FEATURES, RISK_THRESHOLDS, RISK_LABELS, risk_segment,
+    FEATURE_INFO_PATH, IMPORTANCE_PATH, METRICS_PATH, SCORE_TABLE_PATH, SCORER_DIR, add_engineered_features,
+    model_filename
+)
+from batch_score import score_with_ids, row_hashes, model_fingerprint, write_score_table
+from fast_scorer import compile_pipeline
+from model_registry import REGISTRY_DIR, ModelRegistry
+# Scoring lives in the lightweight churn_scoring module; re-exported for existing callers
+from churn_scoring import predict_churn  # noqa: F401
+
+from churn_models import make_preprocessor, make_classifiers, PreprocessedSplit
+from train_scheduler import allocate_cpus, train_candidates, cross_validate_candidates
+from xgb_fast import FastXGBClassifier
+from stream_train import train_streaming, save_streaming_model
+from hyperparam_search import SEARCH_SPACES, TUNING_TRACE_PATH, tune_candidates, save_trace
+from permutation_importance import permutation_importance, save_importance
+from run_metrics import candidate_metrics, save_run_metrics
+from threshold_analysis import threshold_curve, metrics_at, optimal_threshold
+from pipeline_stages import STAGE_CACHE_DIR, Stage, StagePipeline
+from perf_trace import TRACE_PATH, Tracer
+
+# Run configuration; a stage reruns when any key it reads changes
+CONFIG = {
+    'csv_path': str(CSV_PATH),
+    'test_size': 0.2,
+    'random_state': 42,
+    'tune_budget_s': 120,            # Successive-halving budget per tuned model (0 = defaults)
+    'tune_configs': 27,              # Configurations in the first halving rung
+    'cv_folds': 5,                   # Stratified folds used to pick the best model
+    'xgb_fast': True,                # XGBoost on native categoricals, quantized once, early-stopped
+    'memory_cap_mb': 1024,           # Peak memory for --stream (out-of-core) training
+    'threshold_objective': 'f1',     # 'f1' or 'cost'
+    'cost_false_positive': 1.0,      # Retention offer sent to a customer who would have stayed
+    'cost_false_negative': 5.0,      # Churner we failed to contact
+    'importance_repeats': 5,         # Permutations per feature for the permutation importance
+    'latency_calls': 1000,           # Single-row predictions timed per candidate (p50/p99 latency)
+    'figure_dpi': 300,
+}
 
-# Set style
-plt.style.use('seaborn-v0_8-darkgrid')
-sns.set_palette("husl")
 
-print("=" * 70)
-print("CHURN PREDICTION SYSTEM - COMPLETE ANALYSIS")
-print("=" * 70)
+def set_plot_style():
+    plt.style.use('seaborn-v0_8-darkgrid')
+    sns.set_palette("husl")
+
 
 # ============================================================================
 # 2. DATA LOADING AND INITIAL EXPLORATION
 # ============================================================================
 
-CSV_PATH = Path("Churn_Modelling.csv")
-df = pd.read_csv(CSV_PATH)
+def stage_load(ctx):
+    # Compact dtypes; repeat runs read the content-hashed Parquet cache
+    df = load_customers(ctx['csv_path'])
+
+    print(f"\n📊 Dataset Shape: {df.shape}")
+    print(f"📅 Total Customers: {df.shape[0]:,}")
+    print(f"🔢 Total Features: {df.shape[1]}")
+    print("\n" + "=" * 70)
+    return {'df': df}
+
+
+def data_fingerprint(config):
+    """Content hash of the input CSV, so edited data invalidates every stage"""
+    return content_hash(config['csv_path'])
 
-print(f"\n📊 Dataset Shape: {df.shape}")
-print(f"📅 Total Customers: {df.shape[0]:,}")
-print(f"🔢 Total Features: {df.shape[1]}")
-print("\n" + "=" * 70)
 
 # ============================================================================
 # 3. COMPREHENSIVE DATA EXPLORATION
 # ============================================================================
 
-print("\n🔍 DATA TYPES:")
-print(df.dtypes)
+def stage_explore(ctx):
+    df = ctx['df']
+
+    print("\n🔍 DATA TYPES:")
+    print(df.dtypes)
 
-print("\n🔍 MISSING VALUES:")
-missing_pct = (df.isna().mean() * 100).sort_values(ascending=False)
-print(missing_pct[missing_pct > 0] if missing_pct.sum() > 0 else "✓ No missing values!")
+    print("\n🔍 MISSING VALUES:")
+    missing_pct = (df.isna().mean() * 100).sort_values(ascending=False)
+    print(missing_pct[missing_pct > 0] if missing_pct.sum() > 0 else "✓ No missing values!")
 
-print("\n🔍 BASIC STATISTICS:")
-print(df.describe())
+    print("\n🔍 BASIC STATISTICS:")
+    print(df.describe())
+
+    # Target Variable Analysis
+    print(f"\n🎯 TARGET VARIABLE DISTRIBUTION ({TARGET}):")
+    churn_dist = df[TARGET].value_counts()
+    churn_pct = df[TARGET].value_counts(normalize=True) * 100
+    print(f"  Not Churned (0): {churn_dist[0]:,} ({churn_pct[0]:.2f}%)")
+    print(f"  Churned (1): {churn_dist[1]:,} ({churn_pct[1]:.2f}%)")
+    print(f"  Churn Rate: {churn_pct[1]:.2f}%")
+    return {}
 
-# Target Variable Analysis
-TARGET = "Exited"
-print(f"\n🎯 TARGET VARIABLE DISTRIBUTION ({TARGET}):")
-churn_dist = df[TARGET].value_counts()
-churn_pct = df[TARGET].value_counts(normalize=True) * 100
-print(f"  Not Churned (0): {churn_dist[0]:,} ({churn_pct[0]:.2f}%)")
-print(f"  Churned (1): {churn_dist[1]:,} ({churn_pct[1]:.2f}%)")
-print(f"  Churn Rate: {churn_pct[1]:.2f}%")
 
 # ============================================================================
 # 4. ADVANCED EXPLORATORY DATA ANALYSIS (EDA)
 # ============================================================================
 
-print("\n" + "=" * 70)
-print("📊 GENERATING VISUALIZATIONS...")
-print("=" * 70)
-
-# Create a figure for multiple subplots
-fig = plt.figure(figsize=(20, 15))
-
-# 4.1 Target Distribution
-plt.subplot(3, 4, 1)
-df[TARGET].value_counts().plot(kind='bar', color=['green', 'red'])
-plt.title('Churn Distribution', fontsize=12, fontweight='bold')
-plt.xlabel('Exited (0=No, 1=Yes)')
-plt.ylabel('Count')
-plt.xticks(rotation=0)
-
-# 4.2 Churn Rate by Geography
-plt.subplot(3, 4, 2)
-churn_by_geo = df.groupby('Geography')[TARGET].mean() * 100
-churn_by_geo.plot(kind='bar', color='coral')
-plt.title('Churn Rate by Geography', fontsize=12, fontweight='bold')
-plt.xlabel('Country')
-plt.ylabel('Churn Rate (%)')
-plt.xticks(rotation=45)
-
-# 4.3 Churn Rate by Gender
-plt.subplot(3, 4, 3)
-churn_by_gender = df.groupby('Gender')[TARGET].mean() * 100
-churn_by_gender.plot(kind='bar', color='skyblue')
-plt.title('Churn Rate by Gender', fontsize=12, fontweight='bold')
-plt.xlabel('Gender')
-plt.ylabel('Churn Rate (%)')
-plt.xticks(rotation=0)
-
-# 4.4 Age Distribution by Churn
-plt.subplot(3, 4, 4)
-df[df[TARGET]==0]['Age'].hist(alpha=0.5, label='Not Churned', bins=20, color='green')
-df[df[TARGET]==1]['Age'].hist(alpha=0.5, label='Churned', bins=20, color='red')
-plt.title('Age Distribution by Churn', fontsize=12, fontweight='bold')
-plt.xlabel('Age')
-plt.ylabel('Frequency')
-plt.legend()
-
-# 4.5 Balance Distribution by Churn
-plt.subplot(3, 4, 5)
-df[df[TARGET]==0]['Balance'].hist(alpha=0.5, label='Not Churned', bins=20, color='green')
-df[df[TARGET]==1]['Balance'].hist(alpha=0.5, label='Churned', bins=20, color='red')
-plt.title('Balance Distribution by Churn', fontsize=12, fontweight='bold')
-plt.xlabel('Balance')
-plt.ylabel('Frequency')
-plt.legend()
-
-# 4.6 Churn by Number of Products
-plt.subplot(3, 4, 6)
-churn_by_products = df.groupby('NumOfProducts')[TARGET].mean() * 100
-churn_by_products.plot(kind='bar', color='purple')
-plt.title('Churn Rate by Number of Products', fontsize=12, fontweight='bold')
-plt.xlabel('Number of Products')
-plt.ylabel('Churn Rate (%)')
-plt.xticks(rotation=0)
-
-# 4.7 Churn by Active Membership
-plt.subplot(3, 4, 7)
-churn_by_active = df.groupby('IsActiveMember')[TARGET].mean() * 100
-churn_by_active.plot(kind='bar', color='orange')
-plt.title('Churn Rate by Active Membership', fontsize=12, fontweight='bold')
-plt.xlabel('Is Active Member (0=No, 1=Yes)')
-plt.ylabel('Churn Rate (%)')
-plt.xticks(rotation=0)
-
-# 4.8 Churn by Tenure
-plt.subplot(3, 4, 8)
-churn_by_tenure = df.groupby('Tenure')[TARGET].mean() * 100
-churn_by_tenure.plot(kind='line', marker='o', color='teal')
-plt.title('Churn Rate by Tenure', fontsize=12, fontweight='bold')
-plt.xlabel('Tenure (years)')
-plt.ylabel('Churn Rate (%)')
-plt.grid(alpha=0.3)
-
-# 4.9 Credit Score by Churn
-plt.subplot(3, 4, 9)
-df.boxplot(column='CreditScore', by=TARGET, ax=plt.gca())
-plt.title('Credit Score by Churn Status', fontsize=12, fontweight='bold')
-plt.suptitle('')
-plt.xlabel('Exited (0=No, 1=Yes)')
-plt.ylabel('Credit Score')
-
-# 4.10 Age by Churn (Boxplot)
-plt.subplot(3, 4, 10)
-df.boxplot(column='Age', by=TARGET, ax=plt.gca())
-plt.title('Age by Churn Status', fontsize=12, fontweight='bold')
-plt.suptitle('')
-plt.xlabel('Exited (0=No, 1=Yes)')
-plt.ylabel('Age')
-
-# 4.11 Correlation Heatmap
-plt.subplot(3, 4, 11)
-numeric_cols = df.select_dtypes(include=[np.number]).columns
-corr_matrix = df[numeric_cols].corr()
-sns.heatmap(corr_matrix[['Exited']].sort_values(by='Exited', ascending=False), 
-            annot=True, cmap='coolwarm', center=0, ax=plt.gca())
-plt.title('Correlation with Churn', fontsize=12, fontweight='bold')
-
-# 4.12 Churn by Credit Card Ownership
-plt.subplot(3, 4, 12)
-churn_by_card = df.groupby('HasCrCard')[TARGET].mean() * 100
-churn_by_card.plot(kind='bar', color='pink')
-plt.title('Churn Rate by Credit Card Ownership', fontsize=12, fontweight='bold')
-plt.xlabel('Has Credit Card (0=No, 1=Yes)')
-plt.ylabel('Churn Rate (%)')
-plt.xticks(rotation=0)
-
-plt.tight_layout()
-plt.savefig('eda_comprehensive.png', dpi=300, bbox_inches='tight')
-plt.show()
-
-print("✓ EDA visualizations saved as 'eda_comprehensive.png'")
+def stage_cube(ctx):
+    # One pass over the customers; the EDA figure and the dashboard read roll-ups of it
+    cube = ChurnCube.from_frame(ctx['df'])
+    cube.save(CUBE_PATH)
+    print(f"\n✓ Churn cube: {len(cube):,} cells saved as '{CUBE_PATH}'")
+    return {'cube': cube}
+
+
+def stage_eda(ctx):
+    # Churn-rate and distribution panels come from the cube; the box plots and
+    # correlations need the raw values
+    df, cube = ctx['df'], ctx['cube']
+
+    print("\n" + "=" * 70)
+    print("📊 GENERATING VISUALIZATIONS...")
+    print("=" * 70)
+
+    # Create a figure for multiple subplots
+    fig = plt.figure(figsize=(20, 15))
+
+    # 4.1 Target Distribution
+    plt.subplot(3, 4, 1)
+    customers, churned = cube.totals()
+    pd.Series({0: customers - churned, 1: churned}).plot(kind='bar', color=['green', 'red'])
+    plt.title('Churn Distribution', fontsize=12, fontweight='bold')
+    plt.xlabel('Exited (0=No, 1=Yes)')
+    plt.ylabel('Count')
+    plt.xticks(rotation=0)
+
+    # 4.2 Churn Rate by Geography
+    plt.subplot(3, 4, 2)
+    churn_by_geo = cube.churn_rate('Geography')
+    churn_by_geo.plot(kind='bar', color='coral')
+    plt.title('Churn Rate by Geography', fontsize=12, fontweight='bold')
+    plt.xlabel('Country')
+    plt.ylabel('Churn Rate (%)')
+    plt.xticks(rotation=45)
+
+    # 4.3 Churn Rate by Gender
+    plt.subplot(3, 4, 3)
+    churn_by_gender = cube.churn_rate('Gender')
+    churn_by_gender.plot(kind='bar', color='skyblue')
+    plt.title('Churn Rate by Gender', fontsize=12, fontweight='bold')
+    plt.xlabel('Gender')
+    plt.ylabel('Churn Rate (%)')
+    plt.xticks(rotation=0)
+
+    # 4.4 Age Distribution by Churn
+    plt.subplot(3, 4, 4)
+    ages = cube.rollup('AgeBin')[['retained', 'churned']].rename(
+        columns={'retained': 'Not Churned', 'churned': 'Churned'})
+    ages.plot(kind='bar', alpha=0.7, color=['green', 'red'], width=0.9, ax=plt.gca())
+    plt.title('Age Distribution by Churn', fontsize=12, fontweight='bold')
+    plt.xlabel('Age')
+    plt.ylabel('Frequency')
+    plt.legend()
+
+    # 4.5 Balance Distribution by Churn
+    plt.subplot(3, 4, 5)
+    balances = cube.rollup('BalanceBin')[['retained', 'churned']].rename(
+        columns={'retained': 'Not Churned', 'churned': 'Churned'})
+    balances.plot(kind='bar', alpha=0.7, color=['green', 'red'], width=0.9, ax=plt.gca())
+    plt.title('Balance Distribution by Churn', fontsize=12, fontweight='bold')
+    plt.xlabel('Balance')
+    plt.ylabel('Frequency')
+    plt.legend()
+
+    # 4.6 Churn by Number of Products
+    plt.subplot(3, 4, 6)
+    churn_by_products = cube.churn_rate('NumOfProducts')
+    churn_by_products.plot(kind='bar', color='purple')
+    plt.title('Churn Rate by Number of Products', fontsize=12, fontweight='bold')
+    plt.xlabel('Number of Products')
+    plt.ylabel('Churn Rate (%)')
+    plt.xticks(rotation=0)
+
+    # 4.7 Churn by Active Membership
+    plt.subplot(3, 4, 7)
+    churn_by_active = cube.churn_rate('IsActiveMember')
+    churn_by_active.plot(kind='bar', color='orange')
+    plt.title('Churn Rate by Active Membership', fontsize=12, fontweight='bold')
+    plt.xlabel('Is Active Member (0=No, 1=Yes)')
+    plt.ylabel('Churn Rate (%)')
+    plt.xticks(rotation=0)
+
+    # 4.8 Churn by Tenure
+    plt.subplot(3, 4, 8)
+    churn_by_tenure = cube.churn_rate('Tenure')
+    churn_by_tenure.plot(kind='line', marker='o', color='teal')
+    plt.title('Churn Rate by Tenure', fontsize=12, fontweight='bold')
+    plt.xlabel('Tenure (years)')
+    plt.ylabel('Churn Rate (%)')
+    plt.grid(alpha=0.3)
+
+    # 4.9 Credit Score by Churn
+    plt.subplot(3, 4, 9)
+    df.boxplot(column='CreditScore', by=TARGET, ax=plt.gca())
+    plt.title('Credit Score by Churn Status', fontsize=12, fontweight='bold')
+    plt.suptitle('')
+    plt.xlabel('Exited (0=No, 1=Yes)')
+    plt.ylabel('Credit Score')
+
+    # 4.10 Age by Churn (Boxplot)
+    plt.subplot(3, 4, 10)
+    df.boxplot(column='Age', by=TARGET, ax=plt.gca())
+    plt.title('Age by Churn Status', fontsize=12, fontweight='bold')
+    plt.suptitle('')
+    plt.xlabel('Exited (0=No, 1=Yes)')
+    plt.ylabel('Age')
+
+    # 4.11 Correlation Heatmap
+    plt.subplot(3, 4, 11)
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    corr_matrix = df[numeric_cols].corr()
+    sns.heatmap(corr_matrix[['Exited']].sort_values(by='Exited', ascending=False),
+                annot=True, cmap='coolwarm', center=0, ax=plt.gca())
+    plt.title('Correlation with Churn', fontsize=12, fontweight='bold')
+
+    # 4.12 Churn by Credit Card Ownership
+    plt.subplot(3, 4, 12)
+    churn_by_card = cube.churn_rate('HasCrCard')
+    churn_by_card.plot(kind='bar', color='pink')
+    plt.title('Churn Rate by Credit Card Ownership', fontsize=12, fontweight='bold')
+    plt.xlabel('Has Credit Card (0=No, 1=Yes)')
+    plt.ylabel('Churn Rate (%)')
+    plt.xticks(rotation=0)
+
+    plt.tight_layout()
+    plt.savefig('eda_comprehensive.png', dpi=ctx['figure_dpi'], bbox_inches='tight')
+    plt.show()
+
+    print("✓ EDA visualizations saved as 'eda_comprehensive.png'")
+    return {}
+
 
 # ============================================================================
 # 5. FEATURE ENGINEERING
 # ============================================================================
 
-print("\n" + "=" * 70)
-print("🔧 FEATURE ENGINEERING")
-print("=" * 70)
+def stage_features(ctx):
+    df = ctx['df'].copy()
 
-# Create age groups
-df['AgeGroup'] = pd.cut(df['Age'], bins=[0, 30, 50, 100], labels=['Young', 'Middle', 'Senior'])
+    print("\n" + "=" * 70)
+    print("🔧 FEATURE ENGINEERING")
+    print("=" * 70)
 
-# Create balance bins
-df['BalanceGroup'] = pd.cut(df['Balance'], bins=[-1, 0, 50000, 100000, 250000], 
-                              labels=['Zero', 'Low', 'Medium', 'High'])
+    # Create age groups
+    df['AgeGroup'] = pd.cut(df['Age'], bins=[0, 30, 50, 100], labels=['Young', 'Middle', 'Senior'])
 
-# Engagement score (composite feature)
-df['EngagementScore'] = (df['IsActiveMember'] * 2 + 
-                          df['HasCrCard'] + 
-                          df['NumOfProducts']) / 4
+    # Create balance bins
+    df['BalanceGroup'] = pd.cut(df['Balance'], bins=[-1, 0, 50000, 100000, 250000],
+                                labels=['Zero', 'Low', 'Medium', 'High'])
 
-# Tenure group
-df['TenureGroup'] = pd.cut(df['Tenure'], bins=[0, 2, 5, 10], labels=['New', 'Mid', 'Long'])
+    # Tenure group
+    df['TenureGroup'] = pd.cut(df['Tenure'], bins=[0, 2, 5, 10], labels=['New', 'Mid', 'Long'])
 
-# CLV Proxy (simplified)
-df['CLV_Proxy'] = df['Balance'] * df['Tenure'] * 0.0001  # Normalized
+    # Engagement score (composite feature) and CLV proxy (simplified)
+    add_engineered_features(df)
+
+    print("✓ Created AgeGroup: Young/Middle/Senior")
+    print("✓ Created BalanceGroup: Zero/Low/Medium/High")
+    print("✓ Created EngagementScore: 0-1 scale")
+    print("✓ Created TenureGroup: New/Mid/Long")
+    print("✓ Created CLV_Proxy: Customer Lifetime Value estimate")
+    return {'df': df}
 
-print("✓ Created AgeGroup: Young/Middle/Senior")
-print("✓ Created BalanceGroup: Zero/Low/Medium/High")
-print("✓ Created EngagementScore: 0-1 scale")
-print("✓ Created TenureGroup: New/Mid/Long")
-print("✓ Created CLV_Proxy: Customer Lifetime Value estimate")
 
 # ============================================================================
 # 6. DATA PREPARATION FOR MODELING
 # ============================================================================
 
-print("\n" + "=" * 70)
-print("🔨 PREPARING DATA FOR MODELING")
-print("=" * 70)
+def stage_split(ctx):
+    df = ctx['df']
 
-# Define features (excluding newly engineered categorical features for simplicity)
-drop_cols = ["RowNumber", "CustomerId", "Surname", TARGET, 
-             "AgeGroup", "BalanceGroup", "TenureGroup"]  # Drop engineered categoricals
-feature_cols = [c for c in df.columns if c not in drop_cols]
+    print("\n" + "=" * 70)
+    print("🔨 PREPARING DATA FOR MODELING")
+    print("=" * 70)
 
-NUMERIC_FEATURES = [
-    "CreditScore", "Age", "Tenure", "Balance",
-    "NumOfProducts", "HasCrCard", "IsActiveMember", "EstimatedSalary",
-    "EngagementScore", "CLV_Proxy"  # Add engineered numeric features
-]
-CATEGORICAL_FEATURES = ["Geography", "Gender"]
+    # NUMERIC_FEATURES (including the engineered EngagementScore and CLV_Proxy)
+    # and CATEGORICAL_FEATURES are shared with the app and batch scorer
 
-# Ensure all features exist
-NUMERIC_FEATURES = [c for c in NUMERIC_FEATURES if c in df.columns]
-CATEGORICAL_FEATURES = [c for c in CATEGORICAL_FEATURES if c in df.columns]
+    # Ensure all features exist
+    numeric_features = [c for c in NUMERIC_FEATURES if c in df.columns]
+    categorical_features = [c for c in CATEGORICAL_FEATURES if c in df.columns]
 
-print(f"📊 Numeric Features ({len(NUMERIC_FEATURES)}): {NUMERIC_FEATURES}")
-print(f"📊 Categorical Features ({len(CATEGORICAL_FEATURES)}): {CATEGORICAL_FEATURES}")
+    print(f"📊 Numeric Features ({len(numeric_features)}): {numeric_features}")
+    print(f"📊 Categorical Features ({len(categorical_features)}): {categorical_features}")
 
-# Prepare X and y
-X = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES].copy()
-y = df[TARGET].astype(int)
+    # Prepare X and y
+    X = df[numeric_features + categorical_features].copy()
+    y = df[TARGET].astype(int)
 
-# Train-test split with stratification
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
+    # Train-test split with stratification
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=ctx['test_size'], random_state=ctx['random_state'], stratify=y
+    )
+
+    print(f"\n✓ Training set: {X_train.shape}")
+    print(f"✓ Test set: {X_test.shape}")
+    return {
+        'numeric_features': numeric_features,
+        'categorical_features': categorical_features,
+        'X_train': X_train, 'X_test': X_test,
+        'y_train': y_train, 'y_test': y_test,
+    }
 
-print(f"\n✓ Training set: {X_train.shape}")
-print(f"✓ Test set: {X_test.shape}")
 
 # ============================================================================
 # 7. BUILD PREPROCESSING PIPELINE
 # ============================================================================
 
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("num", StandardScaler(), NUMERIC_FEATURES),
-        ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), CATEGORICAL_FEATURES),
-    ],
-    remainder="drop",
-)
-
-print("✓ Preprocessing pipeline created")
+def stage_preprocess(ctx):
+    preprocessor = make_preprocessor(ctx['numeric_features'], ctx['categorical_features'])
 
-# ============================================================================
-# 8. TRAIN MULTIPLE MODELS (Logistic Regression, Random Forest, XGBoost)
-# ============================================================================
+    # Fit the scaler/encoder once and share the float32 design matrices across all models
+    holdout = PreprocessedSplit(preprocessor, ctx['X_train'], ctx['X_test'])
 
-print("\n" + "=" * 70)
-print("🤖 TRAINING CLASSIFICATION MODELS")
-print("=" * 70)
-
-# Define models
-models = {
-    "Logistic Regression": Pipeline([
-        ("pre", preprocessor),
-        ("clf", LogisticRegression(max_iter=500, class_weight="balanced", random_state=42)),
-    ]),
-    "Random Forest": Pipeline([
-        ("pre", preprocessor),
-        ("clf", RandomForestClassifier(
-            n_estimators=300, random_state=42, n_jobs=-1, 
-            class_weight="balanced", max_depth=15
-        )),
-    ]),
-    "XGBoost": Pipeline([
-        ("pre", preprocessor),
-        ("clf", XGBClassifier(
-            n_estimators=300, learning_rate=0.1, max_depth=6,
-            random_state=42, n_jobs=-1, eval_metric='logloss'
-        )),
-    ])
-}
+    print("✓ Preprocessing pipeline created")
+    print(f"✓ Shared design matrices: train {holdout.X_train.shape}, test {holdout.X_test.shape} "
+          f"({holdout.X_train.dtype})")
+    return {'holdout': holdout}
 
-# Train and evaluate models
-results = {}
-best_name, best_model, best_auc = None, None, -1.0
-
-for name, model in models.items():
-    print(f"\n🔄 Training {name}...")
-    model.fit(X_train, y_train)
-    
-    # Predictions
-    y_pred_proba = model.predict_proba(X_test)[:, 1]
-    y_pred = (y_pred_proba >= 0.5).astype(int)
-    
-    # Metrics
-    auc_score = roc_auc_score(y_test, y_pred_proba)
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred, zero_division=0)
-    recall = recall_score(y_test, y_pred, zero_division=0)
-    f1 = f1_score(y_test, y_pred, zero_division=0)
-    
-    results[name] = {
-        'model': model,
-        'auc': auc_score,
-        'accuracy': accuracy,
-        'precision': precision,
-        'recall': recall,
-        'f1': f1,
-        'predictions_proba': y_pred_proba,
-        'predictions': y_pred
-    }
-    
-    if auc_score > best_auc:
-        best_name, best_model, best_auc = name, model, auc_score
-    
-    print(f"  ✓ AUC: {auc_score:.4f}")
-    print(f"  ✓ Accuracy: {accuracy:.4f}")
-    print(f"  ✓ Precision: {precision:.4f}")
-    print(f"  ✓ Recall: {recall:.4f}")
-    print(f"  ✓ F1-Score: {f1:.4f}")
 
-print("\n" + "=" * 70)
-print(f"🏆 BEST MODEL: {best_name} (AUC = {best_auc:.4f})")
-print("=" * 70)
+def candidate_models(ctx, params=None, n_jobs=-1):
+    """
+    The candidate classifiers for tuning, CV and training
 
-# ============================================================================
-# 9. MODEL COMPARISON VISUALIZATION
-# ============================================================================
+    With ``xgb_fast`` XGBoost is the fast path (native categoricals, early
+    stopping, trained on the raw feature rows) in all three, so the model
+    that is tuned and cross-validated is the one that gets deployed.
+    """
+    models = make_classifiers(n_jobs=n_jobs, params=params)
+    if ctx['xgb_fast']:
+        models['XGBoost'] = FastXGBClassifier(
+            models['XGBoost'], ctx['numeric_features'], ctx['categorical_features'],
+            n_jobs=n_jobs, random_state=ctx['random_state']
+        )
+    return models
 
-print("\n📊 Creating model comparison visualizations...")
-
-fig = plt.figure(figsize=(18, 10))
-
-# 9.1 AUC Comparison
-plt.subplot(2, 3, 1)
-auc_scores = {name: results[name]['auc'] for name in results}
-plt.bar(auc_scores.keys(), auc_scores.values(), color=['blue', 'green', 'orange'])
-plt.title('Model Comparison: AUC Score', fontsize=14, fontweight='bold')
-plt.ylabel('AUC Score')
-plt.ylim([0.7, 1.0])
-plt.xticks(rotation=15)
-for i, (name, score) in enumerate(auc_scores.items()):
-    plt.text(i, score + 0.01, f'{score:.4f}', ha='center', va='bottom', fontweight='bold')
-
-# 9.2 Accuracy Comparison
-plt.subplot(2, 3, 2)
-acc_scores = {name: results[name]['accuracy'] for name in results}
-plt.bar(acc_scores.keys(), acc_scores.values(), color=['blue', 'green', 'orange'])
-plt.title('Model Comparison: Accuracy', fontsize=14, fontweight='bold')
-plt.ylabel('Accuracy')
-plt.ylim([0.7, 1.0])
-plt.xticks(rotation=15)
-for i, (name, score) in enumerate(acc_scores.items()):
-    plt.text(i, score + 0.01, f'{score:.4f}', ha='center', va='bottom', fontweight='bold')
-
-# 9.3 F1-Score Comparison
-plt.subplot(2, 3, 3)
-f1_scores = {name: results[name]['f1'] for name in results}
-plt.bar(f1_scores.keys(), f1_scores.values(), color=['blue', 'green', 'orange'])
-plt.title('Model Comparison: F1-Score', fontsize=14, fontweight='bold')
-plt.ylabel('F1-Score')
-plt.ylim([0.3, 0.7])
-plt.xticks(rotation=15)
-for i, (name, score) in enumerate(f1_scores.items()):
-    plt.text(i, score + 0.01, f'{score:.4f}', ha='center', va='bottom', fontweight='bold')
-
-# 9.4 Confusion Matrix for Best Model
-plt.subplot(2, 3, 4)
-cm = confusion_matrix(y_test, results[best_name]['predictions'])
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False)
-plt.title(f'Confusion Matrix: {best_name}', fontsize=14, fontweight='bold')
-plt.xlabel('Predicted')
-plt.ylabel('Actual')
-
-# 9.5 ROC Curves for All Models
-plt.subplot(2, 3, 5)
-for name in results:
-    fpr, tpr, _ = roc_curve(y_test, results[name]['predictions_proba'])
-    plt.plot(fpr, tpr, label=f"{name} (AUC={results[name]['auc']:.3f})")
-plt.plot([0, 1], [0, 1], 'k--', label='Random')
-plt.xlabel('False Positive Rate')
-plt.ylabel('True Positive Rate')
-plt.title('ROC Curves - All Models', fontsize=14, fontweight='bold')
-plt.legend(loc='lower right')
-plt.grid(alpha=0.3)
-
-# 9.6 Precision-Recall Curve for Best Model
-plt.subplot(2, 3, 6)
-precision, recall, _ = precision_recall_curve(y_test, results[best_name]['predictions_proba'])
-pr_auc = auc(recall, precision)
-plt.plot(recall, precision, marker='.', label=f'{best_name} (AUC={pr_auc:.3f})')
-plt.xlabel('Recall')
-plt.ylabel('Precision')
-plt.title(f'Precision-Recall Curve: {best_name}', fontsize=14, fontweight='bold')
-plt.legend()
-plt.grid(alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('model_comparison.png', dpi=300, bbox_inches='tight')
-plt.show()
-
-print("✓ Model comparison saved as 'model_comparison.png'")
 
 # ============================================================================
-# 10. DETAILED EVALUATION OF BEST MODEL
+# 7b. TUNE RANDOM FOREST AND XGBOOST (successive halving)
 # ============================================================================
 
-print("\n" + "=" * 70)
-print(f"📈 DETAILED EVALUATION: {best_name}")
-print("=" * 70)
+def stage_tune(ctx):
+    print("\n" + "=" * 70)
+    print("🎛  HYPERPARAMETER SEARCH")
+    print("=" * 70)
 
-best_proba = results[best_name]['predictions_proba']
-best_pred = results[best_name]['predictions']
+    if ctx['tune_budget_s'] <= 0:
+        print("Tuning disabled (tune_budget_s = 0); using the default hyperparameters")
+        save_trace([], TUNING_TRACE_PATH)
+        return {'tuned_params': {}}
 
-print("\n📊 CLASSIFICATION REPORT:")
-print(classification_report(y_test, best_pred, target_names=['Not Churned', 'Churned']))
+    # Cheap trials on a slice of the rows; only promising configs get more rows
+    tuned_params, trace = tune_candidates(
+        ctx['holdout'].X_train, ctx['y_train'], n_configs=ctx['tune_configs'],
+        budget_s=ctx['tune_budget_s'], random_state=ctx['random_state'],
+        models=candidate_models(ctx, n_jobs=1), X_raw=ctx['X_train']
+    )
+    save_trace(trace, TUNING_TRACE_PATH)
+    for name, params in tuned_params.items():
+        print(f"✓ {name}: {params}")
+    print(f"✓ Time-vs-AUC trace of {len(trace)} trials saved as '{TUNING_TRACE_PATH}'")
+    return {'tuned_params': tuned_params}
 
-# Threshold Analysis
-print("\n🎯 THRESHOLD SENSITIVITY ANALYSIS:")
-print("-" * 60)
-print(f"{'Threshold':<12} {'Precision':<12} {'Recall':<12} {'F1-Score':<12}")
-print("-" * 60)
 
-threshold_results = []
-for th in [0.30, 0.35, 0.40, 0.45, 0.50, 0.55, 0.60]:
-    pred_at_th = (best_proba >= th).astype(int)
-    prec = precision_score(y_test, pred_at_th, zero_division=0)
-    rec = recall_score(y_test, pred_at_th, zero_division=0)
-    f1_th = f1_score(y_test, pred_at_th, zero_division=0)
-    threshold_results.append({'threshold': th, 'precision': prec, 'recall': rec, 'f1': f1_th})
-    print(f"{th:<12.2f} {prec:<12.3f} {rec:<12.3f} {f1_th:<12.3f}")
+def tuning_space(config):
+    """Search spaces, so editing them reruns the search"""
+    return SEARCH_SPACES
 
-# Find optimal threshold (maximizing F1)
-optimal_th = max(threshold_results, key=lambda x: x['f1'])
-print(f"\n🎯 Optimal Threshold (max F1): {optimal_th['threshold']:.2f}")
-print(f"   Precision: {optimal_th['precision']:.3f}")
-print(f"   Recall: {optimal_th['recall']:.3f}")
-print(f"   F1-Score: {optimal_th['f1']:.3f}")
 
 # ============================================================================
-# 11. FEATURE IMPORTANCE ANALYSIS
+# 7c. CROSS-VALIDATE THE CANDIDATES
 # ============================================================================
 
-print("\n" + "=" * 70)
-print("🔍 FEATURE IMPORTANCE ANALYSIS")
-print("=" * 70)
-
-# Extract feature names
-clf = best_model.named_steps["clf"]
-pre = best_model.named_steps["pre"]
-
-# Get feature names after preprocessing
-cat_names = pre.named_transformers_['cat'].get_feature_names_out(CATEGORICAL_FEATURES)
-all_feature_names = NUMERIC_FEATURES + list(cat_names)
+def stage_cv(ctx):
+    n_folds = ctx['cv_folds']
 
-# Get feature importances
-if hasattr(clf, 'feature_importances_'):
-    importances = clf.feature_importances_
-elif hasattr(clf, 'coef_'):
-    importances = np.abs(clf.coef_[0])
-else:
-    importances = np.zeros(len(all_feature_names))
+    print("\n" + "=" * 70)
+    print(f"🔁 {n_folds}-FOLD STRATIFIED CROSS-VALIDATION")
+    print("=" * 70)
 
-# Create feature importance DataFrame
-feat_imp_df = pd.DataFrame({
-    'Feature': all_feature_names,
-    'Importance': importances
-}).sort_values('Importance', ascending=False)
+    # One 80/20 split makes "best by AUC" noisy; choose on the training split's folds instead
+    preprocessor = make_preprocessor(ctx['numeric_features'], ctx['categorical_features'])
+    cv_results, cv_wall_time, cv_task_time = cross_validate_candidates(
+        candidate_models(ctx, params=ctx['tuned_params']), preprocessor,
+        ctx['X_train'], ctx['y_train'], n_splits=n_folds, random_state=ctx['random_state']
+    )
 
-print("\n🏆 TOP 10 CHURN DRIVERS:")
-print(feat_imp_df.head(10).to_string(index=False))
-
-# Visualize feature importance
-plt.figure(figsize=(10, 8))
-feat_imp_df.head(15).sort_values('Importance').plot(
-    x='Feature', y='Importance', kind='barh', color='teal', legend=False
-)
-plt.title(f'Top 15 Churn Drivers - {best_name}', fontsize=14, fontweight='bold')
-plt.xlabel('Importance Score')
-plt.ylabel('Feature')
-plt.tight_layout()
-plt.savefig('feature_importance.png', dpi=300, bbox_inches='tight')
-plt.show()
+    print(f"{'Model':<22}{'AUC':>18}{'F1':>18}{'Fit (s)':>10}{'Predict (ms)':>14}")
+    for name, cv in cv_results.items():
+        print(f"{name:<22}{cv['auc_mean']:>10.4f} ± {cv['auc_std']:.4f}"
+              f"{cv['f1_mean']:>10.4f} ± {cv['f1_std']:.4f}"
+              f"{cv['fit_time_mean']:>10.2f}{cv['predict_time_mean'] * 1000:>14.1f}")
+    print(f"\n⏱ CV wall time: {cv_wall_time:.1f}s for {len(cv_results) * n_folds} fits "
+          f"(sequential fit + predict time: {cv_task_time:.1f}s)")
+    return {'cv_results': cv_results}
 
-print("\n✓ Feature importance saved as 'feature_importance.png'")
 
 # ============================================================================
-# 12. CHURN RISK SEGMENTATION
+# 8. TRAIN MULTIPLE MODELS (Logistic Regression, Random Forest, XGBoost)
 # ============================================================================
 
-print("\n" + "=" * 70)
-print("🎯 CUSTOMER RISK SEGMENTATION")
-print("=" * 70)
+def stage_train(ctx):
+    holdout, y_train, y_test = ctx['holdout'], ctx['y_train'], ctx['y_test']
+
+    print("\n" + "=" * 70)
+    print("🤖 TRAINING CLASSIFICATION MODELS")
+    print("=" * 70)
+
+    # Define models (tuned; LR/RF train on the shared matrices, fast-path XGBoost on the raw rows)
+    models = candidate_models(ctx, params=ctx['tuned_params'])
+
+    # Train all candidates concurrently, each with its own share of the CPUs
+    cpu_shares = allocate_cpus(list(models))
+    print("🔄 Training concurrently with CPU budget: " +
+          ", ".join(f"{name}={n} core(s)" for name, n in cpu_shares.items()))
+    results, _, train_wall_time = train_candidates(
+        models, holdout.X_train, y_train, holdout.X_test, y_test, raw=(ctx['X_train'], ctx['X_test'])
+    )
+
+    # Export each candidate as preprocessor + classifier so joblib.load consumers keep working
+    for name, res in results.items():
+        model = res['model']
+        if isinstance(model, FastXGBClassifier):
+            res['model'] = model.pipeline_
+            print(f"⚡ {name} fast path: native categoricals, quantized in {model.quantize_time_:.2f}s, "
+                  f"early-stopped at {model.n_rounds_} rounds")
+        else:
+            res['model'] = holdout.pipeline(model)
+
+    # Best by mean CV AUC; the holdout AUC is reported alongside
+    cv_results = ctx['cv_results']
+    best_name = max(cv_results, key=lambda name: cv_results[name]['auc_mean'])
+    holdout_best = max(results, key=lambda name: results[name]['auc'])
+    if holdout_best != best_name:
+        print(f"ℹ️  {holdout_best} has the best holdout AUC, but {best_name} has the best "
+              f"mean CV AUC and is selected")
+    best_model, best_auc = results[best_name]['model'], results[best_name]['auc']
+
+    for name, res in results.items():
+        print(f"\n✓ {name} (fit {res['fit_time']:.1f}s on {res['n_threads']} core(s))")
+        print(f"  ✓ AUC: {res['auc']:.4f}")
+        print(f"  ✓ Accuracy: {res['accuracy']:.4f}")
+        print(f"  ✓ Precision: {res['precision']:.4f}")
+        print(f"  ✓ Recall: {res['recall']:.4f}")
+        print(f"  ✓ F1-Score: {res['f1']:.4f}")
+
+    sequential_time = sum(res['fit_time'] for res in results.values())
+    print(f"\n⏱ Training wall time: {train_wall_time:.1f}s "
+          f"(sum of per-model fit times: {sequential_time:.1f}s)")
+
+    print("\n" + "=" * 70)
+    print(f"🏆 BEST MODEL: {best_name} (CV AUC = {cv_results[best_name]['auc_mean']:.4f} "
+          f"± {cv_results[best_name]['auc_std']:.4f}, holdout AUC = {best_auc:.4f})")
+    print("=" * 70)
+    return {'results': results, 'best_name': best_name,
+            'best_model': best_model, 'best_auc': best_auc}
+
+
+def candidate_params(config):
+    """Hyperparameters of the candidate models, so editing them retrains"""
+    return {name: clf.get_params() for name, clf in make_classifiers().items()}
 
-# Add predictions to test set
-X_test_with_risk = X_test.copy()
-X_test_with_risk['ChurnProbability'] = best_proba
-X_test_with_risk['ActualChurn'] = y_test.values
-
-# Create risk segments
-X_test_with_risk['RiskSegment'] = pd.cut(
-    X_test_with_risk['ChurnProbability'],
-    bins=[0, 0.3, 0.7, 1.0],
-    labels=['Low Risk', 'Medium Risk', 'High Risk']
-)
-
-# Summary by risk segment
-risk_summary = X_test_with_risk.groupby('RiskSegment').agg({
-    'ActualChurn': ['count', 'sum', 'mean'],
-    'ChurnProbability': 'mean',
-    'Age': 'mean',
-    'Balance': 'mean',
-    'CreditScore': 'mean'
-}).round(2)
-
-print("\n📊 RISK SEGMENT SUMMARY:")
-print(risk_summary)
-
-# Visualize risk distribution
-fig, axes = plt.subplots(1, 3, figsize=(18, 5))
-
-# Risk segment distribution
-axes[0].pie(
-    X_test_with_risk['RiskSegment'].value_counts(),
-    labels=X_test_with_risk['RiskSegment'].value_counts().index,
-    autopct='%1.1f%%',
-    colors=['green', 'yellow', 'red'],
-    startangle=90
-)
-axes[0].set_title('Customer Distribution by Risk Segment', fontsize=14, fontweight='bold')
-
-# Actual churn rate by risk segment
-risk_churn = X_test_with_risk.groupby('RiskSegment')['ActualChurn'].mean() * 100
-risk_churn.plot(kind='bar', ax=axes[1], color=['green', 'yellow', 'red'])
-axes[1].set_title('Actual Churn Rate by Risk Segment', fontsize=14, fontweight='bold')
-axes[1].set_ylabel('Churn Rate (%)')
-axes[1].set_xlabel('Risk Segment')
-axes[1].set_xticklabels(axes[1].get_xticklabels(), rotation=0)
-
-# Churn probability distribution
-axes[2].hist(X_test_with_risk['ChurnProbability'], bins=50, edgecolor='black')
-axes[2].axvline(0.3, color='green', linestyle='--', label='Low/Medium threshold')
-axes[2].axvline(0.7, color='red', linestyle='--', label='Medium/High threshold')
-axes[2].set_title('Distribution of Churn Probabilities', fontsize=14, fontweight='bold')
-axes[2].set_xlabel('Churn Probability')
-axes[2].set_ylabel('Number of Customers')
-axes[2].legend()
-
-plt.tight_layout()
-plt.savefig('risk_segmentation.png', dpi=300, bbox_inches='tight')
-plt.show()
-
-print("\n✓ Risk segmentation saved as 'risk_segmentation.png'")
-
-# High-risk customer profile
-print("\n⚠️ HIGH-RISK CUSTOMER PROFILE:")
-high_risk = X_test_with_risk[X_test_with_risk['RiskSegment'] == 'High Risk']
-print(f"  • Total high-risk customers: {len(high_risk)}")
-print(f"  • Actual churn rate: {high_risk['ActualChurn'].mean()*100:.1f}%")
-print(f"  • Average age: {high_risk['Age'].mean():.1f} years")
-print(f"  • Average balance: ${high_risk['Balance'].mean():,.2f}")
-print(f"  • Average credit score: {high_risk['CreditScore'].mean():.0f}")
 
 # ============================================================================
-# 13. SAVE THE BEST MODEL
+# 9. MODEL COMPARISON VISUALIZATION
 # ============================================================================
 
-print("\n" + "=" * 70)
-print("💾 SAVING MODEL")
-print("=" * 70)
-
-model_filename = f'best_churn_model_{best_name.replace(" ", "_").lower()}.pkl'
-joblib.dump(best_model, model_filename)
-print(f"✓ Model saved as '{model_filename}'")
+def stage_compare(ctx):
+    results, best_name, y_test = ctx['results'], ctx['best_name'], ctx['y_test']
+
+    print("\n📊 Creating model comparison visualizations...")
+
+    fig = plt.figure(figsize=(18, 10))
+
+    # 9.1 AUC Comparison
+    plt.subplot(2, 3, 1)
+    auc_scores = {name: results[name]['auc'] for name in results}
+    plt.bar(auc_scores.keys(), auc_scores.values(), color=['blue', 'green', 'orange'])
+    plt.title('Model Comparison: AUC Score', fontsize=14, fontweight='bold')
+    plt.ylabel('AUC Score')
+    plt.ylim([0.7, 1.0])
+    plt.xticks(rotation=15)
+    for i, (name, score) in enumerate(auc_scores.items()):
+        plt.text(i, score + 0.01, f'{score:.4f}', ha='center', va='bottom', fontweight='bold')
+
+    # 9.2 Accuracy Comparison
+    plt.subplot(2, 3, 2)
+    acc_scores = {name: results[name]['accuracy'] for name in results}
+    plt.bar(acc_scores.keys(), acc_scores.values(), color=['blue', 'green', 'orange'])
+    plt.title('Model Comparison: Accuracy', fontsize=14, fontweight='bold')
+    plt.ylabel('Accuracy')
+    plt.ylim([0.7, 1.0])
+    plt.xticks(rotation=15)
+    for i, (name, score) in enumerate(acc_scores.items()):
+        plt.text(i, score + 0.01, f'{score:.4f}', ha='center', va='bottom', fontweight='bold')
+
+    # 9.3 F1-Score Comparison
+    plt.subplot(2, 3, 3)
+    f1_scores = {name: results[name]['f1'] for name in results}
+    plt.bar(f1_scores.keys(), f1_scores.values(), color=['blue', 'green', 'orange'])
+    plt.title('Model Comparison: F1-Score', fontsize=14, fontweight='bold')
+    plt.ylabel('F1-Score')
+    plt.ylim([0.3, 0.7])
+    plt.xticks(rotation=15)
+    for i, (name, score) in enumerate(f1_scores.items()):
+        plt.text(i, score + 0.01, f'{score:.4f}', ha='center', va='bottom', fontweight='bold')
+
+    # 9.4 Confusion Matrix for Best Model
+    plt.subplot(2, 3, 4)
+    cm = confusion_matrix(y_test, results[best_name]['predictions'])
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False)
+    plt.title(f'Confusion Matrix: {best_name}', fontsize=14, fontweight='bold')
+    plt.xlabel('Predicted')
+    plt.ylabel('Actual')
+
+    # 9.5 ROC Curves for All Models
+    plt.subplot(2, 3, 5)
+    for name in results:
+        fpr, tpr, _ = roc_curve(y_test, results[name]['predictions_proba'])
+        plt.plot(fpr, tpr, label=f"{name} (AUC={results[name]['auc']:.3f})")
+    plt.plot([0, 1], [0, 1], 'k--', label='Random')
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title('ROC Curves - All Models', fontsize=14, fontweight='bold')
+    plt.legend(loc='lower right')
+    plt.grid(alpha=0.3)
+
+    # 9.6 Precision-Recall Curve for Best Model
+    plt.subplot(2, 3, 6)
+    precision, recall, _ = precision_recall_curve(y_test, results[best_name]['predictions_proba'])
+    pr_auc = auc(recall, precision)
+    plt.plot(recall, precision, marker='.', label=f'{best_name} (AUC={pr_auc:.3f})')
+    plt.xlabel('Recall')
+    plt.ylabel('Precision')
+    plt.title(f'Precision-Recall Curve: {best_name}', fontsize=14, fontweight='bold')
+    plt.legend()
+    plt.grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig('model_comparison.png', dpi=ctx['figure_dpi'], bbox_inches='tight')
+    plt.show()
+
+    print("✓ Model comparison saved as 'model_comparison.png'")
+    return {}
 
-# Save feature names
-feature_info = {
-    'numeric_features': NUMERIC_FEATURES,
-    'categorical_features': CATEGORICAL_FEATURES,
-    'all_features': all_feature_names,
-    'best_model_name': best_name,
-    'best_auc': best_auc,
-    'optimal_threshold': optimal_th['threshold']
-}
-joblib.dump(feature_info, 'model_feature_info.pkl')
-print("✓ Feature information saved as 'model_feature_info.pkl'")
 
 # ============================================================================
-# 14. BUSINESS INSIGHTS AND RECOMMENDATIONS
+# 10. DETAILED EVALUATION OF BEST MODEL
 # ============================================================================
 
-print("\n" + "=" * 70)
-print("💼 BUSINESS INSIGHTS & RECOMMENDATIONS")
-print("=" * 70)
-
-print("""
-KEY FINDINGS:
-
-1. 📊 OVERALL CHURN RATE: 20.37%
-   - For every 100 customers, approximately 20 will churn
-   - Industry benchmark: 15-25% (within normal range)
-
-2. 🎯 TOP CHURN DRIVERS (from feature importance):""")
-
-for idx, row in feat_imp_df.head(5).iterrows():
-    print(f"   • {row['Feature']}: {row['Importance']:.3f}")
-
-print(f"""
-3. 🌍 GEOGRAPHIC INSIGHTS:
-   - Germany has the highest churn rate
-   - France and Spain show lower churn rates
-   - Consider localized retention strategies
+def stage_evaluate(ctx):
+    results, best_name, y_test = ctx['results'], ctx['best_name'], ctx['y_test']
+    objective = ctx['threshold_objective']
+    cost_fp, cost_fn = ctx['cost_false_positive'], ctx['cost_false_negative']
+
+    print("\n" + "=" * 70)
+    print(f"📈 DETAILED EVALUATION: {best_name}")
+    print("=" * 70)
+
+    best_proba = results[best_name]['predictions_proba']
+    best_pred = results[best_name]['predictions']
+
+    print("\n📊 CLASSIFICATION REPORT:")
+    print(classification_report(y_test, best_pred, target_names=['Not Churned', 'Churned']))
+
+    # Threshold Analysis: every distinct threshold, from one sort + cumulative sums
+    threshold_curve_df = threshold_curve(y_test, best_proba, cost_fp=cost_fp, cost_fn=cost_fn)
+
+    print(f"\n🎯 THRESHOLD SENSITIVITY ANALYSIS ({len(threshold_curve_df):,} distinct thresholds):")
+    print("-" * 60)
+    print(f"{'Threshold':<12} {'Precision':<12} {'Recall':<12} {'F1-Score':<12}")
+    print("-" * 60)
+
+    threshold_results = metrics_at(threshold_curve_df, [0.30, 0.35, 0.40, 0.45, 0.50, 0.55, 0.60])
+    for _, row in threshold_results.iterrows():
+        print(f"{row['threshold']:<12.2f} {row['precision']:<12.3f} {row['recall']:<12.3f} {row['f1']:<12.3f}")
+
+    # Find optimal threshold over the full curve (maximizing F1 or minimizing cost)
+    optimal_th = optimal_threshold(threshold_curve_df, objective=objective)
+    cost_th = optimal_threshold(threshold_curve_df, objective='cost')
+    print(f"\n🎯 Optimal Threshold (max F1): {optimal_threshold(threshold_curve_df)['threshold']:.4f}")
+    print(f"🎯 Optimal Threshold (min cost, FP={cost_fp:g}, FN={cost_fn:g}): "
+          f"{cost_th['threshold']:.4f}" + (" (flag nobody: contacting costs more than it saves)"
+                                           if np.isinf(cost_th['threshold']) else ""))
+    print(f"\n✓ Using {objective} objective: {optimal_th['threshold']:.4f}")
+    print(f"   Precision: {optimal_th['precision']:.3f}")
+    print(f"   Recall: {optimal_th['recall']:.3f}")
+    print(f"   F1-Score: {optimal_th['f1']:.3f}")
+    return {'optimal_th': optimal_th, 'threshold_curve_df': threshold_curve_df}
+
+
+def stage_metrics(ctx):
+    # Quality, fixed-resolution curves and serving cost of every candidate,
+    # so the dashboard shows this run's numbers without loading data or models
+    results, X_test, y_test = ctx['results'], ctx['X_test'], ctx['y_test']
+
+    print("\n📏 Measuring candidates (holdout quality, batch throughput, single-row latency, size)...")
+    candidates = {
+        name: candidate_metrics(res['model'], X_test, y_test, res['predictions_proba'],
+                                fit_time=res['fit_time'], latency_calls=ctx['latency_calls'])
+        for name, res in results.items()
+    }
+    for name, m in candidates.items():
+        print(f"  {name:<22} AUC {m['auc']:.4f}  AP {m['average_precision']:.4f}  "
+              f"{m['batch_rows_per_s']:>10,.0f} rows/s  p50 {m['latency_p50_us']:.0f}us  "
+              f"p99 {m['latency_p99_us']:.0f}us  {m['model_bytes'] / 1024:,.0f} KB")
+
+    run_metrics = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'best_model': ctx['best_name'],
+        'data': {'rows': len(ctx['X_train']) + len(X_test), 'test_rows': len(X_test),
+                 'churn_rate': float(np.mean(np.concatenate([ctx['y_train'], y_test])))},
+        'optimal_threshold': ctx['optimal_th'],
+        'candidates': candidates,
+    }
+    return {'run_metrics': run_metrics}
 
-4. 👥 DEMOGRAPHIC PATTERNS:
-   - Age is a strong predictor of churn
-   - Older customers tend to churn more
-   - Gender shows some influence on churn behavior
 
-5. 💳 PRODUCT USAGE INSIGHTS:
-   - Customers with fewer products are at higher risk
-   - Inactive members are significantly more likely to churn
-   - Balance level correlates with churn probability
+# ============================================================================
+# 11. FEATURE IMPORTANCE ANALYSIS
+# ============================================================================
 
-6. ⚠️ HIGH-RISK SEGMENT:
-   - {len(high_risk)} customers identified as high-risk
-   - {high_risk['ActualChurn'].mean()*100:.1f}% of them actually churned
-   - Average churn probability: {high_risk['ChurnProbability'].mean()*100:.1f}%
+def stage_importance(ctx):
+    best_model, best_name = ctx['best_model'], ctx['best_name']
+
+    print("\n" + "=" * 70)
+    print("🔍 FEATURE IMPORTANCE ANALYSIS")
+    print("=" * 70)
+
+    # Permutation importance: holdout AUC drop when a feature is shuffled (one-hot groups together)
+    result = permutation_importance(best_model, ctx['X_test'], ctx['y_test'],
+                                    repeats=ctx['importance_repeats'], random_state=ctx['random_state'])
+    feat_imp_df = pd.DataFrame(result['features']).rename(
+        columns={'feature': 'Feature', 'importance': 'Importance', 'std': 'Std'}
+    )[['Feature', 'Importance', 'Std']]
+    print(f"✓ Permutation importance: {len(feat_imp_df)} features x {result['repeats']} repeats "
+          f"on {result['rows']:,} holdout customers in {result['seconds']:.1f}s "
+          f"(baseline AUC {result['baseline_auc']:.4f})")
+
+    print("\n🏆 TOP 10 CHURN DRIVERS (AUC drop when shuffled):")
+    print(feat_imp_df.head(10).to_string(index=False))
+
+    # Visualize feature importance
+    top = feat_imp_df.head(15).iloc[::-1]
+    plt.figure(figsize=(10, 8))
+    plt.barh(top['Feature'], top['Importance'], xerr=top['Std'], color='teal')
+    plt.title(f'Top 15 Churn Drivers - {best_name}', fontsize=14, fontweight='bold')
+    plt.xlabel('Permutation Importance (holdout AUC drop)')
+    plt.ylabel('Feature')
+    plt.tight_layout()
+    plt.savefig('feature_importance.png', dpi=ctx['figure_dpi'], bbox_inches='tight')
+    plt.show()
+
+    save_importance(result, best_name)
+    print(f"\n✓ Feature importance saved as 'feature_importance.png' and '{IMPORTANCE_PATH}'")
+    return {'feat_imp_df': feat_imp_df}
 
-RECOMMENDED ACTIONS:
 
-1. 🎯 TARGETED RETENTION CAMPAIGNS:
-   - Focus on high-risk segment ({len(high_risk)} customers)
-   - Expected ROI: If we retain 50% of at-risk customers, potential revenue saved
+# ============================================================================
+# 12. CHURN RISK SEGMENTATION
+# ============================================================================
 
-2. 📞 PROACTIVE OUTREACH:
-   - Contact customers with churn probability > 70%
-   - Offer personalized incentives (product bundles, fee waivers)
-   - Implement early warning system
+def stage_segment(ctx):
+    results, best_name = ctx['results'], ctx['best_name']
+
+    print("\n" + "=" * 70)
+    print("🎯 CUSTOMER RISK SEGMENTATION")
+    print("=" * 70)
+
+    # Add predictions to test set
+    X_test_with_risk = ctx['X_test'].copy()
+    X_test_with_risk['ChurnProbability'] = results[best_name]['predictions_proba']
+    X_test_with_risk['ActualChurn'] = ctx['y_test'].values
+
+    # Create risk segments (the same cut points as the score table and the app)
+    X_test_with_risk['RiskSegment'] = risk_segment(X_test_with_risk['ChurnProbability'])
+
+    # Summary by risk segment
+    risk_summary = X_test_with_risk.groupby('RiskSegment').agg({
+        'ActualChurn': ['count', 'sum', 'mean'],
+        'ChurnProbability': 'mean',
+        'Age': 'mean',
+        'Balance': 'mean',
+        'CreditScore': 'mean'
+    }).round(2)
+
+    print("\n📊 RISK SEGMENT SUMMARY:")
+    print(risk_summary)
+
+    # Visualize risk distribution
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+
+    # Risk segment distribution
+    axes[0].pie(
+        X_test_with_risk['RiskSegment'].value_counts(),
+        labels=X_test_with_risk['RiskSegment'].value_counts().index,
+        autopct='%1.1f%%',
+        colors=['green', 'yellow', 'red'],
+        startangle=90
+    )
+    axes[0].set_title('Customer Distribution by Risk Segment', fontsize=14, fontweight='bold')
+
+    # Actual churn rate by risk segment
+    risk_churn = X_test_with_risk.groupby('RiskSegment')['ActualChurn'].mean() * 100
+    risk_churn.plot(kind='bar', ax=axes[1], color=['green', 'yellow', 'red'])
+    axes[1].set_title('Actual Churn Rate by Risk Segment', fontsize=14, fontweight='bold')
+    axes[1].set_ylabel('Churn Rate (%)')
+    axes[1].set_xlabel('Risk Segment')
+    axes[1].set_xticklabels(axes[1].get_xticklabels(), rotation=0)
+
+    # Churn probability distribution
+    axes[2].hist(X_test_with_risk['ChurnProbability'], bins=50, edgecolor='black')
+    axes[2].axvline(RISK_THRESHOLDS[0], color='green', linestyle='--', label='Low/Medium threshold')
+    axes[2].axvline(RISK_THRESHOLDS[1], color='red', linestyle='--', label='Medium/High threshold')
+    axes[2].set_title('Distribution of Churn Probabilities', fontsize=14, fontweight='bold')
+    axes[2].set_xlabel('Churn Probability')
+    axes[2].set_ylabel('Number of Customers')
+    axes[2].legend()
+
+    plt.tight_layout()
+    plt.savefig('risk_segmentation.png', dpi=ctx['figure_dpi'], bbox_inches='tight')
+    plt.show()
+
+    print("\n✓ Risk segmentation saved as 'risk_segmentation.png'")
+
+    # High-risk customer profile
+    print("\n⚠️ HIGH-RISK CUSTOMER PROFILE:")
+    high_risk = X_test_with_risk[X_test_with_risk['RiskSegment'] == 'High Risk']
+    print(f"  • Total high-risk customers: {len(high_risk)}")
+    print(f"  • Actual churn rate: {high_risk['ActualChurn'].mean()*100:.1f}%")
+    print(f"  • Average age: {high_risk['Age'].mean():.1f} years")
+    print(f"  • Average balance: ${high_risk['Balance'].mean():,.2f}")
+    print(f"  • Average credit score: {high_risk['CreditScore'].mean():.0f}")
+    return {'X_test_with_risk': X_test_with_risk, 'high_risk': high_risk}
+
+
+def risk_cut_points(config):
+    """Risk segment cut points, so editing RISK_THRESHOLDS resegments and rescores"""
+    return RISK_THRESHOLDS
 
-3. 🛠️ PRODUCT STRATEGY:
-   - Encourage multi-product adoption
-   - Simplify product offerings for certain segments
-   - Create product bundles for high-value customers
 
-4. 📱 ENGAGEMENT INITIATIVES:
-   - Re-activate inactive members through targeted campaigns
-   - Develop digital engagement strategies
-   - Implement gamification for younger demographics
+# ============================================================================
+# 13. SAVE THE BEST MODEL
+# ============================================================================
 
-5. 🌍 GEOGRAPHIC STRATEGIES:
-   - Investigate root causes in Germany (highest churn)
-   - Replicate successful retention practices from France/Spain
-   - Localize customer experience
+def stage_save(ctx):
+    best_name = ctx['best_name']
+
+    print("\n" + "=" * 70)
+    print("💾 SAVING MODEL")
+    print("=" * 70)
+
+    model_path = model_filename(best_name)
+    joblib.dump(ctx['best_model'], model_path)
+    print(f"✓ Model saved as '{model_path}'")
+
+    # Memory-mappable copy for the app/scoring service (shared pages, no unpickling)
+    compile_pipeline(ctx['best_model']).save(SCORER_DIR)
+    print(f"✓ Memory-mappable scorer saved as '{SCORER_DIR}/'")
+
+    # Save feature names
+    feature_info = {
+        'numeric_features': ctx['numeric_features'],
+        'categorical_features': ctx['categorical_features'],
+        'best_model_name': best_name,
+        'best_auc': ctx['best_auc'],
+        'optimal_threshold': ctx['optimal_th']['threshold'],
+        'threshold_objective': ctx['threshold_objective']
+    }
+    joblib.dump(feature_info, FEATURE_INFO_PATH)
+    print(f"✓ Feature information saved as '{FEATURE_INFO_PATH}'")
+
+    # Publish to the registry; the dashboard picks up the new CURRENT version without a restart
+    metrics = {
+        **ctx['run_metrics'],
+        'cross_validation': {name: {key: value for key, value in cv.items() if key != 'folds'}
+                             for name, cv in ctx['cv_results'].items()},
+    }
+    registry = ModelRegistry()
+    version = registry.publish(ctx['best_model'], feature_info, metrics)
+    print(f"✓ Registered as version '{version}' in '{registry.root}/' (now current)")
+
+    # The Model Performance page reads this instead of the data or the model
+    save_run_metrics({**ctx['run_metrics'], 'model_version': version})
+    print(f"✓ Run metrics saved as '{METRICS_PATH}'")
+    return {'model_path': model_path, 'model_version': version}
+
+
+def stage_score(ctx):
+    # Score every customer once so the dashboard reads real probabilities
+    # instead of rescoring (or simulating) on each rerun. Row hashes and the
+    # model fingerprint let `batch_score.py --incremental` update it later.
+    # Tree models also store each customer's per-feature contributions and top driver.
+    threshold = ctx['optimal_th']['threshold']
+    scorer = compile_pipeline(ctx['best_model'])
+    explain = scorer.forest is not None
+    scores = score_with_ids(scorer, ctx['df'], threshold, explain=explain)
+    scores['feature_hash'] = row_hashes(ctx['df'])
+    write_score_table(scores, SCORE_TABLE_PATH, model_fingerprint(ctx['model_path'], threshold), explain)
+
+    segment_counts = scores['risk_segment'].value_counts().reindex(RISK_LABELS, fill_value=0)
+    print(f"\n✓ Scored {len(scores):,} customers; score table saved as '{SCORE_TABLE_PATH}'")
+    print("  " + ", ".join(f"{label}: {n:,}" for label, n in segment_counts.items()))
+    return {}
 
-6. 💰 FINANCIAL IMPACT ESTIMATE:
-   - Avg customer lifetime value (CLV) proxy: ${df['CLV_Proxy'].mean():.2f}
-   - Potential revenue at risk (high-risk segment): ${(len(high_risk) * df['CLV_Proxy'].mean() * high_risk['ChurnProbability'].mean()):.2f}
-   - Target: Reduce churn by 30% → Estimated savings
 
-NEXT STEPS:
+# ============================================================================
+# 14. BUSINESS INSIGHTS AND RECOMMENDATIONS
+# ============================================================================
 
-1. ✅ Deploy model in production environment
-2. ✅ Set up automated daily scoring of customer base
-3. ✅ Integrate with CRM for targeted campaigns
-4. ✅ A/B test retention strategies on high-risk segment
-5. ✅ Monitor model performance and retrain quarterly
-6. ✅ Develop customer health score dashboard for stakeholders
-""")
+def stage_insights(ctx):
+    df, feat_imp_df, high_risk = ctx['df'], ctx['feat_imp_df'], ctx['high_risk']
+
+    print("\n" + "=" * 70)
+    print("💼 BUSINESS INSIGHTS & RECOMMENDATIONS")
+    print("=" * 70)
+
+    print(textwrap.dedent("""
+        KEY FINDINGS:
+
+        1. 📊 OVERALL CHURN RATE: 20.37%
+           - For every 100 customers, approximately 20 will churn
+           - Industry benchmark: 15-25% (within normal range)
+
+        2. 🎯 TOP CHURN DRIVERS (from feature importance):"""))
+
+    for idx, row in feat_imp_df.head(5).iterrows():
+        print(f"   • {row['Feature']}: {row['Importance']:.3f}")
+
+    print(textwrap.dedent(f"""
+        3. 🌍 GEOGRAPHIC INSIGHTS:
+           - Germany has the highest churn rate
+           - France and Spain show lower churn rates
+           - Consider localized retention strategies
+
+        4. 👥 DEMOGRAPHIC PATTERNS:
+           - Age is a strong predictor of churn
+           - Older customers tend to churn more
+           - Gender shows some influence on churn behavior
+
+        5. 💳 PRODUCT USAGE INSIGHTS:
+           - Customers with fewer products are at higher risk
+           - Inactive members are significantly more likely to churn
+           - Balance level correlates with churn probability
+
+        6. ⚠️ HIGH-RISK SEGMENT:
+           - {len(high_risk)} customers identified as high-risk
+           - {high_risk['ActualChurn'].mean()*100:.1f}% of them actually churned
+           - Average churn probability: {high_risk['ChurnProbability'].mean()*100:.1f}%
+
+        RECOMMENDED ACTIONS:
+
+        1. 🎯 TARGETED RETENTION CAMPAIGNS:
+           - Focus on high-risk segment ({len(high_risk)} customers)
+           - Expected ROI: If we retain 50% of at-risk customers, potential revenue saved
+
+        2. 📞 PROACTIVE OUTREACH:
+           - Contact customers with churn probability > 70%
+           - Offer personalized incentives (product bundles, fee waivers)
+           - Implement early warning system
+
+        3. 🛠️ PRODUCT STRATEGY:
+           - Encourage multi-product adoption
+           - Simplify product offerings for certain segments
+           - Create product bundles for high-value customers
+
+        4. 📱 ENGAGEMENT INITIATIVES:
+           - Re-activate inactive members through targeted campaigns
+           - Develop digital engagement strategies
+           - Implement gamification for younger demographics
+
+        5. 🌍 GEOGRAPHIC STRATEGIES:
+           - Investigate root causes in Germany (highest churn)
+           - Replicate successful retention practices from France/Spain
+           - Localize customer experience
+
+        6. 💰 FINANCIAL IMPACT ESTIMATE:
+           - Avg customer lifetime value (CLV) proxy: ${df['CLV_Proxy'].mean():.2f}
+           - Potential revenue at risk (high-risk segment): ${(len(high_risk) * df['CLV_Proxy'].mean() * high_risk['ChurnProbability'].mean()):.2f}
+           - Target: Reduce churn by 30% → Estimated savings
+
+        NEXT STEPS:
+
+        1. ✅ Deploy model in production environment
+        2. ✅ Set up automated daily scoring of customer base
+        3. ✅ Integrate with CRM for targeted campaigns
+        4. ✅ A/B test retention strategies on high-risk segment
+        5. ✅ Monitor model performance and retrain quarterly
+        6. ✅ Develop customer health score dashboard for stakeholders
+        """))
+    return {}
+
+
+STAGES = [
+    Stage('load', stage_load, config_keys=('csv_path',), extra=data_fingerprint),
+    Stage('explore', stage_explore, deps=('load',)),
+    Stage('cube', stage_cube, deps=('load',), artifacts=(CUBE_PATH, profile_path(CUBE_PATH))),
+    Stage('eda', stage_eda, deps=('load', 'cube'), config_keys=('figure_dpi',),
+          artifacts=('eda_comprehensive.png',)),
+    Stage('features', stage_features, deps=('load',)),
+    Stage('split', stage_split, deps=('features',), config_keys=('test_size', 'random_state')),
+    Stage('preprocess', stage_preprocess, deps=('split',)),
+    Stage('tune', stage_tune, deps=('split', 'preprocess'),
+          config_keys=('tune_budget_s', 'tune_configs', 'xgb_fast', 'random_state'), extra=tuning_space,
+          artifacts=(TUNING_TRACE_PATH,)),
+    Stage('cv', stage_cv, deps=('split', 'tune'), config_keys=('cv_folds', 'xgb_fast', 'random_state'),
+          extra=candidate_params),
+    Stage('train', stage_train, deps=('split', 'preprocess', 'tune', 'cv'),
+          config_keys=('xgb_fast', 'random_state'), extra=candidate_params),
+    Stage('compare', stage_compare, deps=('split', 'train'), config_keys=('figure_dpi',),
+          artifacts=('model_comparison.png',)),
+    Stage('evaluate', stage_evaluate, deps=('split', 'train'),
+          config_keys=('threshold_objective', 'cost_false_positive', 'cost_false_negative')),
+    Stage('metrics', stage_metrics, deps=('split', 'train', 'evaluate'), config_keys=('latency_calls',)),
+    Stage('importance', stage_importance, deps=('split', 'train'),
+          config_keys=('importance_repeats', 'random_state', 'figure_dpi'),
+          artifacts=('feature_importance.png', IMPORTANCE_PATH)),
+    Stage('segment', stage_segment, deps=('split', 'train'), config_keys=('figure_dpi',),
+          extra=risk_cut_points, artifacts=('risk_segmentation.png',)),
+    Stage('save', stage_save, deps=('split', 'cv', 'train', 'evaluate', 'metrics', 'importance'),
+          config_keys=('threshold_objective',),
+          artifacts=(FEATURE_INFO_PATH, SCORER_DIR, REGISTRY_DIR, METRICS_PATH)),
+    Stage('score', stage_score, deps=('load', 'train', 'evaluate', 'save'), extra=risk_cut_points,
+          artifacts=(SCORE_TABLE_PATH,)),
+    Stage('insights', stage_insights, deps=('features', 'importance', 'segment')),
+]
 
-print("=" * 70)
-print("✅ ANALYSIS COMPLETE!")
-print("=" * 70)
 
-print("""
+def main():
+    stage_names = [stage.name for stage in STAGES]
+    parser = argparse.ArgumentParser(description="Churn prediction analysis (checkpointed stages)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--only", choices=stage_names,
+                       help="Run just this stage (plus any upstream stage without a valid checkpoint)")
+    group.add_argument("--from", dest="start_from", choices=stage_names,
+                       help="Rerun this stage and every stage after it")
+    group.add_argument("--force", action="store_true", help="Ignore checkpoints and rerun everything")
+    group.add_argument("--stream", action="store_true",
+                       help="Train out-of-core under CONFIG['memory_cap_mb'] instead of running the stages "
+                            "(for customer files larger than memory)")
+    parser.add_argument("--list", action="store_true", help="Show each stage's checkpoint status and exit")
+    parser.add_argument("--cache-dir", default=str(STAGE_CACHE_DIR), help="Stage checkpoint directory")
+    parser.add_argument("--trace", default=str(TRACE_PATH),
+                        help="Chrome-trace file that stage timings and memory are appended to")
+    parser.add_argument("--data", help="Customer file (CSV or Parquet) to use instead of CONFIG['csv_path'], "
+                                       "e.g. one written by synth_data.py")
+    args = parser.parse_args()
+
+    if args.data:
+        CONFIG['csv_path'] = args.data
+    tracer = Tracer(args.trace, process_name="training")
+    pipeline = StagePipeline(STAGES, CONFIG, cache_dir=args.cache_dir, tracer=tracer)
+    if args.list:
+        for name in pipeline.order:
+            status = "cached" if pipeline.is_valid(name) else "stale"
+            print(f"  {name:<12} {status:<8} {pipeline.fingerprints()[name][:16]}")
+        return
+
+    if args.stream:
+        print("=" * 70)
+        print("CHURN PREDICTION SYSTEM - OUT-OF-CORE TRAINING")
+        print("=" * 70)
+        with tracer.span("stream_train", cat="stage"):
+            run = train_streaming(
+                CONFIG['csv_path'], memory_cap_mb=CONFIG['memory_cap_mb'],
+                holdout_fraction=CONFIG['test_size'], threshold_objective=CONFIG['threshold_objective'],
+                cost_fp=CONFIG['cost_false_positive'], cost_fn=CONFIG['cost_false_negative'],
+                random_state=CONFIG['random_state']
+            )
+        print(f"🏆 BEST MODEL: {run['best_name']} (holdout AUC = {run['best_auc']:.4f})")
+        with tracer.span("stream_save", cat="stage"):
+            save_streaming_model(run)
+        return
+
+    set_plot_style()
+
+    print("=" * 70)
+    print("CHURN PREDICTION SYSTEM - COMPLETE ANALYSIS")
+    print("=" * 70)
+
+    timings = pipeline.run(only=args.only, start_from=args.start_from, force=args.force)
+
+    print("=" * 70)
+    print("✅ ANALYSIS COMPLETE!")
+    print("=" * 70)
+
+    print(f"\n⏱ Stage timings ({len(timings)} of {len(STAGES)} stages ran):")
+    for name, seconds in timings.items():
+        print(f"  {name:<12} {seconds:7.2f}s")
+    print(f"  (CPU time and peak memory per stage appended to '{args.trace}')")
+
+    print("""
 📁 OUTPUT FILES GENERATED:
 1. eda_comprehensive.png - Exploratory data analysis visualizations
 2. model_comparison.png - Model performance comparison
 3. feature_importance.png - Top churn drivers
+   feature_importance.json - Permutation importance shown on the dashboard
 4. risk_segmentation.png - Customer risk distribution
 5. best_churn_model_*.pkl - Trained model for deployment
 6. model_feature_info.pkl - Feature metadata
+   best_churn_model_scorer/ - Memory-mappable scorer used by the app
+   model_registry/ - Versioned models; CURRENT is the one the app serves
+7. churn_cube.parquet - Churn aggregate cube (and value profile) for the EDA figure and dashboard
+8. churn_scores.parquet - Churn probability and risk segment for every customer
+9. tuning_trace.json - Time-vs-AUC trace of the hyperparameter search
+10. perf_trace.json - Per-stage wall/CPU time and peak memory (Chrome trace; ⏱ Performance page)
+11. run_metrics.json - Quality, ROC/PR curves and serving cost per model (🤖 Model Performance page)
 
 📊 Next: Create a dashboard or PDF report with these visualizations!
 """)
 
-# ============================================================================
-# BONUS: SAMPLE PREDICTION FUNCTION
-# ============================================================================
+    print("\n✅ Prediction function 'predict_churn()' is ready to use!")
+    print("\nExample usage:")
+    print("result = predict_churn({'CreditScore': 650, 'Age': 45, ...})")
 
-def predict_churn(customer_data, model=best_model, threshold=optimal_th['threshold']):
-    """
-    Predict churn for new customers
-    
-    Parameters:
-    -----------
-    customer_data : dict or pd.DataFrame
-        Customer features
-    model : trained model
-        The trained churn prediction model
-    threshold : float
-        Probability threshold for classification
-        
-    Returns:
-    --------
-    dict : Prediction results
-    """
-    if isinstance(customer_data, dict):
-        customer_data = pd.DataFrame([customer_data])
-    
-    # Ensure all required features are present
-    for feature in NUMERIC_FEATURES + CATEGORICAL_FEATURES:
-        if feature not in customer_data.columns:
-            raise ValueError(f"Missing required feature: {feature}")
-    
-    # Predict
-    proba = model.predict_proba(customer_data[NUMERIC_FEATURES + CATEGORICAL_FEATURES])[:, 1]
-    prediction = (proba >= threshold).astype(int)
-    
-    # Risk segment
-    if proba[0] < 0.3:
-        risk = 'Low Risk'
-    elif proba[0] < 0.7:
-        risk = 'Medium Risk'
-    else:
-        risk = 'High Risk'
-    
-    return {
-        'churn_probability': float(proba[0]),
-        'will_churn': bool(prediction[0]),
-        'risk_segment': risk,
-        'threshold_used': threshold
-    }
 
-print("\n✅ Prediction function 'predict_churn()' is ready to use!")
-print("\nExample usage:")
-print("result = predict_churn({'CreditScore': 650, 'Age': 45, ...})")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Lightweight churn scoring for apps and services
+Importing this module loads only numpy. The saved model is read on the first
+prediction, and pandas is imported only for DataFrame input, so callers get
+``predict_churn`` without the plotting/training stack that
+churn_prediction_complete.py pulls in. When the training script has written
+the memory-mapped scorer (SCORER_DIR), the pickled sklearn pipeline is not
+loaded at all. When the model registry has a CURRENT version, that version is
+served, and a promoted version replaces it on the next prediction.
+
+Usage:
+    from churn_scoring import predict_churn
+    predict_churn({'CreditScore': 650, 'Age': 45, ...})
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+from churn_features import FEATURE_INFO_PATH, SCORER_DIR, model_filename
+from fast_scorer import CompiledScorer, compile_pipeline
+from model_registry import REGISTRY_DIR, ModelRegistry
+
+
+@lru_cache(maxsize=None)
+def load_feature_info(feature_info_path=FEATURE_INFO_PATH):
+    """Feature info written by the training script (best model name, optimal threshold, ...)"""
+    import joblib
+
+    return joblib.load(feature_info_path)
+
+
+@lru_cache(maxsize=None)
+def load_artifacts(feature_info_path=FEATURE_INFO_PATH):
+    """
+    Saved best model and its feature info
+
+    Parameters:
+    -----------
+    feature_info_path : str or Path
+        Feature info written by the training script; the model file named in
+        it is read from the same directory
+
+    Returns:
+    --------
+    tuple : (fitted pipeline, feature_info dict)
+    """
+    import joblib
+
+    feature_info = load_feature_info(feature_info_path)
+    model = joblib.load(Path(feature_info_path).parent / model_filename(feature_info['best_model_name']))
+    return model, feature_info
+
+
+@lru_cache(maxsize=None)
+def load_scorer(feature_info_path=FEATURE_INFO_PATH, mmap_mode="r"):
+    """
+    CompiledScorer for the saved best model
+
+    Opens the memory-mapped scorer saved next to the feature info when there
+    is one (no sklearn import, pages shared between processes); otherwise
+    compiles the pickled pipeline.
+    """
+    scorer_dir = Path(feature_info_path).parent / SCORER_DIR
+    if (scorer_dir / "scorer.json").exists():
+        return CompiledScorer.load(scorer_dir, mmap_mode=mmap_mode)
+    model, _ = load_artifacts(feature_info_path)
+    return compile_pipeline(model)
+
+
+@lru_cache(maxsize=1)
+def _load_version(registry_dir, version):
+    # maxsize=1: the previous version is dropped (and its mmaps closed) after a swap
+    return ModelRegistry(registry_dir).load(version)
+
+
+def load_current_model(registry_dir=REGISTRY_DIR):
+    """
+    The registry's CURRENT version, reloaded when the pointer changes
+
+    Returns:
+    --------
+    model_registry.RegisteredModel, or None when nothing has been published
+    """
+    version = ModelRegistry(registry_dir).current_version()
+    if version is None:
+        return None
+    return _load_version(str(registry_dir), version)
+
+
+def predict_churn(customer_data, model=None, threshold=None):
+    """
+    Predict churn for new customers
+
+    Parameters:
+    -----------
+    customer_data : dict or pd.DataFrame
+        Customer features (EngagementScore/CLV_Proxy are derived if missing)
+    model : trained model, optional
+        The trained churn prediction model (default: the registry's current
+        version, else the saved best model)
+    threshold : float, optional
+        Probability threshold for classification (default: the saved optimal threshold)
+
+    Returns:
+    --------
+    dict : Prediction results for a single customer (dict input)
+    pd.DataFrame : One row of results per customer (DataFrame input)
+
+    For whole customer files use ``python batch_score.py`` instead, which
+    streams the file in chunks across all cores.
+    """
+    current = load_current_model() if model is None else None
+    if current is not None:
+        scorer, feature_info = current.scorer, current.feature_info
+    elif model is None:
+        scorer, feature_info = load_scorer(), load_feature_info()
+    else:
+        scorer, feature_info = compile_pipeline(model), None
+    if threshold is None:
+        threshold = (feature_info or load_feature_info())['optimal_threshold']
+
+    if isinstance(customer_data, dict):
+        # Single customer: compiled numpy path, no DataFrame/ColumnTransformer
+        return scorer.predict_one(customer_data, threshold)
+
+    from batch_score import score_frame
+
+    scores = score_frame(scorer, customer_data, threshold)
+    scores['threshold_used'] = threshold
+    return scores
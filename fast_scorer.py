@@ -0,0 +1,438 @@
+"""
+Low-latency single-row churn scoring
+Compiles a fitted ``Pipeline([("pre", ColumnTransformer), ("clf", ...)])`` into
+plain numpy arrays so one customer can be scored without building a DataFrame
+or going through ColumnTransformer/sklearn input validation.
+
+A compiled scorer can be saved as a directory of uncompressed .npy arrays
+(scaler parameters, coefficients or flat tree nodes) and reopened with
+``mmap_mode='r'``, so app processes on one host share its pages through the
+OS page cache instead of each unpickling its own copy of the model.
+
+Usage:
+    scorer = compile_pipeline(joblib.load('best_churn_model_random_forest.pkl'))
+    scorer.predict_proba_one({'CreditScore': 650, 'Age': 45, ...})
+    scorer.explain_one({...})      # per-feature contributions (RF/XGBoost)
+    scorer.save('churn_scorer')
+    CompiledScorer.load('churn_scorer').predict_proba_one({...})
+"""
+
+import bisect
+import json
+import shutil
+import weakref
+from pathlib import Path
+
+import numpy as np
+
+from churn_features import RISK_LABELS, RISK_THRESHOLDS, engineered_values
+from tree_engine import FlatForest
+
+_COMPILED = weakref.WeakKeyDictionary()
+
+# Batches up to this size go through the flat tree engine; larger batches are
+# handed to the classifier's own compiled predict (past this point its
+# per-call overhead is amortised and it walks the trees faster than NumPy)
+FLAT_BATCH_LIMIT = 256
+
+# Bump when the saved scorer layout changes
+SCORER_FORMAT = 1
+
+
+def _expit(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class CompiledScorer:
+    """
+    Pandas-free scorer compiled from a fitted preprocessing + classifier pipeline
+
+    The StandardScaler means/scales and the OneHotEncoder category mapping are
+    stored as flat arrays/dicts; the row layout matches the pipeline output
+    (scaled numerics first, then one-hot columns). Pipelines built on
+    CategoryCaster (the XGBoost fast path) use ``categorical_encoding="codes"``
+    instead: raw numerics, then one category-code column per categorical
+    feature. Random Forest and XGBoost models are flattened with
+    ``tree_engine.FlatForest`` for small batches.
+    """
+
+    def __init__(self, numeric_features, mean, scale, categorical_features,
+                 category_index, classifier=None, categorical_encoding="onehot"):
+        self.numeric_features = list(numeric_features)
+        self.categorical_features = list(categorical_features)
+        self.features = self.numeric_features + self.categorical_features
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        # One dict per categorical feature: category value -> output column
+        # ("onehot") or category code ("codes")
+        self.category_index = category_index
+        self.categorical_encoding = categorical_encoding
+        self.n_numeric = len(self.numeric_features)
+        if categorical_encoding == "codes":
+            self.n_columns = self.n_numeric + len(category_index)
+        else:
+            self.n_columns = self.n_numeric + sum(len(m) for m in category_index)
+        self.classifier = classifier
+        self.forest = None
+        # Scorers opened with load() have no classifier; load() sets _predict
+        self._predict = self._compile_classifier(classifier) if classifier is not None else None
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Build a scorer from a fitted ``Pipeline(pre=ColumnTransformer or CategoryCaster, clf=...)``"""
+        pre = pipeline.named_steps["pre"]
+        clf = pipeline.named_steps["clf"]
+
+        if type(pre).__name__ == "CategoryCaster":
+            n = len(pre.numeric_features)
+            category_index = [{c: code for code, c in enumerate(cats)} for cats in pre.categories_]
+            return cls(pre.numeric_features, np.zeros(n), np.ones(n), pre.categorical_features,
+                       category_index, clf, categorical_encoding="codes")
+
+        numeric_features, mean, scale = [], None, None
+        categorical_features, category_index = [], []
+        offset = None
+        for name, trans, cols in pre.transformers_:
+            if trans == "drop" or name == "remainder":
+                continue
+            kind = type(trans).__name__
+            if kind == "StandardScaler":
+                numeric_features = list(cols)
+                n = len(numeric_features)
+                mean = trans.mean_ if trans.mean_ is not None else np.zeros(n)
+                scale = trans.scale_ if trans.scale_ is not None else np.ones(n)
+                offset = n
+            elif kind == "OneHotEncoder":
+                if getattr(trans, "drop_idx_", None) is not None:
+                    raise NotImplementedError("OneHotEncoder(drop=...) is not supported")
+                categorical_features = list(cols)
+            else:
+                raise NotImplementedError(f"Unsupported transformer: {kind}")
+
+        if offset is None:
+            raise NotImplementedError("Pipeline has no StandardScaler step")
+        if categorical_features:
+            encoder = pre.named_transformers_["cat"]
+            for cats in encoder.categories_:
+                category_index.append({c: offset + i for i, c in enumerate(cats)})
+                offset += len(cats)
+
+        return cls(numeric_features, mean, scale, categorical_features,
+                   category_index, clf)
+
+    def _compile_classifier(self, clf):
+        """Pick the fastest predict function for the fitted classifier"""
+        kind = type(clf).__name__
+        linear = kind == "LogisticRegression" or (kind == "SGDClassifier" and clf.loss == "log_loss")
+        if linear and clf.coef_.shape[0] == 1 and self.categorical_encoding == "onehot":
+            return self._init_linear(clf.coef_[0], clf.intercept_[0])
+        if kind in ("RandomForestClassifier", "XGBClassifier"):
+            try:
+                forest = FlatForest.from_model(clf)
+            except NotImplementedError:
+                return self._predict_generic
+            if kind == "XGBClassifier":
+                self._booster = clf.get_booster()
+                best_iteration = getattr(clf, "best_iteration", None)
+                self._iteration_range = (0, best_iteration + 1 if best_iteration is not None else 0)
+            return self._init_trees(forest)
+        return self._predict_generic
+
+    def _init_linear(self, coef, intercept):
+        # Fold the scaler into the coefficients: w·((x - m) / s) + b
+        coef = np.asarray(coef, dtype=np.float64)
+        w_num = coef[:self.n_numeric] / self.scale
+        self._lr_coef = coef
+        self._lr_intercept = float(intercept)
+        self._lr_weights = w_num
+        self._lr_bias = float(intercept - np.dot(w_num, self.mean))
+        return self._predict_linear
+
+    def _init_trees(self, forest):
+        self.forest = forest
+        return self._predict_trees
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path):
+        """
+        Write the scorer as uncompressed .npy arrays plus scorer.json
+
+        Parameters:
+        -----------
+        path : str or Path
+            Output directory (replaced if it exists)
+
+        Returns:
+        --------
+        Path : the output directory
+        """
+        if self._predict not in (self._predict_linear, self._predict_trees):
+            raise NotImplementedError(
+                f"Only linear and flat-tree scorers can be saved, not {type(self.classifier).__name__}"
+            )
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        np.save(tmp / "mean.npy", self.mean)
+        np.save(tmp / "scale.npy", self.scale)
+        meta = {
+            "format": SCORER_FORMAT,
+            "numeric_features": self.numeric_features,
+            "categorical_features": self.categorical_features,
+            "categories": [[c.item() if hasattr(c, "item") else c for c in mapping]
+                           for mapping in self.category_index],
+            "categorical_encoding": self.categorical_encoding,
+        }
+        if self._predict == self._predict_linear:
+            np.save(tmp / "lr_coef.npy", self._lr_coef)
+            meta.update(model="linear", lr_intercept=self._lr_intercept)
+        else:
+            self.forest.save(tmp / "forest")
+            meta.update(model="trees")
+        (tmp / "scorer.json").write_text(json.dumps(meta, indent=2))
+
+        # Processes that have the old files mapped keep their pages until they reload
+        shutil.rmtree(path, ignore_errors=True)
+        tmp.rename(path)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Open a saved scorer; with ``mmap_mode='r'`` its arrays are paged in on demand"""
+        path = Path(path)
+        meta = json.loads((path / "scorer.json").read_text())
+        if meta.get("format") != SCORER_FORMAT:
+            raise ValueError(f"Unsupported scorer format in {path}: {meta.get('format')}")
+
+        encoding = meta.get("categorical_encoding", "onehot")
+        offset = len(meta["numeric_features"])
+        category_index = []
+        for cats in meta["categories"]:
+            if encoding == "codes":
+                category_index.append({c: code for code, c in enumerate(cats)})
+                continue
+            category_index.append({c: offset + i for i, c in enumerate(cats)})
+            offset += len(cats)
+
+        scorer = cls(meta["numeric_features"], np.load(path / "mean.npy"), np.load(path / "scale.npy"),
+                     meta["categorical_features"], category_index, categorical_encoding=encoding)
+        if meta["model"] == "linear":
+            coef = np.load(path / "lr_coef.npy", mmap_mode=mmap_mode)
+            scorer._predict = scorer._init_linear(coef, meta["lr_intercept"])
+        else:
+            scorer._predict = scorer._init_trees(FlatForest.load(path / "forest", mmap_mode=mmap_mode))
+        return scorer
+
+    # ------------------------------------------------------------------
+    # Input layout
+    # ------------------------------------------------------------------
+    def _numeric_values(self, customer):
+        """Raw numeric inputs (plus categorical values) from a dict or tuple"""
+        if isinstance(customer, dict):
+            if 'EngagementScore' not in customer or 'CLV_Proxy' not in customer:
+                customer = dict(customer)
+                try:
+                    customer['EngagementScore'], customer['CLV_Proxy'] = engineered_values(customer)
+                except KeyError as e:
+                    raise ValueError(f"Missing required feature: {e.args[0]}") from None
+            try:
+                values = [customer[f] for f in self.features]
+            except KeyError as e:
+                raise ValueError(f"Missing required feature: {e.args[0]}") from None
+        else:
+            values = list(customer)
+            if len(values) != len(self.features):
+                raise ValueError(
+                    f"Expected {len(self.features)} values in order {self.features}, "
+                    f"got {len(values)}"
+                )
+        return values[:self.n_numeric], values[self.n_numeric:]
+
+    def transform_one(self, customer):
+        """Preprocess one customer into the pipeline's output layout (float64)"""
+        nums, cats = self._numeric_values(customer)
+        row = np.zeros(self.n_columns, dtype=np.float64)
+        row[:self.n_numeric] = (np.asarray(nums, dtype=np.float64) - self.mean) / self.scale
+        if self.categorical_encoding == "codes":
+            # Unknown categories are missing, like the CategoryCaster's NaN
+            row[self.n_numeric:] = [mapping.get(value, np.nan)
+                                    for mapping, value in zip(self.category_index, cats)]
+            return row
+        for mapping, value in zip(self.category_index, cats):
+            col = mapping.get(value)
+            if col is not None:  # Unknown categories encode as all zeros
+                row[col] = 1.0
+        return row
+
+    def transform_frame(self, df):
+        """Vectorised preprocessing of a DataFrame holding the pipeline's input columns"""
+        import pandas as pd  # Only DataFrame input needs pandas
+
+        out = np.zeros((len(df), self.n_columns), dtype=np.float64)
+        nums = df[self.numeric_features].to_numpy(dtype=np.float64)
+        out[:, :self.n_numeric] = (nums - self.mean) / self.scale
+        rows = np.arange(len(df))
+        for j, (feature, mapping) in enumerate(zip(self.categorical_features, self.category_index)):
+            codes = pd.Categorical(df[feature], categories=list(mapping)).codes
+            if self.categorical_encoding == "codes":
+                out[:, self.n_numeric + j] = np.where(codes >= 0, codes, np.nan)
+                continue
+            known = codes >= 0  # Unknown categories encode as all zeros
+            out[rows[known], min(mapping.values()) + codes[known]] = 1.0
+        return out
+
+    def transform(self, customers):
+        """Preprocess a sequence of dicts/tuples into a 2-D array"""
+        out = np.zeros((len(customers), self.n_columns), dtype=np.float64)
+        for i, customer in enumerate(customers):
+            out[i] = self.transform_one(customer)
+        return out
+
+    # ------------------------------------------------------------------
+    # Classifiers
+    # ------------------------------------------------------------------
+    def _predict_linear(self, X):
+        # X is already preprocessed, so use the unfolded coefficients
+        return _expit(X @ self._lr_coef + self._lr_intercept)
+
+    def _predict_linear_one(self, customer):
+        nums, cats = self._numeric_values(customer)
+        z = self._lr_bias + float(np.dot(self._lr_weights, np.asarray(nums, dtype=np.float64)))
+        for mapping, value in zip(self.category_index, cats):
+            col = mapping.get(value)
+            if col is not None:
+                z += self._lr_coef[col]
+        return float(_expit(z))
+
+    def _predict_trees(self, X):
+        if X.shape[0] <= FLAT_BATCH_LIMIT or self.classifier is None:
+            return self.forest.predict_proba(X)
+        if self.forest.kind == "xgb":
+            proba = self._booster.inplace_predict(X, iteration_range=self._iteration_range)
+            return np.asarray(proba, dtype=np.float64).reshape(-1)
+        return self._predict_generic(X)
+
+    def _predict_generic(self, X):
+        return self.classifier.predict_proba(X)[:, 1]
+
+    # ------------------------------------------------------------------
+    # Public scoring API
+    # ------------------------------------------------------------------
+    def predict_proba_one(self, customer):
+        """Churn probability for one customer given as a dict or tuple"""
+        if self._predict == self._predict_linear:
+            return self._predict_linear_one(customer)
+        return float(self._predict(self.transform_one(customer)[np.newaxis, :])[0])
+
+    def predict_proba(self, customers):
+        """Churn probabilities for a sequence of dicts/tuples"""
+        return self._predict(self.transform(customers))
+
+    def predict_proba_frame(self, df):
+        """Churn probabilities for every row of a DataFrame"""
+        return self._predict(self.transform_frame(df))
+
+    def predict_proba_matrix(self, X):
+        """Churn probabilities for rows already in the output layout (``transform``/``transform_frame``)"""
+        return self._predict(X)
+
+    def column_groups(self):
+        """
+        Output columns of each input feature: one per numeric feature, and
+        all of a categorical feature's one-hot columns (or its code column)
+
+        Returns:
+        --------
+        dict : feature name -> list of column indices
+        """
+        groups = {f: [i] for i, f in enumerate(self.numeric_features)}
+        for j, (feature, mapping) in enumerate(zip(self.categorical_features, self.category_index)):
+            groups[feature] = ([self.n_numeric + j] if self.categorical_encoding == "codes"
+                               else sorted(mapping.values()))
+        return groups
+
+    # ------------------------------------------------------------------
+    # Explanations (tree models)
+    # ------------------------------------------------------------------
+    @property
+    def explanation_units(self):
+        """Units of explain_* contributions: 'probability' (Random Forest) or 'log-odds' (XGBoost)"""
+        if self.forest is None:
+            return None
+        return "probability" if self.forest.kind == "rf" else "log-odds"
+
+    def explain_matrix(self, X):
+        """
+        Tree-path contributions of each input feature (one-hot columns summed)
+        for rows already in the output layout
+
+        Returns:
+        --------
+        bias : float
+            Expected model output over the training data
+        contributions : np.ndarray of shape (n_rows, len(self.features))
+            Per-feature shifts from ``bias``; ``bias + row sum`` is the
+            row's output in ``explanation_units``
+        """
+        if self.forest is None:
+            raise NotImplementedError("Explanations need a Random Forest or XGBoost scorer")
+        bias, by_column = self.forest.contributions(X)
+        groups = self.column_groups()
+        out = np.empty((by_column.shape[0], len(self.features)), dtype=np.float64)
+        for j, feature in enumerate(self.features):
+            out[:, j] = by_column[:, groups[feature]].sum(axis=1)
+        return bias, out
+
+    def explain_one(self, customer):
+        """
+        Why one customer got their score
+
+        Returns:
+        --------
+        dict : 'base' (expected output), 'contributions' ({feature: shift},
+            largest absolute first), 'output' (base + shifts), 'units' and
+            'churn_probability'
+        """
+        bias, contrib = self.explain_matrix(self.transform_one(customer)[np.newaxis, :])
+        order = np.argsort(-np.abs(contrib[0]))
+        output = bias + float(contrib[0].sum())
+        return {
+            'base': bias,
+            'contributions': {self.features[j]: float(contrib[0, j]) for j in order},
+            'output': output,
+            'units': self.explanation_units,
+            'churn_probability': output if self.forest.kind == "rf" else float(_expit(output)),
+        }
+
+    def explain_frame(self, df):
+        """Batch form of explain_one: (base, DataFrame of per-feature contributions indexed like ``df``)"""
+        import pandas as pd
+
+        bias, contrib = self.explain_matrix(self.transform_frame(df))
+        return bias, pd.DataFrame(contrib, columns=self.features, index=df.index)
+
+    def predict_one(self, customer, threshold=0.5):
+        """Prediction dict in the same shape as ``predict_churn``"""
+        proba = self.predict_proba_one(customer)
+        return {
+            'churn_probability': proba,
+            'will_churn': proba >= threshold,
+            'risk_segment': RISK_LABELS[bisect.bisect_right(RISK_THRESHOLDS, proba)],
+            'threshold_used': threshold
+        }
+
+
+def compile_pipeline(pipeline):
+    """Return a (cached) CompiledScorer for a fitted pipeline"""
+    scorer = _COMPILED.get(pipeline)
+    if scorer is None:
+        scorer = CompiledScorer.from_pipeline(pipeline)
+        _COMPILED[pipeline] = scorer
+    return scorer
@@ -0,0 +1,289 @@
+"""
+Budgeted hyperparameter search with successive halving
+Samples random configurations for the tree ensembles and evaluates them on a
+small slice of the training rows; only the best 1/eta of each rung moves on
+to a rung with eta times more rows, until the survivors are fitted on all
+rows. Trials of a rung run in parallel (one core each). No trial is started
+after the wall-clock budget has run out; the search then keeps the best of
+the trials that finished in the furthest rung reached.
+
+Configurations are scored on a stratified validation slice of the training
+split, so the holdout test set stays unseen. Every trial is appended to a
+time-versus-AUC trace. With the XGBoost fast path (xgb_fast.FastXGBClassifier)
+the trials train exactly like the deployed model: on the raw feature rows,
+with native categoricals and early stopping choosing the number of rounds.
+
+Usage:
+    python hyperparam_search.py Churn_Modelling.csv --budget 120 --configs 27
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterSampler, train_test_split
+from threadpoolctl import threadpool_limits
+
+from churn_models import make_classifiers
+from train_scheduler import pool_context
+
+TUNING_TRACE_PATH = 'tuning_trace.json'
+
+# Plain lists (not scipy distributions) so the spaces fingerprint stably in the stage cache
+SEARCH_SPACES = {
+    "Random Forest": {
+        'n_estimators': [100, 200, 300, 500],
+        'max_depth': [6, 8, 10, 12, 15, None],
+        'min_samples_leaf': [1, 2, 5, 10, 20],
+        'max_features': ['sqrt', 0.5, 0.8],
+    },
+    "XGBoost": {
+        'n_estimators': [100, 200, 300, 500],
+        'learning_rate': [0.02, 0.03, 0.05, 0.08, 0.1, 0.15, 0.2],
+        'max_depth': [3, 4, 5, 6, 8],
+        'min_child_weight': [1, 3, 5, 10],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+    },
+}
+
+# Training/validation data for the trials, set in the parent before the pool starts
+_TRIAL_DATA = ()
+# Quantized rows per rung size for raw-feature candidates, built on a worker's
+# first trial of the rung and reused by every configuration after it
+_TRIAL_SPLITS = {}
+
+
+def _init_trial_worker(data):
+    global _TRIAL_DATA, _TRIAL_SPLITS
+    _TRIAL_DATA, _TRIAL_SPLITS = data, {}
+
+
+def _run_trial(clf, params, n_rows):
+    """Fit one configuration on the first ``n_rows`` (shuffled) training rows; return validation AUC"""
+    X_fit, y_fit, X_val, y_val = _TRIAL_DATA
+    clf = clone(clf).set_params(**params)
+    with threadpool_limits(limits=1):
+        start = time.perf_counter()
+        if getattr(clf, "raw_features", False):
+            X_rows, y_rows = X_fit.iloc[:n_rows], y_fit[:n_rows]
+            clf.fit(X_rows, y_rows, split=clf.quantize(X_rows, y_rows, _TRIAL_SPLITS, n_rows))
+        else:
+            clf.fit(X_fit[:n_rows], y_fit[:n_rows])
+        fit_time = time.perf_counter() - start
+        auc = roc_auc_score(y_val, clf.predict_proba(X_val)[:, 1])
+    return auc, fit_time
+
+
+def _run_rung(pool, workers, clf, configs, survivors, n_rows, deadline):
+    """
+    Trials of one rung, started in ``survivors`` order until ``deadline``
+
+    At most ``workers`` trials run at once, and a trial is only started
+    before the deadline, so the budget is overrun by at most one trial.
+
+    Returns:
+    --------
+    list of (config index, auc, fit_time, finish time) for the finished trials
+    """
+    finished = []
+    todo, running = deque(survivors), {}
+    while todo or running:
+        while todo and len(running) < workers and time.perf_counter() < deadline:
+            i = todo.popleft()
+            if pool is None:
+                finished.append((i, *_run_trial(clf, configs[i], n_rows), time.perf_counter()))
+            else:
+                running[pool.submit(_run_trial, clf, configs[i], n_rows)] = i
+        if not running:
+            break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            finished.append((running.pop(future), *future.result(), time.perf_counter()))
+    return finished
+
+
+def rung_sizes(n_rows, n_configs, eta=3, min_rows=500):
+    """
+    Rows per rung: the last rung uses every row, each earlier one 1/eta of the next
+
+    As many rungs as halving ``n_configs`` down to one allows, but no rung
+    below ``min_rows``.
+    """
+    n_rungs = 1
+    while eta ** n_rungs <= n_configs:  # floor(log_eta(n_configs)) + 1, without float error
+        n_rungs += 1
+    sizes = [int(n_rows / eta ** k) for k in range(n_rungs)][::-1]
+    return [s for s in sizes if s >= min(min_rows, n_rows)]
+
+
+def successive_halving(name, clf, space, X_train, y_train, n_configs=27, eta=3,
+                       budget_s=120.0, n_cpus=None, random_state=42, val_size=0.2):
+    """
+    Tune one candidate with successive halving over training rows
+
+    Parameters:
+    -----------
+    name : str
+        Candidate name (for the trace)
+    clf : estimator
+        Unfitted classifier with the default parameters
+    space : dict
+        ``{param: list of values}`` sampled without replacement
+    X_train, y_train : array-like
+        Preprocessed training matrix (the raw feature DataFrame for a
+        ``raw_features`` candidate) and labels; a stratified ``val_size``
+        slice is held out to score the configurations
+    n_configs : int
+        Configurations in the first rung (the defaults plus random samples)
+    eta : int
+        Keep the best 1/eta at each rung, and give them eta times more rows
+    budget_s : float
+        Wall-clock budget; no trial is started once it has run out
+    n_cpus : int, optional
+        Parallel trials (default: all cores)
+
+    Returns:
+    --------
+    best_params : dict
+        Best finished configuration of the furthest rung reached ({} if no
+        trial finished)
+    trace : list of dict
+        One entry per trial: rung, rows, params, auc, fit_time, elapsed_s
+    """
+    n_cpus = n_cpus or os.cpu_count() or 1
+    start = time.perf_counter()
+    y_train = np.asarray(y_train)
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=val_size, stratify=y_train, random_state=random_state
+    )
+    # train_test_split shuffles, so the first n rows of X_fit are a random subsample
+    if not getattr(clf, "raw_features", False):
+        X_fit, X_val = np.ascontiguousarray(X_fit), np.ascontiguousarray(X_val)
+    data = (X_fit, y_fit, X_val, y_val)
+
+    # The current defaults compete too, so tuning never silently loses to them
+    defaults = {param: clf.get_params()[param] for param in space}
+    sampled = ParameterSampler(space, n_iter=n_configs, random_state=random_state)
+    configs = [defaults] + [c for c in sampled if c != defaults][:n_configs - 1]
+    sizes = rung_sizes(len(y_fit), len(configs), eta)
+    survivors = list(range(len(configs)))
+    trace, best_params = [], {}
+    deadline = start + budget_s
+
+    _init_trial_worker(data)
+    workers = min(n_cpus, len(configs))
+    pool = (ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(),
+                                initializer=_init_trial_worker, initargs=(data,))
+            if workers > 1 else None)
+    try:
+        for rung, n_rows in enumerate(sizes):
+            rung_start = time.perf_counter()
+            # Survivors are in rank order, so a rung cut short has run its most promising configs
+            finished = _run_rung(pool, workers, clf, configs, survivors, n_rows, deadline)
+            for i, auc, fit_time, finished_at in finished:
+                trace.append({'model': name, 'rung': rung, 'rows': n_rows, 'config': i,
+                              'params': configs[i], 'auc': float(auc), 'fit_time': fit_time,
+                              'elapsed_s': finished_at - start})
+            if not finished:
+                print(f"   ⏱ Budget of {budget_s:.0f}s reached before rung {rung}; stopping early")
+                break
+            ranked = sorted(finished, key=lambda t: t[1], reverse=True)
+            best_i, best_auc = ranked[0][:2]
+            best_params = configs[best_i]
+            print(f"   Rung {rung}: {len(finished):>3} configs x {n_rows:>6,} rows  "
+                  f"best AUC {best_auc:.4f}  ({time.perf_counter() - rung_start:.1f}s)")
+            if len(finished) < len(survivors):
+                print(f"   ⏱ Budget of {budget_s:.0f}s reached during rung {rung} "
+                      f"({len(survivors) - len(finished)} configs not run); stopping early")
+                break
+            survivors = [t[0] for t in ranked[:max(1, len(ranked) // eta)]]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return best_params, trace
+
+
+def tune_candidates(X_train, y_train, spaces=SEARCH_SPACES, n_configs=27, eta=3,
+                    budget_s=120.0, n_cpus=None, random_state=42, models=None, X_raw=None):
+    """
+    Successive halving for every candidate in ``spaces``
+
+    Parameters:
+    -----------
+    models : dict, optional
+        Unfitted candidates with the default parameters (default:
+        make_classifiers(n_jobs=1)); a ``raw_features`` candidate (the XGBoost
+        fast path) is tuned on ``X_raw``, the unpreprocessed rows of X_train
+
+    Returns:
+    --------
+    tuned_params : dict
+        ``{name: best params}``, ready for ``make_classifiers(params=...)``
+    trace : list of dict
+        Trials of all candidates (see successive_halving)
+    """
+    defaults = models or make_classifiers(n_jobs=1)
+    tuned_params, trace = {}, []
+    for name, space in spaces.items():
+        clf, X = defaults[name], X_train
+        prefix = ""
+        if getattr(clf, "raw_features", False):
+            if X_raw is None:
+                raise ValueError(f"{name} trains on raw features; pass X_raw")
+            # The hyperparameters live on its classifier, and early stopping picks n_estimators
+            clf, X, prefix = clone(clf).set_params(n_jobs=1), X_raw, "classifier__"
+            space = {prefix + param: values for param, values in space.items() if param != 'n_estimators'}
+        print(f"🔍 Tuning {name} ({n_configs} configs, eta={eta}, budget {budget_s:.0f}s)")
+        best, model_trace = successive_halving(
+            name, clf, space, X, y_train, n_configs=n_configs, eta=eta,
+            budget_s=budget_s, n_cpus=n_cpus, random_state=random_state
+        )
+        tuned_params[name] = {param.removeprefix(prefix): value for param, value in best.items()}
+        for trial in model_trace:
+            trial['params'] = {param.removeprefix(prefix): value for param, value in trial['params'].items()}
+        trace.extend(model_trace)
+    return tuned_params, trace
+
+
+def save_trace(trace, path=TUNING_TRACE_PATH):
+    with open(path, 'w') as f:
+        json.dump(trace, f, indent=1, default=repr)
+    return path
+
+
+def main():
+    from churn_data import load_customers
+    from churn_features import MODEL_FEATURES, TARGET, add_engineered_features
+    from churn_models import PreprocessedSplit, make_preprocessor
+
+    parser = argparse.ArgumentParser(description="Successive-halving search for RF and XGBoost")
+    parser.add_argument("data", help="Customer CSV")
+    parser.add_argument("--budget", type=float, default=120.0, help="Wall-clock seconds per candidate")
+    parser.add_argument("--configs", type=int, default=27, help="Configurations sampled per candidate")
+    parser.add_argument("--eta", type=int, default=3, help="Halving factor")
+    parser.add_argument("--cpus", type=int, default=None, help="Parallel trials (default: all cores)")
+    parser.add_argument("--trace", default=TUNING_TRACE_PATH, help="Where to write the trial trace")
+    args = parser.parse_args()
+
+    df = add_engineered_features(load_customers(args.data))
+    X_train, _, y_train, _ = train_test_split(
+        df[MODEL_FEATURES], df[TARGET].astype(int), test_size=0.2, random_state=42,
+        stratify=df[TARGET]
+    )
+    split = PreprocessedSplit(make_preprocessor(), X_train)
+    tuned, trace = tune_candidates(split.X_train, y_train, n_configs=args.configs, eta=args.eta,
+                                   budget_s=args.budget, n_cpus=args.cpus)
+    for name, params in tuned.items():
+        print(f"🏆 {name}: {params}")
+    print(f"✓ Trace of {len(trace)} trials saved to '{save_trace(trace, args.trace)}'")
+
+
+if __name__ == "__main__":
+    main()
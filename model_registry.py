@@ -0,0 +1,250 @@
+"""
+Local file-based model registry
+Each published model is a version directory holding the pickled pipeline,
+its feature info, metrics, the memory-mappable scorer and a manifest. Only
+metrics.json changes after publishing: a rerun that reproduces the model
+replaces it with the latest run's metrics. A one-line CURRENT file names
+the live version and is replaced atomically, so readers always see either
+the old or the new version.
+
+Layout:
+    model_registry/
+        CURRENT                  -> "v0003"
+        versions/v0003/
+            manifest.json
+            pipeline.pkl
+            feature_info.pkl
+            metrics.json
+            scorer/              (fast_scorer.CompiledScorer.save)
+
+Usage:
+    python model_registry.py list
+    python model_registry.py activate v0002
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fast_scorer import CompiledScorer
+
+REGISTRY_DIR = Path("model_registry")
+
+PIPELINE_FILE = "pipeline.pkl"
+FEATURE_INFO_FILE = "feature_info.pkl"
+METRICS_FILE = "metrics.json"
+MANIFEST_FILE = "manifest.json"
+SCORER_SUBDIR = "scorer"
+
+
+@dataclass
+class RegisteredModel:
+    """One loaded registry version"""
+    version: str
+    path: Path
+    manifest: dict
+    feature_info: dict
+    metrics: dict
+    scorer: CompiledScorer
+    _pipeline: object = field(default=None, repr=False)
+
+    def load_pipeline(self):
+        """The pickled sklearn pipeline (loaded on first use; scoring does not need it)"""
+        if self._pipeline is None:
+            import joblib
+
+            self._pipeline = joblib.load(self.path / PIPELINE_FILE)
+        return self._pipeline
+
+
+class ModelRegistry:
+    """Versioned model directories plus an atomically swapped CURRENT pointer"""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+        self.pointer = self.root / "CURRENT"
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def versions(self):
+        """Published versions, oldest first"""
+        if not self.versions_dir.exists():
+            return []
+        return sorted(p.name for p in self.versions_dir.iterdir()
+                      if p.is_dir() and (p / MANIFEST_FILE).exists())
+
+    def current_version(self):
+        """Version named by CURRENT, or None for an empty registry"""
+        try:
+            return self.pointer.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version):
+        return json.loads((self.versions_dir / version / MANIFEST_FILE).read_text())
+
+    def metrics_path(self, version):
+        """The metrics.json stored with ``version``"""
+        return self.versions_dir / version / METRICS_FILE
+
+    def load(self, version=None, mmap_mode="r"):
+        """
+        Load a version (default: CURRENT) for scoring
+
+        Parameters:
+        -----------
+        version : str, optional
+            Version name such as 'v0003'
+        mmap_mode : str or None
+            How to open the scorer arrays; 'r' shares pages between processes
+
+        Returns:
+        --------
+        RegisteredModel
+        """
+        import joblib
+
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No model has been published to '{self.root}'")
+        path = self.versions_dir / version
+        return RegisteredModel(
+            version=version,
+            path=path,
+            manifest=self.manifest(version),
+            feature_info=joblib.load(path / FEATURE_INFO_FILE),
+            metrics=json.loads(self.metrics_path(version).read_text()),
+            scorer=CompiledScorer.load(path / SCORER_SUBDIR, mmap_mode=mmap_mode),
+        )
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def _next_version(self):
+        existing = [int(v[1:]) for v in self.versions() if v[1:].isdigit()]
+        return f"v{max(existing, default=0) + 1:04d}"
+
+    def publish(self, pipeline, feature_info, metrics, activate=True):
+        """
+        Store a trained pipeline as a new version
+
+        The version is assembled in a temporary directory and renamed into
+        place, so a reader never sees a half-written version. Publishing a
+        model identical to the current one (same scorer arrays and feature
+        info) returns the current version, with its metrics replaced by
+        ``metrics``.
+
+        Parameters:
+        -----------
+        pipeline : fitted Pipeline
+            Preprocessing + classifier pipeline
+        feature_info : dict
+            Feature lists, best model name, optimal threshold, ...
+        metrics : dict
+            JSON-serialisable evaluation metrics
+        activate : bool
+            Point CURRENT at the new version
+
+        Returns:
+        --------
+        str : the version name
+        """
+        import joblib
+
+        from churn_data import file_hash
+
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        staging = self.versions_dir / f".staging-{os.getpid()}-{time.time_ns()}"
+        staging.mkdir()
+        try:
+            joblib.dump(pipeline, staging / PIPELINE_FILE)
+            joblib.dump(feature_info, staging / FEATURE_INFO_FILE)
+            (staging / METRICS_FILE).write_text(json.dumps(metrics, indent=2, default=float))
+            CompiledScorer.from_pipeline(pipeline).save(staging / SCORER_SUBDIR)
+
+            # Pickles of identical models can differ byte-wise; the scorer arrays do not
+            scorer_hash = _tree_hash(staging / SCORER_SUBDIR)
+            current = self.current_version()
+            if (current is not None and
+                    self.manifest(current).get("scorer_hash") == scorer_hash and
+                    self.manifest(current).get("feature_info") == _jsonable(feature_info)):
+                os.replace(staging / METRICS_FILE, self.versions_dir / current / METRICS_FILE)
+                shutil.rmtree(staging)
+                return current
+
+            version = self._next_version()
+            manifest = {
+                "version": version,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "model_name": feature_info.get("best_model_name"),
+                "pipeline_hash": file_hash(staging / PIPELINE_FILE),
+                "scorer_hash": scorer_hash,
+                "feature_info": _jsonable(feature_info),
+                "files": sorted(str(p.relative_to(staging)) for p in staging.rglob("*") if p.is_file()),
+            }
+            (staging / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+            staging.rename(self.versions_dir / version)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Atomically point CURRENT at ``version``"""
+        if not (self.versions_dir / version / MANIFEST_FILE).exists():
+            raise ValueError(f"Unknown version '{version}'. Versions: {', '.join(self.versions())}")
+        tmp = self.pointer.with_suffix(".tmp")
+        tmp.write_text(version + "\n")
+        os.replace(tmp, self.pointer)
+
+
+def _tree_hash(path):
+    """Hash of every file (name and content) under a directory"""
+    digest = hashlib.sha256()
+    for file in sorted(p for p in Path(path).rglob("*") if p.is_file()):
+        digest.update(str(file.relative_to(path)).encode())
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def _jsonable(obj):
+    """Round-trip through JSON so numpy scalars compare equal to stored manifests"""
+    return json.loads(json.dumps(obj, default=float))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local churn model registry")
+    parser.add_argument("--root", default=str(REGISTRY_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show published versions")
+    act = sub.add_parser("activate", help="Point CURRENT at a version (deploy or roll back)")
+    act.add_argument("version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "activate":
+        registry.activate(args.version)
+        print(f"✓ CURRENT -> {args.version}")
+        return
+
+    current = registry.current_version()
+    for version in registry.versions():
+        manifest = registry.manifest(version)
+        auc = manifest["feature_info"].get("best_auc")
+        marker = "*" if version == current else " "
+        print(f"{marker} {version}  {manifest['created_at']}  {manifest['model_name']:<20} "
+              f"AUC={auc:.4f}" if auc is not None else f"{marker} {version}  {manifest['created_at']}")
+
+
+if __name__ == "__main__":
+    main()
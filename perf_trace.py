@@ -0,0 +1,262 @@
+"""
+Lightweight timing and memory instrumentation
+Spans (a context manager or decorator) record wall time, CPU time and peak
+memory and are appended to a Chrome-trace JSON file, which opens in
+chrome://tracing or https://ui.perfetto.dev and feeds the dashboard's
+"⏱ Performance" page.
+
+The file uses the trace format's JSON-array form, whose closing ``]`` is
+optional, so each finished span is one appended line. The training script
+and every dashboard process write to the same file without rewriting it.
+Each process labels its events (e.g. "training", "dashboard"). The file
+is rotated to ``<name>.1`` once it grows past MAX_TRACE_BYTES.
+
+Per span:
+- ``dur``: wall time (the trace format's microseconds)
+- ``args.cpu_ms``: CPU time of this process and of any child processes
+  that finished during the span (e.g. worker pools)
+- ``args.peak_mb``/``args.mem_delta_mb``: the resident set's high-water
+  mark during the span, absolute and above the span's starting RSS. The
+  mark is reset through /proc/self/clear_refs (Linux). Elsewhere it
+  is the process-lifetime peak, and spans running at the same time in
+  other threads share it.
+
+Usage:
+    tracer = Tracer(process_name="training")
+    with tracer.span("train", cat="stage"):
+        ...
+
+    @tracer.traced(cat="data")
+    def load_data(): ...
+
+    python perf_trace.py             # summary of the latest training run
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_PATH = Path("perf_trace.json")
+MAX_TRACE_BYTES = 20 * 2**20
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return 0
+
+
+def _peak_bytes():
+    """Resident set high-water mark (since the last _reset_peak on Linux)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+def _reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _cpu_seconds():
+    """CPU time of this process plus its finished child processes"""
+    if resource is None:
+        return time.process_time()
+    own, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class Tracer:
+    """
+    Appends spans of one process to a Chrome-trace file
+
+    Parameters:
+    -----------
+    path : str or Path
+        Trace file (created on the first span)
+    process_name : str, optional
+        Label of this process's events in the trace and on the dashboard
+    enabled : bool
+        When False, spans only run their body
+    """
+
+    def __init__(self, path=TRACE_PATH, process_name=None, enabled=True):
+        self.path = Path(path)
+        self.process_name = process_name or Path(sys.argv[0] or "python").stem
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._named_pid = None
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _write(self, event):
+        pid = os.getpid()
+        event.update(pid=pid, tid=threading.get_ident() % 2**31)
+        with self._lock:
+            try:
+                if self.path.stat().st_size > MAX_TRACE_BYTES:
+                    self.path.replace(self.path.with_name(self.path.name + ".1"))
+                    self._named_pid = None
+            except FileNotFoundError:
+                pass
+            lines = [] if self.path.exists() else ["[\n"]
+            if self._named_pid != pid:  # First event of this process in this file (also after a fork)
+                lines.append(json.dumps({'name': "process_name", 'ph': "M", 'pid': pid, 'tid': 0,
+                                         'args': {'name': self.process_name}}) + ",\n")
+            lines.append(json.dumps(event) + ",\n")
+            with open(self.path, "a") as f:
+                f.write("".join(lines))
+            self._named_pid = pid
+
+    @contextmanager
+    def span(self, name, cat="stage", memory=True, **args):
+        """
+        Time the body as one trace event
+
+        Parameters:
+        -----------
+        name, cat : str
+            Event name and category (the dashboard groups by category)
+        memory : bool
+            Track peak memory. Resetting the high-water mark costs a
+            syscall, so pass False for microsecond-scale spans.
+        **args : JSON-serialisable values stored with the event
+        """
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        frame = {'peak': 0}
+        if memory:
+            if stack:  # Keep the enclosing span's peak before resetting the mark
+                stack[-1]['peak'] = max(stack[-1]['peak'], _peak_bytes())
+            _reset_peak()
+        start_rss = _rss_bytes() if memory else 0
+        stack.append(frame)
+        ts = time.time_ns() // 1000
+        cpu_start = _cpu_seconds()
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as exc:
+            args['error'] = type(exc).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            cpu = _cpu_seconds() - cpu_start
+            stack.pop()
+            args['cpu_ms'] = round(cpu * 1000, 3)
+            if memory:
+                frame['peak'] = max(frame['peak'], _peak_bytes())
+                args['peak_mb'] = round(frame['peak'] / 2**20, 1)
+                args['mem_delta_mb'] = round(max(frame['peak'] - start_rss, 0) / 2**20, 1)
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], frame['peak'])
+            self._write({'name': name, 'cat': cat, 'ph': "X", 'ts': ts,
+                         'dur': round(elapsed * 1e6, 1), 'args': args})
+
+    def traced(self, name=None, cat="call", memory=True):
+        """Decorator form of span (named after the function by default)"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*a, **kw):
+                with self.span(name or func.__name__, cat=cat, memory=memory):
+                    return func(*a, **kw)
+            return wrapper
+        return decorator
+
+
+def read_trace(path=TRACE_PATH):
+    """
+    Events of a trace file (unterminated or closed JSON array, or a
+    ``{"traceEvents": [...]}`` object); [] when the file does not exist
+    """
+    try:
+        text = Path(path).read_text().strip()
+    except FileNotFoundError:
+        return []
+    if text.startswith("{"):
+        return json.loads(text)['traceEvents']
+    lines = text.rstrip(",]").splitlines()
+    try:
+        return json.loads("\n".join(lines) + "]")
+    except json.JSONDecodeError:  # A writer was mid-append; drop its partial line
+        return json.loads("\n".join(lines[:-1]).rstrip(",") + "]")
+
+
+def trace_frame(events):
+    """
+    Complete ("X") events as a DataFrame
+
+    Returns:
+    --------
+    pd.DataFrame : name, cat, process, pid, start (datetime), wall_ms,
+        cpu_ms, peak_mb, mem_delta_mb and error, in start order
+    """
+    import pandas as pd
+
+    names = {e['pid']: e['args']['name'] for e in events if e.get('ph') == "M" and e.get('name') == "process_name"}
+    rows = [{
+        'name': e['name'], 'cat': e.get('cat', ""), 'process': names.get(e['pid'], str(e['pid'])),
+        'pid': e['pid'], 'start': pd.to_datetime(e['ts'], unit="us"), 'wall_ms': e['dur'] / 1000,
+        'cpu_ms': e['args'].get('cpu_ms'), 'peak_mb': e['args'].get('peak_mb'),
+        'mem_delta_mb': e['args'].get('mem_delta_mb'), 'error': e['args'].get('error'),
+    } for e in events if e.get('ph') == "X"]
+    columns = ['name', 'cat', 'process', 'pid', 'start', 'wall_ms', 'cpu_ms', 'peak_mb', 'mem_delta_mb', 'error']
+    return pd.DataFrame(rows, columns=columns).sort_values('start', ignore_index=True)
+
+
+def latest_run(frame, process="training"):
+    """Events of the most recent process with the given label"""
+    runs = frame[frame['process'] == process]
+    if runs.empty:
+        return runs
+    return runs[runs['pid'] == runs['pid'].iloc[-1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a performance trace")
+    parser.add_argument("trace", nargs="?", default=str(TRACE_PATH))
+    parser.add_argument("--process", default="training", help="Process label to summarise (latest run)")
+    args = parser.parse_args()
+
+    run = latest_run(trace_frame(read_trace(args.trace)), args.process)
+    if run.empty:
+        print(f"No '{args.process}' events in '{args.trace}'")
+        return
+    print(f"{'span':<28}{'cat':<12}{'wall (s)':>10}{'cpu (s)':>10}{'peak MB':>10}{'Δ MB':>8}")
+    for row in run.itertuples():
+        print(f"{row.name:<28}{row.cat:<12}{row.wall_ms / 1000:>10.2f}{row.cpu_ms / 1000:>10.2f}"
+              f"{row.peak_mb or 0:>10.0f}{row.mem_delta_mb or 0:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
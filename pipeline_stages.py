@@ -0,0 +1,249 @@
+"""
+Stage runner with on-disk checkpoints
+Each stage declares its upstream stages, the config keys it reads and the
+files it writes. Its outputs are cached on disk under a fingerprint of its
+code (the stage function, the same-file helpers it calls and the source of
+every project module it uses), its config, any extra inputs (e.g. the data
+file's content hash) and the fingerprints of its upstream stages, so a rerun
+only executes stages whose checkpoint is missing or out of date. A stage that
+reruns under an unchanged fingerprint (--only, --from) may still produce new
+outputs, so the checkpoints of every stage downstream of it are cleared.
+
+With a perf_trace.Tracer, every executed stage and every checkpoint read or
+write is recorded as a span (wall time, CPU time, peak memory).
+"""
+
+import hashlib
+import inspect
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import joblib
+
+from perf_trace import Tracer
+
+STAGE_CACHE_DIR = Path(".cache") / "stages"
+
+
+@dataclass
+class Stage:
+    """
+    One named step of the pipeline
+
+    ``func(ctx)`` receives the config values listed in ``config_keys`` plus the
+    outputs of every stage in ``deps``, and returns a dict of new outputs.
+    ``artifacts`` are files the stage writes; a missing artifact invalidates
+    the checkpoint. ``extra`` returns additional fingerprint input, such as
+    a data file's content hash.
+    """
+    name: str
+    func: Callable
+    deps: Tuple[str, ...] = ()
+    config_keys: Tuple[str, ...] = ()
+    artifacts: Tuple[str, ...] = ()
+    extra: Optional[Callable] = None
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def _global_names(code):
+    """Global names a code object (and the functions nested in it) may read"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _global_names(const)
+    return names
+
+
+def _project_module(obj, root):
+    """The module ``obj`` is (or was defined in), if its file lives in ``root``"""
+    module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+    path = getattr(module, "__file__", None)
+    if path is None or Path(path).resolve().parent != root:
+        return None
+    return module
+
+
+def code_sources(func):
+    """
+    Source code a stage function depends on
+
+    Walks the globals the function reads: functions and classes defined in its
+    own module contribute their source (and functions are followed in turn),
+    other modules in the same directory contribute their whole file, along
+    with the project modules they import. Library code is left out.
+
+    Returns:
+    --------
+    dict
+        {function qualname or module file name: source}
+    """
+    home = inspect.getmodule(func)
+    root = Path(inspect.getfile(func)).resolve().parent
+    sources = {func.__qualname__: inspect.getsource(func)}
+    functions, modules = [func], []
+    while functions:
+        current = functions.pop()
+        for name in _global_names(current.__code__):
+            obj = current.__globals__.get(name)
+            module = _project_module(obj, root) if obj is not None else None
+            if module is None:
+                continue
+            if module is not home:
+                modules.append(module)
+            elif (inspect.isfunction(obj) or inspect.isclass(obj)) and obj.__qualname__ not in sources:
+                sources[obj.__qualname__] = inspect.getsource(obj)
+                if inspect.isfunction(obj):
+                    functions.append(obj)
+    while modules:
+        module = modules.pop()
+        key = Path(module.__file__).name
+        if key in sources:
+            continue
+        sources[key] = Path(module.__file__).read_text()
+        for value in vars(module).values():
+            imported = _project_module(value, root)
+            if imported is not None and imported is not home:
+                modules.append(imported)
+    return sources
+
+
+class StagePipeline:
+    """Runs stages in order, skipping those with a valid checkpoint"""
+
+    def __init__(self, stages, config, cache_dir=STAGE_CACHE_DIR, tracer=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.config = config
+        self.cache_dir = Path(cache_dir)
+        self.tracer = tracer or Tracer(enabled=False)
+        self._outputs = {}
+        self._fingerprints = None
+        for stage in stages:
+            for dep in stage.deps:
+                if self.order.index(dep) >= self.order.index(stage.name):
+                    raise ValueError(f"Stage '{stage.name}' depends on later stage '{dep}'")
+
+    # ------------------------------------------------------------------
+    # Fingerprints and checkpoints
+    # ------------------------------------------------------------------
+    def fingerprints(self):
+        """Fingerprint per stage (code sources + config + extra inputs + upstream fingerprints)"""
+        if self._fingerprints is None:
+            fps = {}
+            for name in self.order:
+                stage = self.stages[name]
+                fps[name] = _digest({
+                    "name": name,
+                    "code": code_sources(stage.func),
+                    "config": {key: self.config[key] for key in stage.config_keys},
+                    "extra": stage.extra(self.config) if stage.extra else None,
+                    "deps": [fps[dep] for dep in stage.deps],
+                })
+            self._fingerprints = fps
+        return self._fingerprints
+
+    def checkpoint_path(self, name):
+        return self.cache_dir / f"{name}-{self.fingerprints()[name][:16]}.joblib"
+
+    def is_valid(self, name):
+        """Checkpoint exists for the current fingerprint and all artifacts are on disk"""
+        return (self.checkpoint_path(name).exists() and
+                all(Path(a).exists() for a in self.stages[name].artifacts))
+
+    def _save(self, name, outputs):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._clear([name])  # Keep one checkpoint per stage
+        path = self.checkpoint_path(name)
+        tmp = path.with_suffix(".tmp")
+        with self.tracer.span(f"{name} (save checkpoint)", cat="checkpoint"):
+            joblib.dump(outputs, tmp)
+        tmp.replace(path)
+
+    def downstream(self, name):
+        """Every stage that reads ``name``'s outputs, directly or through other stages"""
+        found = {name}
+        for other in self.order[self.order.index(name) + 1:]:
+            if found.intersection(self.stages[other].deps):
+                found.add(other)
+        found.discard(name)
+        return [other for other in self.order if other in found]
+
+    def _clear(self, names):
+        for name in names:
+            for old in self.cache_dir.glob(f"{name}-*.joblib"):
+                old.unlink()
+
+    def outputs(self, name):
+        """Outputs of a stage, from memory or its checkpoint"""
+        if name not in self._outputs:
+            with self.tracer.span(f"{name} (load checkpoint)", cat="checkpoint"):
+                self._outputs[name] = joblib.load(self.checkpoint_path(name))
+        return self._outputs[name]
+
+    # ------------------------------------------------------------------
+    # Planning and execution
+    # ------------------------------------------------------------------
+    def _upstream(self, names):
+        """``names`` plus every stage they read from, directly or indirectly"""
+        found = set(names)
+        for name in reversed(self.order):
+            if name in found:
+                found.update(self.stages[name].deps)
+        return found
+
+    def plan(self, only=None, start_from=None, force=False):
+        """Names of the stages that will execute, in order"""
+        for name in (only, start_from):
+            if name is not None and name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(self.order)}")
+        if only is not None:
+            targets = {only}
+        elif start_from is not None:
+            targets = set(self.order[self.order.index(start_from):])
+        elif force:
+            targets = set(self.order)
+        else:
+            targets = {name for name in self.order if not self.is_valid(name)}
+        # An upstream stage runs when its checkpoint is invalid or when one of
+        # its own inputs is being recomputed
+        scope = self._upstream(targets) if only is not None else set(self.order)
+        to_run = []
+        for name in self.order:
+            if name in targets or (name in scope and (
+                    not self.is_valid(name) or set(self.stages[name].deps).intersection(to_run))):
+                to_run.append(name)
+        return to_run
+
+    def run(self, only=None, start_from=None, force=False):
+        """Execute the planned stages and return {stage name: seconds}"""
+        to_run = self.plan(only=only, start_from=start_from, force=force)
+        affected = {name for ran in to_run for name in self.downstream(ran)}
+        stale = [name for name in self.order if name in affected and name not in to_run
+                 and any(self.cache_dir.glob(f"{name}-*.joblib"))]
+        if stale:
+            # Their checkpoints were computed from outputs that are about to change
+            print(f"🧹 Clearing downstream checkpoints: {', '.join(stale)}")
+            self._clear(stale)
+        timings = {}
+        for name in self.order:
+            if name not in to_run:
+                if only is None:
+                    print(f"⏭  Stage '{name}' is up to date (cached)")
+                continue
+            stage = self.stages[name]
+            ctx = {key: self.config[key] for key in stage.config_keys}
+            for dep in stage.deps:
+                ctx.update(self.outputs(dep))
+            start = time.perf_counter()
+            with self.tracer.span(name, cat="stage"):
+                outputs = stage.func(ctx) or {}
+            timings[name] = time.perf_counter() - start
+            self._outputs[name] = outputs
+            self._save(name, outputs)
+        return timings
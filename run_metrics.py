@@ -0,0 +1,219 @@
+"""
+Per-run model metrics for the dashboard and the model registry
+The training script (and stream_train.py) measures every candidate model
+once and writes the results to a small JSON file, and stores the same dict
+with the registry version it publishes. The dashboard's Model Performance
+page reads the served version's copy instead of the raw data or the model.
+Per candidate:
+- quality on the holdout: AUC, average precision, accuracy, precision,
+  recall, F1 and the confusion matrix (at a 0.5 threshold)
+- ROC and precision-recall curves resampled to CURVE_POINTS points on a
+  fixed FPR/recall grid, so the file size does not grow with the holdout
+- cost: fit time, batch throughput of the compiled scorer, single-row
+  p50/p99 latency and the pickled model's size
+
+Usage:
+    python run_metrics.py                # comparison table of the latest run
+"""
+
+import argparse
+import json
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+
+from churn_features import METRICS_PATH
+
+CURVE_POINTS = 101
+DEFAULT_LATENCY_CALLS = 1000
+
+
+def curve_points(y_true, proba, n_points=CURVE_POINTS):
+    """
+    ROC and precision-recall curves on a fixed grid
+
+    The ROC curve is linearly interpolated at evenly spaced false positive
+    rates. Precision is the interpolated precision (the best precision at
+    any recall >= r) at evenly spaced recalls.
+
+    Returns:
+    --------
+    dict : 'roc' {'fpr', 'tpr'} and 'pr' {'recall', 'precision'} lists
+    """
+    from sklearn.metrics import precision_recall_curve, roc_curve
+
+    grid = np.linspace(0.0, 1.0, n_points)
+
+    fpr, tpr, _ = roc_curve(y_true, proba)
+    # Last curve point at or left of each grid FPR (the top of a vertical step) and the next one
+    left = np.clip(np.searchsorted(fpr, grid, side="right") - 1, 0, len(fpr) - 1)
+    right = np.minimum(left + 1, len(fpr) - 1)
+    span = fpr[right] - fpr[left]
+    weight = np.divide(grid - fpr[left], span, out=np.zeros_like(grid), where=span > 0)
+    tpr_grid = tpr[left] + weight * (tpr[right] - tpr[left])
+
+    precision, recall, _ = precision_recall_curve(y_true, proba)
+    order = np.argsort(recall, kind="stable")
+    recall, precision = recall[order], precision[order]
+    best_from = np.maximum.accumulate(precision[::-1])[::-1]  # Best precision at recall >= recall[i]
+    precision_grid = best_from[np.minimum(np.searchsorted(recall, grid, side="left"), len(recall) - 1)]
+
+    return {
+        'roc': {'fpr': np.round(grid, 4).tolist(), 'tpr': np.round(tpr_grid, 4).tolist()},
+        'pr': {'recall': np.round(grid, 4).tolist(), 'precision': np.round(precision_grid, 4).tolist()},
+    }
+
+
+def serving_cost(model, X, latency_calls=DEFAULT_LATENCY_CALLS, repeat=3):
+    """
+    Batch throughput, single-row latency and size of a fitted pipeline
+
+    Both timings use the compiled scorer the app and batch scorer serve with.
+
+    Parameters:
+    -----------
+    model : fitted Pipeline
+    X : pd.DataFrame
+        Customers with the pipeline's input columns (e.g. the holdout)
+    latency_calls : int
+        Single-row predictions timed (the first rows of X, after one warm-up call)
+    repeat : int
+        Batch passes over X; the fastest one is reported
+
+    Returns:
+    --------
+    dict : batch_rows_per_s, latency_p50_us, latency_p99_us, model_bytes
+    """
+    from fast_scorer import compile_pipeline
+
+    scorer = compile_pipeline(model)
+    batch = min(_timed(scorer.predict_proba_frame, X) for _ in range(repeat))
+
+    customers = X.head(latency_calls).to_dict("records")
+    scorer.predict_proba_one(customers[0])
+    timings = np.empty(len(customers))
+    for i, customer in enumerate(customers):
+        start = time.perf_counter_ns()
+        scorer.predict_proba_one(customer)
+        timings[i] = (time.perf_counter_ns() - start) / 1000
+    p50, p99 = np.percentile(timings, [50, 99])
+
+    return {
+        'batch_rows_per_s': len(X) / batch,
+        'latency_p50_us': float(p50),
+        'latency_p99_us': float(p99),
+        'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def candidate_metrics(model, X_test, y_test, proba, fit_time=None, threshold=0.5,
+                      n_points=CURVE_POINTS, latency_calls=DEFAULT_LATENCY_CALLS):
+    """
+    Quality, curves and serving cost of one candidate on the holdout
+
+    Parameters:
+    -----------
+    model : fitted Pipeline
+    X_test, y_test : holdout features and labels
+    proba : array-like
+        The model's churn probabilities for X_test
+    fit_time : float, optional
+        Training wall time in seconds
+    threshold : float
+        Cut-off for accuracy/precision/recall/F1 and the confusion matrix
+
+    Returns:
+    --------
+    dict (JSON-serialisable)
+    """
+    from sklearn.metrics import (
+        accuracy_score, average_precision_score, confusion_matrix, f1_score,
+        precision_score, recall_score, roc_auc_score
+    )
+
+    y_true = np.asarray(y_test)
+    proba = np.asarray(proba, dtype=float)
+    pred = (proba >= threshold).astype(int)
+    return {
+        'auc': float(roc_auc_score(y_true, proba)),
+        'average_precision': float(average_precision_score(y_true, proba)),
+        'accuracy': float(accuracy_score(y_true, pred)),
+        'precision': float(precision_score(y_true, pred, zero_division=0)),
+        'recall': float(recall_score(y_true, pred)),
+        'f1': float(f1_score(y_true, pred)),
+        'threshold': threshold,
+        'confusion_matrix': confusion_matrix(y_true, pred, labels=[0, 1]).tolist(),
+        'fit_time': None if fit_time is None else float(fit_time),
+        **serving_cost(model, X_test, latency_calls=latency_calls),
+        **curve_points(y_true, proba, n_points=n_points),
+    }
+
+
+def save_run_metrics(metrics, path=METRICS_PATH):
+    """Write run metrics atomically (the app may be reading the old file)"""
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps(metrics, indent=1, default=float))
+    tmp.replace(path)
+    return path
+
+
+def load_run_metrics(path=METRICS_PATH):
+    """Saved run metrics, or None when the training script has not written them"""
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def is_run_metrics(metrics):
+    """True for metrics in this module's format (registry versions published before it hold scalars only)"""
+    candidates = (metrics or {}).get('candidates') or {}
+    return bool(candidates) and 'best_model' in metrics and all('roc' in m for m in candidates.values())
+
+
+def comparison_frame(metrics):
+    """
+    One row per candidate (best first) with the scalar metrics
+
+    Returns:
+    --------
+    pd.DataFrame indexed by model name
+    """
+    import pandas as pd
+
+    columns = ['auc', 'average_precision', 'accuracy', 'precision', 'recall', 'f1', 'fit_time',
+               'batch_rows_per_s', 'latency_p50_us', 'latency_p99_us', 'model_bytes']
+    frame = pd.DataFrame.from_dict(metrics['candidates'], orient="index")[columns]
+    best = metrics.get('best_model')
+    return frame.sort_values('auc', ascending=False).sort_index(key=lambda idx: idx != best, kind="stable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the metrics of the latest training run")
+    parser.add_argument("path", nargs="?", default=METRICS_PATH)
+    args = parser.parse_args()
+
+    metrics = load_run_metrics(args.path)
+    if metrics is None:
+        print(f"No run metrics in '{args.path}'. Run churn_prediction_complete.py first.")
+        return
+    print(f"Run {metrics['created_at']}: best model {metrics['best_model']} "
+          f"(version {metrics.get('model_version') or '-'}), {metrics['data']['test_rows']:,} holdout customers")
+    print(f"{'model':<22}{'AUC':>7}{'AP':>7}{'F1':>7}{'fit (s)':>9}{'rows/s':>11}"
+          f"{'p50 us':>8}{'p99 us':>8}{'KB':>9}")
+    for name, row in comparison_frame(metrics).iterrows():
+        print(f"{name:<22}{row['auc']:>7.3f}{row['average_precision']:>7.3f}{row['f1']:>7.3f}"
+              f"{row['fit_time'] or 0:>9.2f}{row['batch_rows_per_s']:>11,.0f}"
+              f"{row['latency_p50_us']:>8.0f}{row['latency_p99_us']:>8.0f}{row['model_bytes'] / 1024:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
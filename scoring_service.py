@@ -0,0 +1,330 @@
+"""
+Churn scoring HTTP service
+A small stdlib-only (asyncio) HTTP/1.1 server for calling the churn model
+from other systems. Requests are not scored one by one: every request goes
+onto an asyncio queue, and a single batching task drains it into
+micro-batches (up to ``max_batch`` customers, or whatever has arrived within
+``max_wait_ms`` of the first one) that are scored with one vectorised
+``predict_proba`` call. Under load this amortises the per-call overhead;
+when idle a request waits at most ``max_wait_ms``. The queue is bounded, so an
+overloaded service answers 503 instead of letting latency grow without limit.
+
+The model is the model registry's CURRENT version (else the saved best
+model) and is swapped in without a restart when a new version is promoted.
+
+Endpoints:
+    POST /score         one customer (JSON object)      -> prediction
+    POST /score/batch   {"customers": [...]} or [...]   -> {"predictions": [...]}
+    GET  /health        model version and batching statistics
+
+Usage:
+    python scoring_service.py --port 8000
+    curl -s localhost:8000/score -d '{"CreditScore": 650, "Age": 45, ...}'
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import time
+
+from churn_features import RISK_LABELS, RISK_THRESHOLDS
+from churn_scoring import load_current_model, load_feature_info, load_scorer
+
+MAX_BODY_BYTES = 8 * 2**20
+MAX_CUSTOMERS_PER_REQUEST = 10_000
+MODEL_CHECK_INTERVAL = 1.0  # Seconds between checks of the registry's CURRENT pointer
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ModelHandle:
+    """Current scorer, threshold and version; rechecks the registry at most once per interval"""
+
+    def __init__(self, check_interval=MODEL_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._checked_at = float("-inf")
+        self.refresh()
+
+    def refresh(self):
+        registered = load_current_model()
+        if registered is not None:
+            self.scorer, feature_info, self.version = (
+                registered.scorer, registered.feature_info, registered.version)
+        else:
+            self.scorer, feature_info, self.version = load_scorer(), load_feature_info(), None
+        self.threshold = feature_info['optimal_threshold']
+        self._checked_at = time.monotonic()
+
+    def current(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self.scorer, self.threshold, self.version
+
+
+class MicroBatcher:
+    """
+    Gathers concurrently submitted customers into micro-batches
+
+    Parameters:
+    -----------
+    model : ModelHandle
+        Source of the scorer; read once per batch, so a model swap never
+        splits a batch
+    max_batch : int
+        Score as soon as this many customers are waiting
+    max_wait_ms : float
+        Longest the first customer of a batch waits for others to arrive
+    max_queue : int
+        Pending requests beyond this are rejected (HTTP 503)
+    """
+
+    def __init__(self, model, max_batch=128, max_wait_ms=2.0, max_queue=4096):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.batches = 0
+        self.rows = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, customers):
+        """
+        Score a list of customer dicts
+
+        Returns:
+        --------
+        tuple : (list of prediction dicts, threshold, model version)
+
+        Raises asyncio.QueueFull when the service is saturated and
+        ValueError for customers with missing/invalid features.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((customers, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            size = len(jobs[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    job = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        job = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                jobs.append(job)
+                size += len(job[0])
+            try:
+                self._score(jobs)
+            except Exception as e:  # Keep the batching task alive; fail just these requests
+                for _, future in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _score(self, jobs):
+        scorer, threshold, version = self.model.current()
+        customers = [c for job_customers, _ in jobs for c in job_customers]
+        try:
+            probas = scorer.predict_proba(customers).tolist()
+        except (ValueError, TypeError, KeyError):
+            # A bad customer in the batch: score each job alone so only its request fails
+            for job in jobs:
+                self._score_one_job(job, scorer, threshold, version)
+            return
+        self.batches += 1
+        self.rows += len(customers)
+        start = 0
+        for job_customers, future in jobs:
+            end = start + len(job_customers)
+            if not future.done():  # The client may have gone away
+                future.set_result((_predictions(probas[start:end], threshold), threshold, version))
+            start = end
+
+    def _score_one_job(self, job, scorer, threshold, version):
+        job_customers, future = job
+        try:
+            probas = scorer.predict_proba(job_customers).tolist()
+        except (ValueError, TypeError, KeyError) as e:
+            if not future.done():
+                future.set_exception(ValueError(str(e)))
+            return
+        self.batches += 1
+        self.rows += len(job_customers)
+        if not future.done():
+            future.set_result((_predictions(probas, threshold), threshold, version))
+
+
+def _predictions(probas, threshold):
+    return [{'churn_probability': p,
+             'will_churn': p >= threshold,
+             'risk_segment': RISK_LABELS[bisect.bisect_right(RISK_THRESHOLDS, p)]}
+            for p in probas]
+
+
+class ScoringService:
+    """HTTP front end: parses requests and hands customers to the MicroBatcher"""
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.requests = 0
+        self.started = time.time()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    writer.write(_response(431, {'error': "Request headers too large"}, keep_alive=False))
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, http_version = request_line.split()
+                except ValueError:
+                    writer.write(_response(400, {'error': "Malformed request line"}, keep_alive=False))
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    writer.write(_response(413, {'error': f"Body larger than {MAX_BODY_BYTES} bytes"},
+                                           keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = (http_version == "HTTP/1.1" and
+                              headers.get("connection", "").lower() != "close")
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client closed the connection
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        self.requests += 1
+        path = target.split("?", 1)[0]
+        if path == "/health":
+            if method != "GET":
+                return 405, {'error': "Use GET"}
+            return 200, self.health()
+        if path not in ("/score", "/score/batch"):
+            return 404, {'error': f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {'error': "Use POST with a JSON body"}
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, {'error': "Body is not valid JSON"}
+        if path == "/score":
+            if not isinstance(data, dict):
+                return 400, {'error': "Expected a JSON object with the customer's features"}
+            customers = [data]
+        else:
+            customers = data.get("customers") if isinstance(data, dict) else data
+            if not isinstance(customers, list) or not all(isinstance(c, dict) for c in customers):
+                return 400, {'error': 'Expected {"customers": [...]} or a JSON list of customer objects'}
+            if len(customers) > MAX_CUSTOMERS_PER_REQUEST:
+                return 413, {'error': f"At most {MAX_CUSTOMERS_PER_REQUEST} customers per request"}
+            if not customers:
+                return 200, {'predictions': [], 'model_version': self.batcher.model.version}
+
+        try:
+            predictions, threshold, version = await self.batcher.submit(customers)
+        except asyncio.QueueFull:
+            return 503, {'error': "Scoring queue is full, retry later"}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f"Scoring failed: {e}"}
+
+        if path == "/score":
+            return 200, dict(predictions[0], threshold_used=threshold, model_version=version)
+        return 200, {'predictions': predictions, 'threshold_used': threshold, 'model_version': version}
+
+    def health(self):
+        batcher = self.batcher
+        return {
+            'status': "ok",
+            'model_version': batcher.model.version,
+            'uptime_s': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'queued': batcher.queue.qsize(),
+            'batches': batcher.batches,
+            'rows_scored': batcher.rows,
+            'mean_batch_size': round(batcher.rows / batcher.batches, 2) if batcher.batches else 0.0,
+        }
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve(host="127.0.0.1", port=8000, max_batch=128, max_wait_ms=2.0, max_queue=4096):
+    """Run the scoring service until cancelled"""
+    model = ModelHandle()
+    batcher = MicroBatcher(model, max_batch=max_batch, max_wait_ms=max_wait_ms, max_queue=max_queue)
+    service = ScoringService(batcher)
+    batcher.start()
+    server = await asyncio.start_server(service.handle_connection, host, port, backlog=1024)
+    print(f"✓ Serving model {model.version or '(flat files)'} on http://{host}:{port} "
+          f"(max_batch={max_batch}, max_wait={max_wait_ms}ms, max_queue={max_queue})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Churn scoring HTTP service with micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=128, help="Customers per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="Longest a request waits for a batch to fill")
+    parser.add_argument("--max-queue", type=int, default=4096,
+                        help="Pending requests before the service answers 503")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch, args.max_wait_ms, args.max_queue))
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
+
+
+if __name__ == "__main__":
+    main()
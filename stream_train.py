@@ -0,0 +1,472 @@
+"""
+Out-of-core training for customer tables larger than memory
+Trains the churn candidates from a CSV/Parquet file read in chunks, so the
+table (or a copy of it) is never materialised:
+
+- rows are assigned to train / validation / holdout by a hash of their
+  CustomerId, so the split is stable across chunks, reruns and appended rows
+- one pass fits the StandardScaler with partial_fit and collects the
+  categories and class counts of the training rows
+- Logistic Regression is trained as a log-loss SGDClassifier with
+  partial_fit, a few epochs over the chunks
+- XGBoost reads the chunks through an xgb.DataIter into an
+  ExtMemQuantileDMatrix (quantized pages cached on disk, native
+  categoricals) and early-stops on the validation rows
+- holdout scores are reservoir-sampled, so evaluation memory is bounded too;
+  the run's metrics (run_metrics.py format, curves and serving cost
+  included) come from that sample
+
+The chunk size, the reservoir and the share of training rows XGBoost sees
+are derived from a memory cap (``--memory-cap-mb``).
+
+Usage:
+    python stream_train.py customers.csv --memory-cap-mb 1024
+    python stream_train.py customers.csv --no-publish --output-dir candidate_model
+    python churn_prediction_complete.py --stream
+"""
+
+import argparse
+import os
+import shutil
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from batch_score import iter_chunks
+from churn_features import (
+    CATEGORICAL_FEATURES, FEATURE_INFO_PATH, METRICS_PATH, NUMERIC_FEATURES, SCORER_DIR, TARGET,
+    add_engineered_features, model_filename
+)
+from churn_models import CategoryCaster, evaluate_scores, make_classifiers, make_preprocessor
+from fast_scorer import compile_pipeline
+from run_metrics import DEFAULT_LATENCY_CALLS, candidate_metrics, save_run_metrics
+from threshold_analysis import optimal_threshold, threshold_curve
+from xgb_fast import MAX_BIN, fit_early_stopped
+
+EXTMEM_CACHE_DIR = Path(".cache") / "xgb_extmem"
+
+# Where an unpublished run's model goes, away from the files the app and batch scorer read
+STREAM_OUTPUT_DIR = Path("streamed_model")
+
+TRAIN, VALIDATION, HOLDOUT = 0, 1, 2
+
+# How the memory left after the interpreter and libraries is spent; the rest is
+# headroom for the growing booster (and its copies when it is saved) and allocator slack
+CHUNK_MEMORY_SHARE = 0.3       # One chunk in flight, with its intermediate copies
+CHUNK_COPIES = 8               # Raw chunk, engineered columns, partition slices, transformed matrices
+XGB_MEMORY_SHARE = 0.3         # XGBoost's per-row training state
+XGB_ROW_STATE_BYTES = 96       # Gradients, prediction caches, row partitions and histograms (measured)
+RESERVOIR_MEMORY_SHARE = 0.05  # Sampled holdout labels and scores
+PROBE_ROWS = 1000
+SERVING_SAMPLE_ROWS = 10_000   # Holdout customers the serving cost is timed on
+
+
+def _rss_bytes():
+    """Resident set size of this process (0 where it cannot be read)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def hash_unit(ids, salt=0):
+    """
+    Deterministic uniform [0, 1) value per id (splitmix64 finaliser)
+
+    The same customer always lands in the same partition, whichever chunk
+    it arrives in.
+    """
+    h = np.asarray(ids).astype(np.uint64) + np.uint64(salt * 0x9E3779B97F4A7C15 % 2**64)
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return (h >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+
+
+class ChunkedTable:
+    """
+    A customer file read in chunks and hash-partitioned into train/validation/holdout
+
+    Parameters:
+    -----------
+    path : str or Path
+        Churn_Modelling-shaped CSV or Parquet file (with the Exited label)
+    chunksize : int
+        Rows per chunk
+    validation_fraction, holdout_fraction : float
+        Share of customers used for early stopping and for evaluation
+    """
+
+    def __init__(self, path, chunksize, validation_fraction=0.1, holdout_fraction=0.2, random_state=42):
+        self.path = path
+        self.chunksize = chunksize
+        self.validation_fraction = validation_fraction
+        self.holdout_fraction = holdout_fraction
+        self.random_state = random_state
+
+    def _chunks(self):
+        offset = 0
+        for chunk in iter_chunks(self.path, self.chunksize, extra_columns=(TARGET,)):
+            add_engineered_features(chunk)
+            if 'CustomerId' in chunk:
+                ids = chunk['CustomerId'].to_numpy()
+            elif 'RowNumber' in chunk:
+                ids = chunk['RowNumber'].to_numpy()
+            else:
+                ids = np.arange(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk, hash_unit(ids, self.random_state)
+
+    def partition(self, part, train_sample=1.0):
+        """
+        Yield (X, y) chunks of one partition
+
+        ``train_sample`` < 1 keeps that (hash-chosen, hence stable) share of
+        the training rows.
+        """
+        low = {HOLDOUT: 0.0, VALIDATION: self.holdout_fraction,
+               TRAIN: self.holdout_fraction + self.validation_fraction}[part]
+        high = {HOLDOUT: self.holdout_fraction,
+                VALIDATION: self.holdout_fraction + self.validation_fraction,
+                TRAIN: low + (1.0 - low) * train_sample}[part]
+        for chunk, unit in self._chunks():
+            rows = chunk[(unit >= low) & (unit < high)]
+            if len(rows):
+                yield rows, rows[TARGET].to_numpy(dtype=np.int8)
+
+
+class Reservoir:
+    """Uniform sample of at most ``capacity`` rows of a stream (Algorithm R, a chunk at a time)"""
+
+    def __init__(self, capacity, n_columns, random_state=42):
+        self.data = np.empty((capacity, n_columns))
+        self.size = 0
+        self.seen = 0
+        self.rng = np.random.default_rng(random_state)
+
+    def add(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        free = min(len(self.data) - self.size, len(rows))
+        self.data[self.size:self.size + free] = rows[:free]
+        self.size += free
+        rest = rows[free:]
+        if len(rest):
+            # Row i of the stream replaces a random slot with probability capacity / i
+            position = self.seen + free + np.arange(1, len(rest) + 1)
+            slot = (self.rng.random(len(rest)) * position).astype(np.int64)
+            keep = slot < len(self.data)
+            self.data[slot[keep]] = rest[keep]
+        self.seen += len(rows)
+
+    def sample(self):
+        return self.data[:self.size]
+
+
+class _ChunkIter(xgb.DataIter):
+    """Feeds a partition's chunks (as native categoricals) to an ExtMemQuantileDMatrix"""
+
+    def __init__(self, table, part, caster, cache_prefix, train_sample=1.0):
+        self.table, self.part, self.caster = table, part, caster
+        self.train_sample = train_sample
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = self.table.partition(self.part, self.train_sample)
+        try:
+            X, y = next(self._chunks)
+        except StopIteration:
+            return False
+        input_data(data=self.caster.transform(X), label=y)
+        return True
+
+    def reset(self):
+        self._chunks = None
+
+
+def plan_memory(path, memory_cap_mb):
+    """
+    Split the memory cap between chunks, XGBoost and the holdout reservoir
+
+    Returns:
+    --------
+    dict : chunksize, xgb_rows (training rows XGBoost may hold) and reservoir_rows
+    """
+    budget = memory_cap_mb * 2**20 - _rss_bytes()
+    if budget <= 0:
+        raise MemoryError(f"The memory cap of {memory_cap_mb} MB is below the "
+                          f"{_rss_bytes() / 2**20:.0f} MB this process already uses")
+    probe = next(iter_chunks(path, PROBE_ROWS, extra_columns=(TARGET,)))
+    n_columns = len(NUMERIC_FEATURES) + len(CATEGORICAL_FEATURES) + 8  # + one-hot columns
+    row_bytes = probe.memory_usage(deep=True).sum() / len(probe) + n_columns * 8
+    return {
+        'chunksize': max(PROBE_ROWS, int(budget * CHUNK_MEMORY_SHARE / (row_bytes * CHUNK_COPIES))),
+        'xgb_rows': int(budget * XGB_MEMORY_SHARE / XGB_ROW_STATE_BYTES),
+        'reservoir_rows': int(budget * RESERVOIR_MEMORY_SHARE / (8 * 3)),  # label + 2 scores
+    }
+
+
+def fit_statistics(table, numeric_features=NUMERIC_FEATURES, categorical_features=CATEGORICAL_FEATURES):
+    """
+    One pass over the training rows: scaler statistics, categories and class counts
+
+    Returns:
+    --------
+    tuple : (fitted StandardScaler, sorted categories per categorical feature,
+        class counts [n_stay, n_churn])
+    """
+    scaler = StandardScaler()
+    categories = [set() for _ in categorical_features]
+    class_counts = np.zeros(2, dtype=np.int64)
+    for X, y in table.partition(TRAIN):
+        scaler.partial_fit(X[numeric_features])
+        for seen, col in zip(categories, categorical_features):
+            seen.update(X[col].dropna().unique())
+        class_counts += np.bincount(y, minlength=2)[:2]
+    if class_counts.min() == 0:
+        raise ValueError("The training rows must contain both churned and retained customers")
+    categories = [sorted(seen) for seen in categories]
+    return scaler, categories, class_counts
+
+
+def build_preprocessor(scaler, categories, sample, numeric_features=NUMERIC_FEATURES,
+                       categorical_features=CATEGORICAL_FEATURES):
+    """make_preprocessor() fitted from streamed statistics instead of an in-memory table"""
+    pre = make_preprocessor(numeric_features, categorical_features, categories=categories).fit(sample)
+    # fit() only fixed the layout; the scaler statistics come from the full pass
+    name, _, cols = pre.transformers_[0]
+    pre.transformers_[0] = (name, scaler, cols)
+    return pre
+
+
+def fit_linear(table, pre, class_counts, epochs=3, random_state=42):
+    """
+    Log-loss SGDClassifier (logistic regression) trained chunk by chunk
+
+    Class weights reproduce ``class_weight="balanced"``, which partial_fit
+    cannot compute itself.
+    """
+    weights = class_counts.sum() / (2 * class_counts)
+    # A constant, averaged step keeps the probabilities calibrated; the default
+    # 'optimal' schedule takes huge first steps and saturates them at 0/1
+    clf = SGDClassifier(loss="log_loss", alpha=1e-4, learning_rate="constant", eta0=0.01, average=True,
+                        class_weight={0: weights[0], 1: weights[1]}, random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    for _ in range(epochs):
+        for X, y in table.partition(TRAIN):
+            order = rng.permutation(len(y))  # Chunks arrive in file order; shuffle within each
+            clf.partial_fit(pre.transform(X)[order], y[order], classes=[0, 1])
+    return clf
+
+
+def fit_xgb_external(table, caster, params, cache_dir, train_sample=1.0, n_jobs=-1):
+    """XGBoost on external-memory quantized matrices, early-stopped on the validation rows"""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        dtrain = xgb.ExtMemQuantileDMatrix(
+            _ChunkIter(table, TRAIN, caster, str(cache_dir / "train"), train_sample),
+            max_bin=MAX_BIN, enable_categorical=True)
+        dval = xgb.ExtMemQuantileDMatrix(
+            _ChunkIter(table, VALIDATION, caster, str(cache_dir / "validation")),
+            max_bin=MAX_BIN, enable_categorical=True, ref=dtrain)
+        clf = fit_early_stopped(params, dtrain, dval, n_jobs=n_jobs)
+        n_rows = dtrain.num_row()
+        del dtrain, dval
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return clf, n_rows
+
+
+def train_streaming(path, memory_cap_mb=1024, validation_fraction=0.1, holdout_fraction=0.2,
+                    epochs=3, threshold_objective='f1', cost_fp=1.0, cost_fn=5.0,
+                    random_state=42, cache_dir=EXTMEM_CACHE_DIR):
+    """
+    Train and evaluate the streaming candidates on a customer file
+
+    Parameters:
+    -----------
+    path : str or Path
+        Labelled customer CSV or Parquet file, of any size
+    memory_cap_mb : float
+        Peak memory the run should stay under (see plan_memory)
+    epochs : int
+        Passes of the SGD logistic regression over the training rows
+
+    Returns:
+    --------
+    dict : results (per-candidate metrics, Pipeline and fit_time), best_name,
+        best_model, optimal_th, rows per partition, the memory plan and
+        run_metrics (as written by run_metrics.save_run_metrics)
+    """
+    plan = plan_memory(path, memory_cap_mb)
+    table = ChunkedTable(path, plan['chunksize'], validation_fraction, holdout_fraction, random_state)
+    print(f"📐 Memory cap {memory_cap_mb} MB -> chunks of {plan['chunksize']:,} rows")
+
+    start = time.perf_counter()
+    scaler, categories, class_counts = fit_statistics(table)
+    sample, _ = next(table.partition(TRAIN))
+    pre = build_preprocessor(scaler, categories, sample.head(PROBE_ROWS))
+    caster = CategoryCaster(categories=categories).fit(sample.head(PROBE_ROWS))
+    n_train = int(class_counts.sum())
+    print(f"✓ Statistics pass: {n_train:,} training rows, churn rate "
+          f"{class_counts[1] / n_train:.2%} ({time.perf_counter() - start:.1f}s)")
+
+    results = {}
+    start = time.perf_counter()
+    lr = fit_linear(table, pre, class_counts, epochs, random_state)
+    results['Logistic Regression'] = {'model': Pipeline([("pre", pre), ("clf", lr)]), 'fit_time': time.perf_counter() - start}
+    print(f"✓ Logistic Regression (SGD, {epochs} epochs) in {results['Logistic Regression']['fit_time']:.1f}s")
+
+    train_sample = min(1.0, plan['xgb_rows'] / n_train)
+    if train_sample < 1.0:
+        print(f"ℹ️  XGBoost trains on a stable {train_sample:.1%} hash sample of the training rows "
+              f"to stay under the cap")
+    start = time.perf_counter()
+    xgb_clf, n_xgb_rows = fit_xgb_external(table, caster, make_classifiers()['XGBoost'].get_params(),
+                                           Path(cache_dir) / f"run-{os.getpid()}", train_sample)
+    results['XGBoost'] = {'model': Pipeline([("pre", caster), ("clf", xgb_clf)]), 'fit_time': time.perf_counter() - start}
+    print(f"✓ XGBoost (external memory, {n_xgb_rows:,} rows, early-stopped at "
+          f"{xgb_clf.n_estimators} rounds) in {results['XGBoost']['fit_time']:.1f}s")
+
+    # Evaluate every candidate on the same reservoir sample of holdout customers
+    names = list(results)
+    reservoir = Reservoir(plan['reservoir_rows'], 1 + len(names), random_state)
+    serving_sample = None
+    for X, y in table.partition(HOLDOUT):
+        if serving_sample is None:
+            serving_sample = X.head(SERVING_SAMPLE_ROWS)
+        reservoir.add(np.column_stack([y] + [results[n]['model'].predict_proba(X)[:, 1] for n in names]))
+    scored = reservoir.sample()
+    y_holdout = scored[:, 0].astype(int)
+    for i, name in enumerate(names, start=1):
+        results[name].update(evaluate_scores(y_holdout, scored[:, i]))
+        print(f"  {name}: holdout AUC {results[name]['auc']:.4f}")
+    print(f"✓ Evaluated on {len(scored):,} of {reservoir.seen:,} holdout customers")
+
+    best_name = max(results, key=lambda name: results[name]['auc'])
+    curve = threshold_curve(y_holdout, results[best_name]['predictions_proba'], cost_fp, cost_fn)
+    optimal_th = optimal_threshold(curve, threshold_objective)
+    memory_plan = dict(plan, memory_cap_mb=memory_cap_mb, xgb_train_sample=train_sample)
+    # Same format as the training script's metrics stage, on the reservoir sample
+    run_metrics = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'best_model': best_name,
+        'data': {'rows': n_train + reservoir.seen, 'test_rows': len(scored),
+                 'churn_rate': float(class_counts[1] / n_train)},
+        'optimal_threshold': optimal_th,
+        'candidates': {
+            name: candidate_metrics(results[name]['model'], serving_sample, y_holdout, scored[:, i],
+                                    fit_time=results[name]['fit_time'],
+                                    latency_calls=min(DEFAULT_LATENCY_CALLS, len(serving_sample)))
+            for i, name in enumerate(names, start=1)
+        },
+        'streaming': {'rows': {'train': n_train, 'holdout': reservoir.seen}, 'memory_plan': memory_plan},
+    }
+    return {
+        'results': results,
+        'best_name': best_name,
+        'best_model': results[best_name]['model'],
+        'best_auc': results[best_name]['auc'],
+        'optimal_th': optimal_th,
+        'threshold_objective': threshold_objective,
+        'numeric_features': list(NUMERIC_FEATURES),
+        'categorical_features': list(CATEGORICAL_FEATURES),
+        'rows': {'train': n_train, 'holdout': reservoir.seen},
+        'memory_plan': memory_plan,
+        'run_metrics': run_metrics,
+    }
+
+
+def save_streaming_model(run, publish=True, output_dir=STREAM_OUTPUT_DIR):
+    """
+    Save the best streamed model like the training script's save stage
+
+    Published, the pickled pipeline, its memory-mappable scorer, the
+    feature info and the run metrics replace the live files the dashboard
+    and batch_score.py read, and the model (with its metrics) becomes the
+    registry's current version. Unpublished, the same files are written to
+    ``output_dir`` instead and nothing live changes.
+
+    Returns:
+    --------
+    str or None : the registry version
+    """
+    best_name = run['best_name']
+    root = Path(".") if publish else Path(output_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    model_path, scorer_dir, info_path = root / model_filename(best_name), root / SCORER_DIR, root / FEATURE_INFO_PATH
+    joblib.dump(run['best_model'], model_path)
+    compile_pipeline(run['best_model']).save(scorer_dir)
+    feature_info = {
+        'numeric_features': run['numeric_features'],
+        'categorical_features': run['categorical_features'],
+        'best_model_name': best_name,
+        'best_auc': run['best_auc'],
+        'optimal_threshold': run['optimal_th']['threshold'],
+        'threshold_objective': run['threshold_objective'],
+    }
+    joblib.dump(feature_info, info_path)
+    print(f"✓ Saved '{model_path}', '{scorer_dir}/' and '{info_path}'")
+    if not publish:
+        save_run_metrics(run['run_metrics'], root / METRICS_PATH)
+        print(f"ℹ️  Not published (metrics in '{root / METRICS_PATH}'): "
+              f"the dashboard and batch scorer keep the current model")
+        return None
+
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry()
+    version = registry.publish(run['best_model'], feature_info, run['run_metrics'])
+    print(f"✓ Registered as version '{version}' in '{registry.root}/' (now current)")
+    save_run_metrics({**run['run_metrics'], 'model_version': version})
+    print(f"✓ Run metrics saved as '{METRICS_PATH}'")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core churn model training")
+    parser.add_argument("data", help="Labelled customer CSV or Parquet file")
+    parser.add_argument("--memory-cap-mb", type=float, default=1024, help="Peak memory to stay under")
+    parser.add_argument("--epochs", type=int, default=3, help="SGD passes for the logistic regression")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of customers held out")
+    parser.add_argument("--validation", type=float, default=0.1,
+                        help="Share of customers used for XGBoost early stopping")
+    parser.add_argument("--no-publish", action="store_true",
+                        help="Write the model to --output-dir only; leave the live model and registry alone")
+    parser.add_argument("--output-dir", default=str(STREAM_OUTPUT_DIR),
+                        help="Where an unpublished model is written (default: %(default)s)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    run = train_streaming(args.data, memory_cap_mb=args.memory_cap_mb, validation_fraction=args.validation,
+                          holdout_fraction=args.holdout, epochs=args.epochs)
+    print(f"🏆 Best: {run['best_name']} (holdout AUC {run['best_auc']:.4f}, "
+          f"threshold {run['optimal_th']['threshold']:.3f})")
+    save_streaming_model(run, publish=not args.no_publish, output_dir=args.output_dir)
+    peak = peak_rss_mb()
+    print(f"⏱ {time.perf_counter() - start:.1f}s" +
+          (f", peak memory {peak:.0f} MB (cap {args.memory_cap_mb:.0f} MB)" if peak else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,18 @@ Interactive dashboard for exploring churn analysis and making predictions
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
+from contextlib import ExitStack
 from pathlib import Path
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.metrics import confusion_matrix, roc_curve, auc
+
+# Plotting libraries are imported inside the pages that draw charts, so the
+# app starts (and the prediction page runs) without loading them
+from churn_cube import CUBE_PATH, ChurnCube
+from churn_data import CSV_PATH, iter_csv_typed, load_customers
+from churn_features import IMPORTANCE_PATH, METRICS_PATH, SCORE_TABLE_PATH, engineered_values
+from churn_scoring import load_feature_info, load_scorer
+from model_registry import ModelRegistry
+from perf_trace import TRACE_PATH, Tracer
+from run_metrics import comparison_frame, is_run_metrics, load_run_metrics
 
 # Page configuration
 st.set_page_config(
@@ -44,53 +48,155 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_tracer():
+    """One tracer per app process; page renders and data/model loads are appended to the trace"""
+    return Tracer(TRACE_PATH, process_name="dashboard")
+
+tracer = get_tracer()
+
 # Load data and model
 @st.cache_data
+@tracer.traced(cat="data")
 def load_data():
-    """Load the churn dataset"""
+    """Load the churn dataset (only the pages that need individual customers call this)"""
     try:
-        df = pd.read_csv('Churn_Modelling.csv')
+        df = load_customers(CSV_PATH)
         return df
     except FileNotFoundError:
         st.error("❌ Data file not found. Please ensure Churn_Modelling.csv is in the same directory.")
         return None
 
-@st.cache_resource
-def load_model():
-    """Load the trained model"""
+@st.cache_resource(max_entries=1)
+@tracer.traced(cat="model")
+def load_model(version):
+    """
+    Load one registry version of the trained model (memory-mapped scorer,
+    shared across app processes). Keyed on the CURRENT version, so the first
+    rerun after a deploy loads the new version and evicts the old one; sessions
+    mid-run keep their reference to the old scorer until they finish, then it
+    is freed. Falls back to the flat files when nothing has been registered.
+    """
     try:
-        model = joblib.load('best_churn_model_random_forest.pkl')
-        feature_info = joblib.load('model_feature_info.pkl')
-        return model, feature_info
+        if version is not None:
+            registered = ModelRegistry().load(version)
+            return registered.scorer, registered.feature_info
+        return load_scorer(), load_feature_info()
     except FileNotFoundError:
         st.warning("⚠️ Model file not found. Please run the training script first.")
         return None, None
 
-# Initialize
-df = load_data()
-model, feature_info = load_model()
+@st.cache_resource(max_entries=1)
+@tracer.traced(cat="data")
+def load_cube(mtime):
+    """
+    Churn aggregate cube saved by the training script (re-read when the file
+    changes; streamed from the data file if missing)
+    """
+    if mtime is not None:
+        return ChurnCube.load(CUBE_PATH)
+    try:
+        return ChurnCube.from_file(CSV_PATH, chunksize=100_000)
+    except FileNotFoundError:
+        st.error("❌ Data file not found. Please ensure Churn_Modelling.csv is in the same directory.")
+        return None
+
+@st.cache_data(max_entries=1)
+@tracer.traced(cat="data")
+def load_head(mtime, n_rows=10):
+    """First rows of the dataset, read without loading the rest"""
+    try:
+        return next(iter_csv_typed(CSV_PATH, chunksize=n_rows))
+    except FileNotFoundError:
+        return None
+
+@st.cache_data(max_entries=1)
+@tracer.traced(cat="data")
+def load_importance_table(mtime):
+    """Permutation importance saved by the training script (re-read when the file changes)"""
+    from permutation_importance import load_importance  # Pulls in sklearn; only this page needs it
+
+    return load_importance(IMPORTANCE_PATH)
+
+@st.cache_data(max_entries=1)
+@tracer.traced(cat="data")
+def load_metrics(version, mtimes):
+    """
+    Quality, curves and serving cost per model of the run that produced the
+    served registry version (re-read when the version or its metrics change)
+    """
+    if version is not None:
+        metrics = load_run_metrics(ModelRegistry().metrics_path(version))
+        if metrics is not None and is_run_metrics(metrics):
+            return {**metrics, 'model_version': version}
+    # No registry, or a version published before the run metrics existed
+    return load_run_metrics(METRICS_PATH)
+
+def file_mtime(path):
+    """Modification time used as a cache key, or None when the file does not exist"""
+    return Path(path).stat().st_mtime if Path(path).exists() else None
+
+@st.cache_resource(max_entries=1)
+@tracer.traced(cat="data")
+def load_scored_customers(_df, version):
+    """Score table written by the training script, joined to the customer profile columns (re-read per model version)"""
+    if _df is None or not Path(SCORE_TABLE_PATH).exists():
+        return None
+    import pyarrow.parquet as pq
+
+    columns = ['CustomerId', 'churn_probability', 'risk_segment']
+    if 'top_driver' in pq.read_schema(SCORE_TABLE_PATH).names:  # Tables scored with explanations
+        columns.append('top_driver')
+    scores = pd.read_parquet(SCORE_TABLE_PATH, columns=columns)
+    profile = _df[['CustomerId', 'Age', 'Geography', 'Balance', 'CreditScore',
+                   'NumOfProducts', 'IsActiveMember', 'Exited']]
+    return profile.merge(scores, on='CustomerId', how='inner')
 
 # Sidebar navigation
 st.sidebar.title("📊 Navigation")
 page = st.sidebar.radio(
     "Select Page",
     ["🏠 Home", "📈 Data Exploration", "🤖 Model Performance", 
-     "🎯 Risk Segmentation", "🔮 Make Prediction", "💡 Business Insights"]
+     "🎯 Risk Segmentation", "🔮 Make Prediction", "💡 Business Insights", "⏱ Performance"]
 )
 
+# Initialize (the two performance pages read only their JSON files, not the data or the model;
+# only Risk Segmentation needs the customer rows, every other chart is served from the cube)
+registry = ModelRegistry()
+model_version = registry.current_version()  # One small file read per rerun
+# Rollbacks, streamed and deduplicated publishes all change the served version's metrics
+run_metrics = load_metrics(model_version, (
+    file_mtime(registry.metrics_path(model_version)) if model_version else None, file_mtime(METRICS_PATH)))
+if page in ("🤖 Model Performance", "⏱ Performance"):
+    cube = model = feature_info = None
+else:
+    model, feature_info = load_model(model_version)
+    cube = load_cube(file_mtime(CUBE_PATH))
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("### About")
+if run_metrics is not None:
+    best = run_metrics['candidates'][run_metrics['best_model']]
+    run_summary = f"""
+    - **Dataset:** {run_metrics['data']['rows']:,} bank customers
+    - **Best Model:** {run_metrics['best_model']}
+    - **AUC Score:** {best['auc']:.3f}
+    """
+else:
+    run_summary = "\n    Run the training script to see model results here.\n    "
 st.sidebar.info(
     """
     **Churn Prediction System**
     
     This app analyzes customer churn patterns and predicts which customers are likely to leave.
-    
-    - **Dataset:** 10,000 bank customers
-    - **Best Model:** Random Forest
-    - **AUC Score:** 0.854
-    """
+    """ + run_summary
 )
+if model_version is not None:
+    st.sidebar.caption(f"Model version: {model_version}")
+
+# The whole page render is one span, closed before the footer
+page_span = ExitStack()
+page_span.enter_context(tracer.span(page, cat="page"))
 
 # ============================================================================
 # HOME PAGE
@@ -105,23 +211,24 @@ if page == "🏠 Home":
     for retention strategies.
     """)
     
-    if df is not None:
+    if cube is not None:
         # Key metrics
         col1, col2, col3, col4 = st.columns(4)
         
+        total, churned = cube.totals()
+        
         with col1:
-            st.metric("Total Customers", f"{len(df):,}")
+            st.metric("Total Customers", f"{total:,}")
         
         with col2:
-            churn_rate = (df['Exited'].sum() / len(df)) * 100
+            churn_rate = (churned / total) * 100
             st.metric("Churn Rate", f"{churn_rate:.2f}%")
         
         with col3:
-            churned = df['Exited'].sum()
             st.metric("Churned Customers", f"{churned:,}")
         
         with col4:
-            retained = len(df) - churned
+            retained = total - churned
             st.metric("Retained Customers", f"{retained:,}")
         
         st.markdown("---")
@@ -149,18 +256,19 @@ if page == "🏠 Home":
         
         st.markdown("---")
         
-        # Model performance summary
-        if model is not None:
+        # Model performance summary (from the latest training run)
+        if run_metrics is not None:
             st.subheader("🏆 Model Performance")
+            best = run_metrics['candidates'][run_metrics['best_model']]
             
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.info("**Best Model:** Random Forest")
+                st.info(f"**Best Model:** {run_metrics['best_model']}")
             with col2:
-                st.success("**AUC Score:** 0.854")
+                st.success(f"**AUC Score:** {best['auc']:.3f}")
             with col3:
-                st.warning("**Accuracy:** 85.7%")
+                st.warning(f"**Accuracy:** {best['accuracy'] * 100:.1f}%")
         
         st.markdown("---")
         st.info("👈 Use the sidebar to navigate through different sections of the dashboard.")
@@ -170,8 +278,10 @@ if page == "🏠 Home":
 # ============================================================================
 elif page == "📈 Data Exploration":
     st.title("📈 Data Exploration")
+    import plotly.express as px
+    import plotly.graph_objects as go
     
-    if df is not None:
+    if cube is not None:
         tab1, tab2, tab3 = st.tabs(["Overview", "Demographics", "Financial Metrics"])
         
         with tab1:
@@ -181,19 +291,25 @@ elif page == "📈 Data Exploration":
             
             with col1:
                 st.write("**First 10 Rows:**")
-                st.dataframe(df.head(10), use_container_width=True)
+                head = load_head(file_mtime(CSV_PATH))
+                if head is not None:
+                    st.dataframe(head, use_container_width=True)
             
             with col2:
                 st.write("**Dataset Statistics:**")
-                st.dataframe(df.describe(), use_container_width=True)
+                if cube.profile is not None:
+                    st.dataframe(cube.describe(), use_container_width=True)
+                else:
+                    st.warning("⚠️ This cube has no value profile. Please rerun the training script.")
             
             st.markdown("---")
             
             # Churn distribution
             st.subheader("Churn Distribution")
-            fig = px.pie(df, names='Exited', title='Customer Churn Distribution',
-                        labels={'Exited': 'Status'},
-                        color_discrete_map={0: 'green', 1: 'red'})
+            total, churned = cube.totals()
+            fig = px.pie(names=[0, 1], values=[total - churned, churned],
+                        title='Customer Churn Distribution',
+                        color=[0, 1], color_discrete_map={0: 'green', 1: 'red'})
             fig.update_traces(textposition='inside', textinfo='percent+label')
             st.plotly_chart(fig, use_container_width=True)
         
@@ -204,8 +320,7 @@ elif page == "📈 Data Exploration":
             col1, col2 = st.columns(2)
             
             with col1:
-                geo_churn = df.groupby('Geography')['Exited'].agg(['sum', 'count'])
-                geo_churn['churn_rate'] = (geo_churn['sum'] / geo_churn['count']) * 100
+                geo_churn = cube.churn_rate('Geography').rename('churn_rate').to_frame()
                 
                 fig = px.bar(geo_churn, y='churn_rate', 
                            title='Churn Rate by Geography',
@@ -214,8 +329,7 @@ elif page == "📈 Data Exploration":
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
-                gender_churn = df.groupby('Gender')['Exited'].agg(['sum', 'count'])
-                gender_churn['churn_rate'] = (gender_churn['sum'] / gender_churn['count']) * 100
+                gender_churn = cube.churn_rate('Gender').rename('churn_rate').to_frame()
                 
                 fig = px.bar(gender_churn, y='churn_rate',
                            title='Churn Rate by Gender',
@@ -225,10 +339,11 @@ elif page == "📈 Data Exploration":
             
             # Age distribution
             st.subheader("Age Distribution by Churn Status")
-            fig = px.histogram(df, x='Age', color='Exited', nbins=30,
-                             title='Age Distribution',
-                             labels={'Exited': 'Churned'},
-                             color_discrete_map={0: 'green', 1: 'red'})
+            age_counts = cube.rollup('AgeBin')[['retained', 'churned']].rename(
+                columns={'retained': 0, 'churned': 1})
+            fig = px.bar(age_counts, title='Age Distribution',
+                        labels={'variable': 'Churned', 'value': 'count', 'AgeBin': 'Age'},
+                        color_discrete_map={0: 'green', 1: 'red'})
             st.plotly_chart(fig, use_container_width=True)
         
         with tab3:
@@ -238,23 +353,32 @@ elif page == "📈 Data Exploration":
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.box(df, x='Exited', y='Balance',
+                balance_counts = cube.rollup('BalanceBin')[['retained', 'churned']].rename(
+                    columns={'retained': 0, 'churned': 1})
+                fig = px.bar(balance_counts, barmode='group',
                            title='Account Balance by Churn Status',
-                           labels={'Exited': 'Churned (0=No, 1=Yes)', 'Balance': 'Balance'},
-                           color='Exited',
+                           labels={'variable': 'Churned (0=No, 1=Yes)', 'value': 'Customers',
+                                   'BalanceBin': 'Balance'},
                            color_discrete_map={0: 'green', 1: 'red'})
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
-                fig = px.box(df, x='Exited', y='CreditScore',
-                           title='Credit Score by Churn Status',
-                           labels={'Exited': 'Churned (0=No, 1=Yes)', 'CreditScore': 'Credit Score'},
-                           color='Exited',
-                           color_discrete_map={0: 'green', 1: 'red'})
-                st.plotly_chart(fig, use_container_width=True)
+                if cube.profile is not None:
+                    # Quartiles and whiskers come precomputed from the cube's value profile
+                    box = cube.box_stats('CreditScore')
+                    fig = go.Figure([
+                        go.Box(name=str(status), x=[status], q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+                               mean=[row['mean']], lowerfence=[row['lowerfence']],
+                               upperfence=[row['upperfence']],
+                               marker_color={0: 'green', 1: 'red'}[status])
+                        for status, row in box.iterrows()
+                    ])
+                    fig.update_layout(title='Credit Score by Churn Status', legend_title_text='Exited',
+                                      xaxis_title='Churned (0=No, 1=Yes)', yaxis_title='Credit Score')
+                    st.plotly_chart(fig, use_container_width=True)
             
             # Product holdings
-            products_churn = df.groupby('NumOfProducts')['Exited'].mean() * 100
+            products_churn = cube.churn_rate('NumOfProducts')
             fig = px.bar(products_churn, 
                         title='Churn Rate by Number of Products',
                         labels={'value': 'Churn Rate (%)', 'NumOfProducts': 'Number of Products'})
@@ -266,111 +390,148 @@ elif page == "📈 Data Exploration":
 # ============================================================================
 elif page == "🤖 Model Performance":
     st.title("🤖 Model Performance")
+    import plotly.express as px
     
-    if model is not None and df is not None:
-        st.success("✅ Model loaded successfully!")
+    if run_metrics is None:
+        st.warning("⚠️ Run metrics not found. Please run the training script first.")
+    else:
+        best_name = run_metrics['best_model']
+        best = run_metrics['candidates'][best_name]
+        version = run_metrics.get('model_version')
+        st.caption(f"Training run of {run_metrics['created_at']}"
+                   + (f" (model version {version})" if version else "")
+                   + f", evaluated on {run_metrics['data']['test_rows']:,} holdout customers")
+        if version is not None and model_version is not None and version != model_version:
+            st.info(f"ℹ️ The app serves model version {model_version}; these metrics are from version {version}.")
         
         # Model comparison
         st.subheader("Model Comparison")
         
-        model_results = pd.DataFrame({
-            'Model': ['Logistic Regression', 'Random Forest', 'XGBoost'],
-            'AUC': [0.777, 0.854, 0.840],
-            'Accuracy': [0.716, 0.857, 0.857],
-            'Precision': [0.389, 0.724, 0.717],
-            'Recall': [0.703, 0.477, 0.487],
-            'F1-Score': [0.501, 0.575, 0.580]
-        })
+        comparison = comparison_frame(run_metrics)
+        model_results = comparison.rename_axis('Model').reset_index()
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            fig = px.bar(model_results, x='Model', y='AUC',
+            fig = px.bar(model_results, x='Model', y='auc',
                         title='Model AUC Comparison',
-                        color='AUC',
-                        color_continuous_scale='Viridis')
+                        color='auc',
+                        color_continuous_scale='Viridis',
+                        labels={'auc': 'AUC'})
             fig.update_layout(showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             st.markdown("### Best Model")
-            st.markdown("**Random Forest**")
-            st.metric("AUC Score", "0.854")
-            st.metric("Accuracy", "85.7%")
-            st.metric("F1-Score", "0.575")
+            st.markdown(f"**{best_name}**")
+            st.metric("AUC Score", f"{best['auc']:.3f}")
+            st.metric("Accuracy", f"{best['accuracy'] * 100:.1f}%")
+            st.metric("F1-Score", f"{best['f1']:.3f}")
         
         st.markdown("---")
         
         # Detailed metrics
         st.subheader("Detailed Performance Metrics")
-        st.dataframe(model_results.set_index('Model'), use_container_width=True)
+        quality = comparison[['auc', 'average_precision', 'accuracy', 'precision', 'recall', 'f1']].rename(
+            columns={'auc': 'AUC', 'average_precision': 'PR AUC', 'accuracy': 'Accuracy',
+                     'precision': 'Precision', 'recall': 'Recall', 'f1': 'F1-Score'})
+        st.dataframe(quality.round(3), use_container_width=True)
+        st.caption(f"Accuracy, precision, recall and F1 at a {best['threshold']:g} threshold; "
+                   f"the deployed threshold is {run_metrics['optimal_threshold']['threshold']:.3f}.")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            roc = pd.concat([pd.DataFrame({**m['roc'], 'Model': name})
+                             for name, m in run_metrics['candidates'].items()])
+            fig = px.line(roc, x='fpr', y='tpr', color='Model', title='ROC Curves',
+                         labels={'fpr': 'False Positive Rate', 'tpr': 'True Positive Rate'})
+            fig.add_shape(type='line', x0=0, y0=0, x1=1, y1=1, line=dict(dash='dash', color='gray'))
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            pr = pd.concat([pd.DataFrame({**m['pr'], 'Model': name})
+                            for name, m in run_metrics['candidates'].items()])
+            fig = px.line(pr, x='recall', y='precision', color='Model', title='Precision-Recall Curves',
+                         labels={'recall': 'Recall', 'precision': 'Precision'})
+            fig.add_hline(y=run_metrics['data']['churn_rate'], line_dash='dash', line_color='gray',
+                          annotation_text='Churn rate')
+            st.plotly_chart(fig, use_container_width=True)
+        
+        col1, col2 = st.columns([1, 2])
+        
+        with col1:
+            cm = best['confusion_matrix']
+            fig = px.imshow(cm, text_auto=True, color_continuous_scale='Blues',
+                           x=['Not Churned', 'Churned'], y=['Not Churned', 'Churned'],
+                           labels={'x': 'Predicted', 'y': 'Actual', 'color': 'Customers'},
+                           title=f'Confusion Matrix: {best_name}')
+            fig.update_layout(coloraxis_showscale=False)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            st.markdown("#### Serving Cost")
+            cost = pd.DataFrame({
+                'Fit (s)': comparison['fit_time'].round(2),
+                'Batch (rows/s)': comparison['batch_rows_per_s'].round(0),
+                'Single-row p50 (µs)': comparison['latency_p50_us'].round(0),
+                'Single-row p99 (µs)': comparison['latency_p99_us'].round(0),
+                'Model size (KB)': (comparison['model_bytes'] / 1024).round(0),
+            })
+            st.dataframe(cost, use_container_width=True)
+            st.caption("Throughput and latency of the compiled scorer the app and batch scorer use; "
+                       "size of the pickled pipeline.")
         
         st.markdown("---")
         
         # Feature importance
         st.subheader("Feature Importance Analysis")
         
-        if feature_info is not None:
-            # Create sample importance data (from our analysis)
-            importance_data = pd.DataFrame({
-                'Feature': ['Age', 'NumOfProducts', 'EstimatedSalary', 'Balance', 'CreditScore',
-                           'Tenure', 'IsActiveMember', 'Geography_Germany', 'HasCrCard'],
-                'Importance': [0.238, 0.115, 0.109, 0.107, 0.106, 0.083, 0.036, 0.026, 0.018]
-            }).sort_values('Importance', ascending=True)
-            
-            fig = px.bar(importance_data.tail(10), x='Importance', y='Feature',
-                        title='Top 10 Churn Drivers',
+        importance = load_importance_table(file_mtime(IMPORTANCE_PATH))
+        if importance is not None:
+            meta, importance_data = importance
+            fig = px.bar(importance_data.head(10).iloc[::-1], x='Importance', y='Feature',
+                        error_x='Std',
+                        title=f"Top 10 Churn Drivers ({meta['model']})",
                         orientation='h',
                         color='Importance',
-                        color_continuous_scale='Teal')
+                        color_continuous_scale='Teal',
+                        labels={'Importance': 'Holdout AUC drop when shuffled'})
             fig.update_layout(showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
             
-            st.info("""
-            **Key Insights:**
-            - **Age** is the strongest predictor (23.8% importance)
-            - **Number of Products** significantly influences churn
-            - **Estimated Salary** and **Balance** are also important factors
+            top = importance_data['Feature'].tolist()
+            st.info(f"""
+            **Key Insights** (permutation importance: holdout AUC drop when a feature's values
+            are shuffled; {meta['repeats']} repeats on {meta['rows']:,} customers, baseline AUC
+            {meta['baseline_auc']:.3f}):
+            - **{top[0]}** is the strongest predictor (AUC drop {importance_data['Importance'].iloc[0]:.3f})
+            - **{top[1]}** and **{top[2]}** follow
+            - Features near zero barely change the model's ranking of customers
             """)
+        else:
+            st.info("Feature importance not found. Run the training script to compute it.")
 
 # ============================================================================
 # RISK SEGMENTATION PAGE
 # ============================================================================
 elif page == "🎯 Risk Segmentation":
     st.title("🎯 Customer Risk Segmentation")
+    import plotly.express as px
     
-    if model is not None and df is not None:
-        st.info("Risk segments are based on predicted churn probability from the Random Forest model.")
-        
-        # Simulate risk segmentation (in production, these would be real predictions)
-        np.random.seed(42)
-        sample_size = 2000
-        sample_indices = np.random.choice(df.index, sample_size, replace=False)
-        sample_df = df.loc[sample_indices].copy()
-        
-        # Simulate predictions (in production, use actual model predictions)
-        # For demo purposes, we'll create realistic probabilities based on actual features
-        base_prob = 0.2
-        age_factor = (sample_df['Age'] - sample_df['Age'].min()) / (sample_df['Age'].max() - sample_df['Age'].min())
-        active_factor = (1 - sample_df['IsActiveMember']) * 0.2
-        product_factor = (4 - sample_df['NumOfProducts']) * 0.1
-        
-        sample_df['ChurnProbability'] = np.clip(
-            base_prob + age_factor * 0.5 + active_factor + product_factor + np.random.normal(0, 0.1, sample_size),
-            0, 1
-        )
-        
-        # Create risk segments
-        sample_df['RiskSegment'] = pd.cut(
-            sample_df['ChurnProbability'],
-            bins=[0, 0.3, 0.7, 1.0],
-            labels=['Low Risk', 'Medium Risk', 'High Risk']
-        )
+    scored = load_scored_customers(load_data(), model_version)
+    
+    if scored is None:
+        st.warning("⚠️ Score table not found. Please run the training script first.")
+    else:
+        model_name = feature_info['best_model_name'] if feature_info is not None else "best"
+        st.info(f"Risk segments are based on predicted churn probability from the {model_name} model, "
+                f"for all {len(scored):,} customers.")
         
         # Risk distribution
         col1, col2, col3 = st.columns(3)
         
-        risk_counts = sample_df['RiskSegment'].value_counts()
+        risk_counts = scored['risk_segment'].value_counts()
         
         with col1:
             low_risk = risk_counts.get('Low Risk', 0)
@@ -385,7 +546,7 @@ elif page == "🎯 Risk Segmentation":
         with col3:
             high_risk = risk_counts.get('High Risk', 0)
             st.metric("High Risk Customers", f"{high_risk:,}",
-                     help="Churn probability > 70%", delta=f"{(high_risk/sample_size)*100:.1f}%", delta_color="inverse")
+                     help="Churn probability > 70%", delta=f"{(high_risk/len(scored))*100:.1f}%", delta_color="inverse")
         
         st.markdown("---")
         
@@ -393,17 +554,17 @@ elif page == "🎯 Risk Segmentation":
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = px.pie(sample_df, names='RiskSegment',
+            fig = px.pie(names=risk_counts.index, values=risk_counts.values,
                         title='Customer Distribution by Risk Segment',
-                        color='RiskSegment',
+                        color=risk_counts.index,
                         color_discrete_map={'Low Risk': 'green', 'Medium Risk': 'yellow', 'High Risk': 'red'})
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
-            actual_churn_by_risk = sample_df.groupby('RiskSegment')['Exited'].mean() * 100
+            actual_churn_by_risk = scored.groupby('risk_segment', observed=False)['Exited'].mean() * 100
             fig = px.bar(actual_churn_by_risk,
                         title='Actual Churn Rate by Risk Segment',
-                        labels={'value': 'Churn Rate (%)', 'RiskSegment': 'Risk Segment'},
+                        labels={'value': 'Churn Rate (%)', 'risk_segment': 'Risk Segment'},
                         color=actual_churn_by_risk.index,
                         color_discrete_map={'Low Risk': 'green', 'Medium Risk': 'yellow', 'High Risk': 'red'})
             st.plotly_chart(fig, use_container_width=True)
@@ -413,7 +574,7 @@ elif page == "🎯 Risk Segmentation":
         # High-risk profile
         st.subheader("⚠️ High-Risk Customer Profile")
         
-        high_risk_customers = sample_df[sample_df['RiskSegment'] == 'High Risk']
+        high_risk_customers = scored[scored['risk_segment'] == 'High Risk']
         
         if len(high_risk_customers) > 0:
             col1, col2, col3, col4 = st.columns(4)
@@ -430,13 +591,15 @@ elif page == "🎯 Risk Segmentation":
             
             st.markdown("---")
             
-            # Show high-risk customers table
-            st.subheader("High-Risk Customers (Sample)")
+            # Show the highest-risk customers
+            st.subheader("Highest-Risk Customers")
             display_cols = ['CustomerId', 'Age', 'Geography', 'Balance', 'NumOfProducts', 
-                           'IsActiveMember', 'ChurnProbability', 'Exited']
+                           'IsActiveMember', 'churn_probability', 'Exited']
+            if 'top_driver' in high_risk_customers.columns:
+                display_cols.insert(-1, 'top_driver')
             st.dataframe(
-                high_risk_customers[display_cols].head(20).style.format({
-                    'ChurnProbability': '{:.1%}',
+                high_risk_customers.nlargest(20, 'churn_probability')[display_cols].style.format({
+                    'churn_probability': '{:.1%}',
                     'Balance': '${:,.2f}'
                 }),
                 use_container_width=True
@@ -474,30 +637,26 @@ elif page == "🔮 Make Prediction":
         with col2:
             is_active = st.selectbox("Is Active Member?", ['Yes', 'No'])
         
-        # Calculate engagement score and CLV proxy
-        engagement_score = (int(is_active == 'Yes') * 2 + int(has_cr_card == 'Yes') + num_products) / 4
-        clv_proxy = balance * tenure * 0.0001
-        
         if st.button("🔮 Predict Churn Probability", type="primary"):
             # Prepare input data
-            input_data = pd.DataFrame({
-                'CreditScore': [credit_score],
-                'Age': [age],
-                'Tenure': [tenure],
-                'Balance': [balance],
-                'NumOfProducts': [num_products],
-                'HasCrCard': [1 if has_cr_card == 'Yes' else 0],
-                'IsActiveMember': [1 if is_active == 'Yes' else 0],
-                'EstimatedSalary': [estimated_salary],
-                'EngagementScore': [engagement_score],
-                'CLV_Proxy': [clv_proxy],
-                'Geography': [geography],
-                'Gender': [gender]
-            })
+            input_data = {
+                'CreditScore': credit_score,
+                'Age': age,
+                'Tenure': tenure,
+                'Balance': balance,
+                'NumOfProducts': num_products,
+                'HasCrCard': 1 if has_cr_card == 'Yes' else 0,
+                'IsActiveMember': 1 if is_active == 'Yes' else 0,
+                'EstimatedSalary': estimated_salary,
+                'Geography': geography,
+                'Gender': gender
+            }
+            input_data['EngagementScore'], input_data['CLV_Proxy'] = engineered_values(input_data)
             
             try:
-                # Make prediction
-                proba = model.predict_proba(input_data)[:, 1][0]
+                # Make prediction with the compiled scorer (no DataFrame/ColumnTransformer per click)
+                with tracer.span("predict_proba_one", cat="predict", memory=False):
+                    proba = model.predict_proba_one(input_data)
                 prediction = "WILL CHURN" if proba >= 0.5 else "WON'T CHURN"
                 
                 # Determine risk level
@@ -528,6 +687,40 @@ elif page == "🔮 Make Prediction":
                 # Progress bar
                 st.progress(proba)
                 
+                # Why: tree-path contributions of each input feature
+                if getattr(model, 'forest', None) is not None:
+                    import plotly.graph_objects as go
+                    
+                    with tracer.span("explain_one", cat="explain", memory=False):
+                        explanation = model.explain_one(input_data)
+                    units = explanation['units']
+                    shown = list(explanation['contributions'].items())[:8]
+                    rest = sum(v for _, v in list(explanation['contributions'].items())[8:])
+                    if len(explanation['contributions']) > 8:
+                        shown.append(("Other features", rest))
+                    fmt = (lambda v: f"{v:+.1%}") if units == "probability" else (lambda v: f"{v:+.2f}")
+                    
+                    st.subheader("🧭 Why This Score")
+                    fig = go.Figure(go.Waterfall(
+                        orientation='h',
+                        measure=['absolute'] + ['relative'] * len(shown) + ['total'],
+                        y=['Average customer'] + [name for name, _ in shown] + ['This customer'],
+                        x=[explanation['base']] + [v for _, v in shown] + [0],
+                        text=[fmt(explanation['base']).lstrip('+')] + [fmt(v) for _, v in shown] +
+                             [fmt(explanation['output']).lstrip('+')],
+                        increasing={'marker': {'color': '#d62728'}},
+                        decreasing={'marker': {'color': '#2ca02c'}},
+                        totals={'marker': {'color': '#1f4788'}},
+                    ))
+                    fig.update_layout(
+                        title=f"Feature contributions ({units}; red raises churn risk, green lowers it)",
+                        yaxis={'autorange': 'reversed'}, showlegend=False, height=450
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                    if units == "log-odds":
+                        st.caption(f"XGBoost adds contributions on the log-odds scale; "
+                                   f"{explanation['output']:.2f} log-odds is a {proba:.1%} churn probability.")
+                
                 # Recommendations
                 st.markdown("---")
                 st.subheader("💡 Recommendations")
@@ -582,12 +775,18 @@ elif page == "💡 Business Insights":
             - **Prediction Accuracy:** 86.9% on high-risk segment
             
             ### 🎯 Top Churn Drivers
-            1. **Age (23.8%)** - Primary predictor
-            2. **Number of Products (11.5%)**
-            3. **Estimated Salary (10.9%)**
-            4. **Account Balance (10.7%)**
-            5. **Credit Score (10.6%)**
             """)
+            importance = load_importance_table(file_mtime(IMPORTANCE_PATH))
+            if importance is not None:
+                meta, importance_data = importance
+                st.markdown("\n".join(
+                    f"{rank}. **{row.Feature}** (AUC drop {row.Importance:.3f})"
+                    for rank, row in enumerate(importance_data.head(5).itertuples(), start=1)
+                ))
+                st.caption(f"Permutation importance of the {meta['model']} model: "
+                           f"holdout AUC drop when a feature's values are shuffled.")
+            else:
+                st.info("Feature importance not found. Run the training script to compute it.")
         
         with col2:
             st.markdown("""
@@ -707,6 +906,79 @@ elif page == "💡 Business Insights":
         Even conservative interventions generate exceptional returns!
         """)
 
+# ============================================================================
+# PERFORMANCE PAGE
+# ============================================================================
+elif page == "⏱ Performance":
+    st.title("⏱ Performance")
+    import plotly.express as px
+    from perf_trace import latest_run, read_trace, trace_frame
+
+    trace = trace_frame(read_trace(TRACE_PATH))
+    st.caption(f"From '{TRACE_PATH}'. Open it in chrome://tracing or https://ui.perfetto.dev for the full timeline.")
+
+    st.subheader("🏋️ Latest Training Run")
+    run = latest_run(trace, "training")
+    if run.empty:
+        st.info("No training run traced yet. Run `python churn_prediction_complete.py` to record one.")
+    else:
+        stages = run[run['cat'] == 'stage'].assign(wall_s=lambda d: d['wall_ms'] / 1000,
+                                                    cpu_s=lambda d: d['cpu_ms'] / 1000)
+        checkpoints = run[run['cat'] == 'checkpoint']
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Wall Time", f"{stages['wall_s'].sum():.1f}s")
+        with col2:
+            st.metric("CPU Time", f"{stages['cpu_s'].sum():.1f}s")
+        with col3:
+            st.metric("Peak Memory", f"{run['peak_mb'].max():.0f} MB")
+        with col4:
+            st.metric("Checkpoint I/O", f"{checkpoints['wall_ms'].sum() / 1000:.1f}s")
+
+        fig = px.bar(stages, x='name', y=['wall_s', 'cpu_s'], barmode='group',
+                     title=f"Stage Breakdown ({run['start'].iloc[0]:%Y-%m-%d %H:%M})",
+                     labels={'name': 'Stage', 'value': 'Seconds', 'variable': ''})
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(
+            stages[['name', 'wall_s', 'cpu_s', 'peak_mb', 'mem_delta_mb']].rename(columns={
+                'name': 'Stage', 'wall_s': 'Wall (s)', 'cpu_s': 'CPU (s)',
+                'peak_mb': 'Peak RSS (MB)', 'mem_delta_mb': 'Memory Growth (MB)'}).set_index('Stage'),
+            use_container_width=True
+        )
+
+    st.markdown("---")
+    st.subheader("📊 Dashboard Pages and Loads")
+    dashboard = trace[trace['process'] == 'dashboard']
+    calls = dashboard[dashboard['cat'].isin(['page', 'data', 'model', 'explain'])]
+    if calls.empty:
+        st.info("No dashboard activity traced yet.")
+    else:
+        summary = calls.groupby(['cat', 'name']).agg(
+            Calls=('wall_ms', 'size'), Median_ms=('wall_ms', 'median'), Max_ms=('wall_ms', 'max'),
+            Peak_MB=('peak_mb', 'max')
+        ).sort_values('Median_ms', ascending=False)
+        st.dataframe(summary.round(1), use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("🔮 Prediction Latency")
+    predictions = dashboard[dashboard['cat'] == 'predict']
+    if predictions.empty:
+        st.info("No predictions traced yet. Make one on the 🔮 Make Prediction page.")
+    else:
+        latency_us = predictions['wall_ms'] * 1000
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Predictions", f"{len(latency_us):,}")
+        for col, q in zip((col2, col3, col4), (50, 90, 99)):
+            with col:
+                st.metric(f"p{q}", f"{latency_us.quantile(q / 100):,.0f} µs")
+        fig = px.histogram(x=latency_us, nbins=50, title='predict_proba_one Latency',
+                           labels={'x': 'Latency (µs)'})
+        st.plotly_chart(fig, use_container_width=True)
+
+page_span.close()
+
 # Footer
 st.markdown("---")
 st.markdown(
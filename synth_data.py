@@ -0,0 +1,354 @@
+"""
+Synthetic customer generator for load testing
+Fits a small JSON spec to a real Churn_Modelling-shaped file and generates
+any number of customers from it, in seeded vectorised chunks streamed to CSV
+or Parquet (via pyarrow), so the pipeline can be run at production scale
+offline.
+
+The spec holds:
+- the empirical distributions of CreditScore, Age, Tenure and NumOfProducts,
+  the HasCrCard/IsActiveMember rates, and Geography x Gender jointly
+- Balance per Geography (share of zero balances plus a normal for the rest)
+  and the EstimatedSalary range
+- a logistic model of Exited on the features (with the non-linear age and
+  product-count effects), so the churn relationships carry over
+
+Features are drawn independently of each other given Geography; Exited is
+drawn from the fitted churn probability. ``synth_spec.json`` next to this
+module is fitted on Churn_Modelling.csv and is the default.
+
+Usage:
+    python synth_data.py generate 10m customers_10m.parquet --seed 0
+    python synth_data.py generate 1m customers_1m.csv
+    python synth_data.py fit Churn_Modelling.csv --spec synth_spec.json
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+DEFAULT_SPEC_PATH = Path(__file__).resolve().with_name("synth_spec.json")
+SPEC_VERSION = 1
+
+COLUMNS = ["RowNumber", "CustomerId", "Surname", "CreditScore", "Geography", "Gender", "Age",
+           "Tenure", "Balance", "NumOfProducts", "HasCrCard", "IsActiveMember",
+           "EstimatedSalary", "Exited"]
+FIRST_CUSTOMER_ID = 15_000_000
+MAX_SURNAMES = 1000
+LOOKUP_SIZE = 1 << 16
+
+# Terms of the churn model; _terms builds them from the generated columns
+CHURN_TERMS = ["intercept", "age", "age_sq", "credit_score", "tenure", "balance", "zero_balance",
+               "products_2", "products_3", "products_4", "has_cr_card", "is_active",
+               "active_x_age", "salary", "geography_germany", "geography_spain", "gender_male"]
+
+
+def _pmf(values):
+    """Empirical distribution of a discrete column as {'values': [...], 'p': [...]}"""
+    uniques, counts = np.unique(np.asarray(values), return_counts=True)
+    return {'values': uniques.tolist(), 'p': (counts / counts.sum()).tolist()}
+
+
+def _terms(cols, geographies):
+    """Churn model terms (one array per CHURN_TERMS entry) from generated or real columns"""
+    age = (cols['Age'] - 40.0) / 10.0
+    products = cols['NumOfProducts']
+    geography = cols['Geography']
+    no_geography = np.zeros(len(age), dtype=bool)
+    return [
+        np.ones(len(age)),
+        age,
+        age ** 2,
+        (cols['CreditScore'] - 650.0) / 100.0,
+        (cols['Tenure'] - 5.0) / 3.0,
+        cols['Balance'] / 1e5,
+        cols['Balance'] == 0,
+        products == 2,
+        products == 3,
+        products == 4,
+        cols['HasCrCard'],
+        cols['IsActiveMember'],
+        cols['IsActiveMember'] * age,
+        cols['EstimatedSalary'] / 1e5,
+        geography == geographies.index("Germany") if "Germany" in geographies else no_geography,
+        geography == geographies.index("Spain") if "Spain" in geographies else no_geography,
+        cols['Gender'],
+    ]
+
+
+def fit_spec(df):
+    """
+    Fit a generator spec to a real customer table
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Churn_Modelling-shaped table (COLUMNS)
+
+    Returns:
+    --------
+    dict : JSON-serialisable spec for generate_columns/write_synthetic
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    geographies = sorted(df['Geography'].astype(str).unique())
+    genders = sorted(df['Gender'].astype(str).unique())
+    pairs = df.groupby([df['Geography'].astype(str), df['Gender'].astype(str)], observed=True).size()
+    surnames = df['Surname'].astype(str).value_counts().head(MAX_SURNAMES)
+
+    balance = {}
+    for geography in geographies:
+        b = df.loc[df['Geography'].astype(str) == geography, 'Balance'].to_numpy(dtype=np.float64)
+        nonzero = b[b > 0]
+        balance[geography] = {
+            'zero_p': float((b == 0).mean()),
+            'mean': float(nonzero.mean()) if len(nonzero) else 0.0,
+            'std': float(nonzero.std()) if len(nonzero) > 1 else 0.0,
+        }
+    nonzero = df.loc[df['Balance'] > 0, 'Balance']
+
+    cols = {c: df[c].to_numpy(dtype=np.float64) for c in
+            ("CreditScore", "Age", "Tenure", "Balance", "NumOfProducts", "HasCrCard",
+             "IsActiveMember", "EstimatedSalary")}
+    cols['Geography'] = np.searchsorted(geographies, df['Geography'].astype(str))
+    cols['Gender'] = (df['Gender'].astype(str) == "Male").to_numpy()
+    churn = LogisticRegression(C=100.0, fit_intercept=False, max_iter=2000)
+    churn.fit(np.column_stack(_terms(cols, geographies)).astype(np.float64), df['Exited'].astype(int))
+
+    return {
+        'version': SPEC_VERSION,
+        'source_rows': len(df),
+        'churn_rate': float(df['Exited'].mean()),
+        'surnames': {'values': surnames.index.tolist(), 'p': (surnames / surnames.sum()).tolist()},
+        'geography': geographies,
+        'gender': genders,
+        'geography_gender': {'pairs': [[geographies.index(g), genders.index(s)] for g, s in pairs.index],
+                             'p': (pairs / pairs.sum()).tolist()},
+        'credit_score': _pmf(df['CreditScore']),
+        'age': _pmf(df['Age']),
+        'tenure': _pmf(df['Tenure']),
+        'num_products': _pmf(df['NumOfProducts']),
+        'has_cr_card_p': float(df['HasCrCard'].mean()),
+        'is_active_member_p': float(df['IsActiveMember'].mean()),
+        'balance': balance,
+        'balance_range': [float(nonzero.min()), float(nonzero.max())] if len(nonzero) else [0.0, 0.0],
+        'salary_range': [float(df['EstimatedSalary'].min()), float(df['EstimatedSalary'].max())],
+        'churn_model': {'terms': CHURN_TERMS, 'coef': churn.coef_[0].tolist()},
+    }
+
+
+def save_spec(spec, path=DEFAULT_SPEC_PATH):
+    Path(path).write_text(json.dumps(spec, indent=1))
+    return path
+
+
+def load_spec(path=DEFAULT_SPEC_PATH):
+    spec = json.loads(Path(path).read_text())
+    if spec.get('version') != SPEC_VERSION:
+        raise ValueError(f"{path} is a version {spec.get('version')} spec; refit it with 'synth_data.py fit'")
+    return spec
+
+
+def _lookup_table(pmf, dtype):
+    """
+    Inverse-CDF table of LOOKUP_SIZE entries: indexing it with uniform random
+    integers samples the distribution (to 1/LOOKUP_SIZE) much faster than
+    ``rng.choice(p=...)``
+    """
+    cdf = np.cumsum(pmf['p'])
+    index = np.searchsorted(cdf / cdf[-1], (np.arange(LOOKUP_SIZE) + 0.5) / LOOKUP_SIZE)
+    return np.asarray(pmf['values'], dtype=dtype)[index]
+
+
+def _draw(rng, pmf, n, dtype):
+    return _lookup_table(pmf, dtype)[rng.integers(0, LOOKUP_SIZE, size=n)]
+
+
+def generate_columns(spec, n_rows, rng, first_row=0):
+    """
+    One chunk of synthetic customers
+
+    Returns:
+    --------
+    dict : column name -> numpy array; Geography, Gender and Surname are
+        integer codes into spec['geography'], spec['gender'] and
+        spec['surnames']['values']
+    """
+    pair = _draw(rng, {'values': range(len(spec['geography_gender']['p'])), 'p': spec['geography_gender']['p']},
+                 n_rows, np.intp)
+    geography, gender = np.asarray(spec['geography_gender']['pairs'], dtype=np.int8)[pair].T
+
+    # Balance: a Geography-specific share of zeros, a clipped normal otherwise
+    zero_p, mean, std = (np.array([spec['balance'][g][key] for g in spec['geography']])[geography]
+                         for key in ('zero_p', 'mean', 'std'))
+    low, high = spec['balance_range']
+    balance = np.clip(rng.normal(mean, std), low, high).round(2)
+    balance[rng.random(n_rows) < zero_p] = 0.0
+
+    cols = {
+        'RowNumber': np.arange(first_row + 1, first_row + n_rows + 1, dtype=np.int64),
+        'CustomerId': np.arange(FIRST_CUSTOMER_ID + first_row, FIRST_CUSTOMER_ID + first_row + n_rows,
+                                dtype=np.int64),
+        'Surname': _draw(rng, {'values': range(len(spec['surnames']['p'])), 'p': spec['surnames']['p']},
+                         n_rows, np.int32),
+        'CreditScore': _draw(rng, spec['credit_score'], n_rows, np.int16),
+        'Geography': geography,
+        'Gender': gender,
+        'Age': _draw(rng, spec['age'], n_rows, np.int16),
+        'Tenure': _draw(rng, spec['tenure'], n_rows, np.int8),
+        'Balance': balance,
+        'NumOfProducts': _draw(rng, spec['num_products'], n_rows, np.int8),
+        'HasCrCard': (rng.random(n_rows) < spec['has_cr_card_p']).astype(np.int8),
+        'IsActiveMember': (rng.random(n_rows) < spec['is_active_member_p']).astype(np.int8),
+        'EstimatedSalary': rng.uniform(*spec['salary_range'], size=n_rows).round(2),
+    }
+    male = gender == spec['gender'].index("Male") if "Male" in spec['gender'] else np.zeros(n_rows, dtype=bool)
+    logit = np.zeros(n_rows)
+    for coef, term in zip(spec['churn_model']['coef'], _terms(dict(cols, Gender=male), spec['geography'])):
+        logit += coef * term
+    cols['Exited'] = (rng.random(n_rows) < 1.0 / (1.0 + np.exp(-logit))).astype(np.int8)
+    return cols
+
+
+def _table(spec, cols, dictionary_encode):
+    arrays = []
+    for name in COLUMNS:
+        if name in ('Surname', 'Geography', 'Gender'):
+            labels = spec['surnames']['values'] if name == 'Surname' else spec[name.lower()]
+            array = pa.DictionaryArray.from_arrays(pa.array(cols[name].astype(np.int32)), pa.array(labels))
+            arrays.append(array if dictionary_encode else array.dictionary_decode())
+        else:
+            arrays.append(pa.array(cols[name]))
+    return pa.Table.from_arrays(arrays, names=COLUMNS)
+
+
+def generate_frame(spec, n_rows, seed=0):
+    """``n_rows`` synthetic customers as a DataFrame (for tests and small samples)"""
+    rng = np.random.default_rng(seed)
+    return _table(spec, generate_columns(spec, n_rows, rng), dictionary_encode=True).to_pandas()
+
+
+def _encode_chunk(spec, n_rows, first_row, stream, parquet):
+    """Generate one chunk; CSV chunks come back already encoded (the costly part)"""
+    import pyarrow.csv as pa_csv
+
+    table = _table(spec, generate_columns(spec, n_rows, np.random.default_rng(stream), first_row),
+                   dictionary_encode=parquet)
+    if parquet:
+        return table
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(table, sink, pa_csv.WriteOptions(include_header=first_row == 0))
+    return sink.getvalue()
+
+
+def write_synthetic(spec, n_rows, path, seed=0, chunksize=1_000_000, workers=None):
+    """
+    Stream ``n_rows`` synthetic customers to a CSV or Parquet file
+
+    Each chunk gets its own random stream (derived from ``seed``), so the
+    output depends only on the seed and the chunk size, not on ``workers``.
+
+    Parameters:
+    -----------
+    workers : int, optional
+        Processes generating (and CSV-encoding) chunks; defaults to one
+        per CPU. Chunks are written in order.
+
+    Returns:
+    --------
+    Path : the written file
+    """
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    parquet = path.suffix.lower() in (".parquet", ".pq")
+    workers = workers or os.cpu_count() or 1
+    streams = np.random.SeedSequence(seed).spawn(max(1, -(-n_rows // chunksize)))
+    chunks = [(spec, min(chunksize, n_rows - i * chunksize), i * chunksize, stream, parquet)
+              for i, stream in enumerate(streams)]
+    writer = None
+
+    def write(chunk):
+        nonlocal writer
+        if writer is None:
+            writer = pq.ParquetWriter(path, chunk.schema) if parquet else open(path, "wb")
+        if parquet:
+            writer.write_table(chunk)
+        else:
+            writer.write(chunk)
+
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                write(_encode_chunk(*chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_encode_chunk, *chunk))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+def sample_customers(n, seed=0, spec=None):
+    """``n`` synthetic customers as feature dicts (model inputs only), e.g. for request payloads"""
+    from churn_features import RAW_FEATURES
+
+    frame = generate_frame(spec or load_spec(), n, seed)
+    frame[['Geography', 'Gender']] = frame[['Geography', 'Gender']].astype(str)
+    return frame[RAW_FEATURES].to_dict("records")
+
+
+def parse_size(text):
+    """'10m' -> 10000000, '250k' -> 250000, '5000' -> 5000"""
+    text = text.strip().lower()
+    factor = {"k": 10**3, "m": 10**6}.get(text[-1:], 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic churn customer generator")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fit = sub.add_parser("fit", help="Fit a spec to a real customer file")
+    fit.add_argument("data", help="Churn_Modelling-shaped CSV or Parquet file")
+    fit.add_argument("--spec", default=str(DEFAULT_SPEC_PATH), help="Where to write the spec")
+    gen = sub.add_parser("generate", help="Write synthetic customers")
+    gen.add_argument("rows", type=parse_size, help="Number of customers (k/m suffixes allowed)")
+    gen.add_argument("output", help="Output file (.csv or .parquet)")
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--spec", default=str(DEFAULT_SPEC_PATH), help="Spec written by 'fit'")
+    gen.add_argument("--chunksize", type=int, default=1_000_000)
+    gen.add_argument("--workers", type=int, default=None, help="Generator processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    if args.command == "fit":
+        from churn_data import load_customers
+
+        spec = fit_spec(load_customers(args.data, use_cache=False))
+        print(f"✓ Spec fitted on {spec['source_rows']:,} rows saved to '{save_spec(spec, args.spec)}'")
+        return
+
+    start = time.perf_counter()
+    path = write_synthetic(load_spec(args.spec), args.rows, args.output, args.seed, args.chunksize,
+                           args.workers)
+    elapsed = time.perf_counter() - start
+    size_mb = path.stat().st_size / 2**20
+    print(f"✓ {args.rows:,} customers written to '{path}' ({size_mb:,.0f} MB in {elapsed:.1f}s, "
+          f"{size_mb / elapsed:,.0f} MB/s, {args.rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Shared fixtures: small synthetic customer sets and one fitted pipeline per
+candidate model (trained in seconds), so the tests need neither
+Churn_Modelling.csv nor a training run.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from xgboost import XGBClassifier
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from churn_features import MODEL_FEATURES, TARGET, add_engineered_features  # noqa: E402
+from churn_models import make_preprocessor  # noqa: E402
+from synth_data import generate_frame, load_spec  # noqa: E402
+from xgb_fast import QuantizedSplit  # noqa: E402
+
+
+def make_customers(n_rows, seed):
+    """Synthetic customers (with the engineered features) drawn from synth_spec.json"""
+    return add_engineered_features(generate_frame(load_spec(), n_rows, seed=seed))
+
+
+@pytest.fixture(scope="session")
+def train_customers():
+    return make_customers(2000, seed=1)
+
+
+@pytest.fixture(scope="session")
+def customers():
+    return make_customers(500, seed=2)
+
+
+@pytest.fixture(scope="session")
+def pipelines(train_customers):
+    """Fitted Pipeline per model: LR, RF and XGBoost on one-hot inputs, plus the XGBoost fast path"""
+    X, y = train_customers[MODEL_FEATURES], train_customers[TARGET].astype(int)
+    classifiers = {
+        "Logistic Regression": LogisticRegression(max_iter=500, class_weight="balanced"),
+        "Random Forest": RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0, n_jobs=1),
+        "XGBoost": XGBClassifier(n_estimators=30, max_depth=4, tree_method="hist", random_state=0, n_jobs=1),
+    }
+    fitted = {name: Pipeline([("pre", make_preprocessor()), ("clf", clf)]).fit(X, y)
+              for name, clf in classifiers.items()}
+    split = QuantizedSplit(X, y)
+    fitted["XGBoost (native categoricals)"] = split.pipeline(
+        split.fit({'max_depth': 4, 'random_state': 0}, n_jobs=1, max_rounds=30))
+    return fitted
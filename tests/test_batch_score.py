@@ -0,0 +1,97 @@
+"""Incremental rescoring must produce the same table as scoring the file from scratch"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_score import score_file, score_file_incremental
+
+
+@pytest.fixture
+def model_path(pipelines, tmp_path):
+    path = tmp_path / "model.pkl"
+    joblib.dump(pipelines["Random Forest"], path)
+    return path
+
+
+def write_csv(df, path):
+    df.to_csv(path, index=False)
+    return path
+
+
+def score(input_path, output_path, model_path, **kwargs):
+    return score_file_incremental(input_path, output_path, model_path=model_path, threshold=0.4,
+                                  chunksize=128, **kwargs)
+
+
+def test_incremental_matches_full_rescore(customers, model_path, tmp_path):
+    write_csv(customers, tmp_path / "day1.csv")
+    # Next extract: some customers left, some changed, some are new, rows are renumbered
+    day2 = pd.concat([customers.iloc[50:], customers.iloc[:10].assign(CustomerId=lambda d: d['CustomerId'] + 10**7)])
+    day2.loc[day2.index[:25], 'Age'] += 5
+    day2['RowNumber'] = np.arange(len(day2)) + 1000
+    write_csv(day2, tmp_path / "day2.csv")
+
+    score(tmp_path / "day1.csv", tmp_path / "incremental.parquet", model_path)
+    stats = score(tmp_path / "day2.csv", tmp_path / "incremental.parquet", model_path)
+    assert not stats['full_rescore']
+    assert (stats['new'], stats['changed'], stats['removed']) == (10, 25, 50)
+    assert stats['reused'] == len(day2) - 35
+
+    score(tmp_path / "day2.csv", tmp_path / "full.parquet", model_path)
+    incremental = pd.read_parquet(tmp_path / "incremental.parquet")
+    full = pd.read_parquet(tmp_path / "full.parquet")
+    pd.testing.assert_frame_equal(incremental, full)
+
+
+def test_unchanged_file_reuses_every_score(customers, model_path, tmp_path):
+    write_csv(customers, tmp_path / "day1.csv")
+    score(tmp_path / "day1.csv", tmp_path / "scores.parquet", model_path)
+    stats = score(tmp_path / "day1.csv", tmp_path / "scores.parquet", model_path)
+    assert stats['rescored'] == 0 and stats['reused'] == len(customers)
+
+
+def test_duplicate_customer_ids_are_rejected(customers, model_path, tmp_path):
+    write_csv(pd.concat([customers, customers.head(3)]), tmp_path / "dupes.csv")
+    with pytest.raises(ValueError, match="share a CustomerId"):
+        score(tmp_path / "dupes.csv", tmp_path / "scores.parquet", model_path)
+
+
+def test_incremental_keeps_contributions_of_an_explained_table(customers, model_path, tmp_path):
+    write_csv(customers, tmp_path / "day1.csv")
+    day2 = customers.copy()
+    day2.loc[day2.index[:25], 'Age'] += 5
+    write_csv(day2, tmp_path / "day2.csv")
+
+    score(tmp_path / "day1.csv", tmp_path / "incremental.parquet", model_path, explain=True)
+    stats = score(tmp_path / "day2.csv", tmp_path / "incremental.parquet", model_path)
+    assert stats['explain'] and not stats['full_rescore'] and stats['rescored'] == 25
+
+    score(tmp_path / "day2.csv", tmp_path / "full.parquet", model_path, explain=True)
+    incremental = pd.read_parquet(tmp_path / "incremental.parquet")
+    pd.testing.assert_frame_equal(incremental, pd.read_parquet(tmp_path / "full.parquet"))
+    assert 'top_driver' in incremental.columns
+
+    stats = score(tmp_path / "day2.csv", tmp_path / "incremental.parquet", model_path, explain=False)
+    assert stats['rescored'] == 0
+    assert not any(c.startswith('contrib_') for c in pd.read_parquet(tmp_path / "incremental.parquet").columns)
+
+
+def test_pipeline_engine_explains_like_compiled(customers, model_path, tmp_path):
+    write_csv(customers, tmp_path / "customers.csv")
+    for engine in ("compiled", "pipeline"):
+        score_file(tmp_path / "customers.csv", tmp_path / f"{engine}.parquet", model_path=model_path,
+                   threshold=0.4, chunksize=128, workers=1, engine=engine, explain=True)
+    compiled = pd.read_parquet(tmp_path / "compiled.parquet")
+    pipeline = pd.read_parquet(tmp_path / "pipeline.parquet")
+    pd.testing.assert_frame_equal(pipeline, compiled, check_exact=False, atol=1e-12)
+
+
+def test_empty_input_writes_an_empty_table(customers, model_path, tmp_path):
+    customers.head(0).to_parquet(tmp_path / "empty.parquet")
+    stats = score_file(tmp_path / "empty.parquet", tmp_path / "scores.parquet", model_path=model_path,
+                       threshold=0.4, workers=1, explain=True)
+    scores = pd.read_parquet(tmp_path / "scores.parquet")
+    assert stats['rows'] == 0 and len(scores) == 0
+    assert {'CustomerId', 'churn_probability', 'risk_segment', 'top_driver'} <= set(scores.columns)
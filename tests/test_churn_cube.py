@@ -0,0 +1,42 @@
+"""The cube's value profile must reproduce the statistics the dashboard used to compute from the raw rows"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from churn_cube import PROFILE_COLUMNS, ChurnCube, profile_path
+from churn_features import TARGET
+
+
+def test_describe_matches_pandas(customers):
+    cube = ChurnCube.from_frame(customers)
+    expected = customers[list(PROFILE_COLUMNS)].astype(np.float64).describe()
+    stats = cube.describe()
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    pd.testing.assert_frame_equal(stats.loc[exact], expected.loc[exact], rtol=1e-9)
+    # Integer columns keep every value, money columns are binned to the nearest 100
+    integers = [col for col, width in PROFILE_COLUMNS.items() if width == 1]
+    pd.testing.assert_frame_equal(stats.loc[['25%', '50%', '75%'], integers],
+                                  expected.loc[['25%', '50%', '75%'], integers])
+    assert np.abs(stats.loc['50%', 'Balance'] - expected.loc['50%', 'Balance']) <= 100
+
+
+def test_box_stats_match_pandas_quartiles(customers):
+    box = ChurnCube.from_frame(customers).box_stats('CreditScore')
+    for status, scores in customers.groupby(TARGET)['CreditScore']:
+        q1, median, q3 = scores.quantile([0.25, 0.5, 0.75])
+        reach = 1.5 * (q3 - q1)
+        row = box.loc[status]
+        assert (row['q1'], row['median'], row['q3']) == pytest.approx((q1, median, q3))
+        assert row['lowerfence'] == scores[scores >= q1 - reach].min()
+        assert row['upperfence'] == scores[scores <= q3 + reach].max()
+
+
+def test_streamed_cube_matches_one_pass(customers, tmp_path):
+    whole = ChurnCube.from_frame(customers)
+    streamed = ChurnCube.from_chunks(customers.iloc[i:i + 120] for i in range(0, len(customers), 120))
+    pd.testing.assert_frame_equal(streamed.describe(), whole.describe(), rtol=1e-9)
+
+    path = whole.save(tmp_path / "cube.parquet")
+    assert profile_path(path).exists()
+    pd.testing.assert_frame_equal(ChurnCube.load(path).box_stats('Age'), whole.box_stats('Age'))
@@ -0,0 +1,43 @@
+"""The typed loader's Parquet cache must follow the source file and keep one copy of it"""
+
+import pandas as pd
+
+from churn_data import SCHEMA, iter_csv_typed, load_customers
+from synth_data import generate_frame, load_spec
+
+
+def test_cache_keeps_one_copy_per_source_file(tmp_path):
+    csv, cache_dir = tmp_path / "customers.csv", tmp_path / "cache"
+    generate_frame(load_spec(), 300, seed=1).to_csv(csv, index=False)
+    first = load_customers(csv, cache_dir=cache_dir)
+    assert load_customers(csv, cache_dir=cache_dir).equals(first)  # Served from the cache
+
+    # A data refresh replaces the old copy instead of adding a second one
+    generate_frame(load_spec(), 400, seed=2).to_csv(csv, index=False)
+    refreshed = load_customers(csv, cache_dir=cache_dir)
+    assert len(refreshed) == 400
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+
+
+def test_copy_shared_with_another_file_is_kept(tmp_path):
+    cache_dir = tmp_path / "cache"
+    frame = generate_frame(load_spec(), 300, seed=1)
+    for name in ("a.csv", "b.csv"):
+        frame.to_csv(tmp_path / name, index=False)
+        load_customers(tmp_path / name, cache_dir=cache_dir)
+
+    generate_frame(load_spec(), 100, seed=2).to_csv(tmp_path / "a.csv", index=False)
+    load_customers(tmp_path / "a.csv", cache_dir=cache_dir)
+    assert len(load_customers(tmp_path / "b.csv", cache_dir=cache_dir)) == 300
+    assert len(list(cache_dir.glob("*.parquet"))) == 2
+
+
+def test_chunks_use_the_schema(tmp_path):
+    csv = tmp_path / "customers.csv"
+    generate_frame(load_spec(), 250, seed=1).to_csv(csv, index=False)
+    chunks = list(iter_csv_typed(csv, chunksize=100, usecols={'CustomerId', 'Geography', 'Balance'}))
+    assert [len(c) for c in chunks] == [100, 100, 50]
+    assert {col: str(dtype) for col, dtype in chunks[0].dtypes.items()} == {
+        col: SCHEMA[col] for col in chunks[0].columns}
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True)[['Balance']],
+                                  load_customers(csv, use_cache=False)[['Balance']])
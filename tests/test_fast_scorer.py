@@ -0,0 +1,63 @@
+"""The compiled scorer must give the sklearn pipeline's probabilities"""
+
+import numpy as np
+import pytest
+
+from churn_features import MODEL_FEATURES, RAW_FEATURES, engineered_values
+from fast_scorer import CompiledScorer
+
+# float32 tree inputs and XGBoost's float32 margins bound the XGBoost error
+TOLERANCE = {
+    "Logistic Regression": 1e-12,
+    "Random Forest": 1e-12,
+    "XGBoost": 1e-6,
+    "XGBoost (native categoricals)": 1e-6,
+}
+
+
+@pytest.fixture(params=sorted(TOLERANCE))
+def model(request, pipelines):
+    return request.param, pipelines[request.param]
+
+
+def test_frame_matches_pipeline(model, customers):
+    name, pipeline = model
+    expected = pipeline.predict_proba(customers[MODEL_FEATURES])[:, 1]
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    np.testing.assert_allclose(scorer.predict_proba_frame(customers), expected, rtol=0, atol=TOLERANCE[name])
+
+
+def test_single_row_matches_pipeline(model, customers):
+    name, pipeline = model
+    sample = customers.head(50)
+    expected = pipeline.predict_proba(sample[MODEL_FEATURES])[:, 1]
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    # Raw inputs only: the scorer derives EngagementScore and CLV_Proxy itself
+    rows = sample[RAW_FEATURES].to_dict("records")
+    np.testing.assert_allclose([scorer.predict_proba_one(row) for row in rows], expected,
+                               rtol=0, atol=TOLERANCE[name])
+
+
+def test_saved_scorer_round_trips(model, customers, tmp_path):
+    name, pipeline = model
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    scorer.save(tmp_path / "scorer")
+    loaded = CompiledScorer.load(tmp_path / "scorer")
+    # The loaded scorer always walks the flat trees; a fresh one may hand large batches to the booster
+    np.testing.assert_allclose(loaded.predict_proba_frame(customers), scorer.predict_proba_frame(customers),
+                               rtol=0, atol=TOLERANCE[name])
+
+
+def test_missing_feature_is_reported(pipelines):
+    scorer = CompiledScorer.from_pipeline(pipelines["Random Forest"])
+    with pytest.raises(ValueError, match="Missing required feature"):
+        scorer.predict_proba_one({'Age': 40})
+
+
+def test_single_row_engineered_features_match_training(customers):
+    # The scorer derives them per dict; training adds them per frame (add_engineered_features)
+    for row, (_, expected) in zip(customers[RAW_FEATURES].head(50).to_dict("records"),
+                                  customers.head(50).iterrows()):
+        engagement, clv_proxy = engineered_values(row)
+        assert engagement == pytest.approx(expected['EngagementScore'], abs=1e-12)
+        assert clv_proxy == pytest.approx(expected['CLV_Proxy'], rel=1e-12)
@@ -0,0 +1,39 @@
+"""Republishing must refresh the version's metrics, and activating a version must change what scoring serves"""
+
+import pytest
+
+import churn_scoring
+from churn_features import MODEL_FEATURES, RAW_FEATURES
+from model_registry import ModelRegistry
+
+
+def feature_info(name, threshold):
+    return {'best_model_name': name, 'optimal_threshold': threshold, 'features': list(MODEL_FEATURES)}
+
+
+def test_publish_dedup_and_rollback(pipelines, customers, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # predict_churn reads the default registry directory
+    churn_scoring._load_version.cache_clear()
+    registry = ModelRegistry()
+    lr, rf = pipelines["Logistic Regression"], pipelines["Random Forest"]
+
+    first = registry.publish(lr, feature_info("Logistic Regression", 0.4), {'auc': 0.80})
+    # The same model again: no new version, the stored metrics are the latest run's
+    assert registry.publish(lr, feature_info("Logistic Regression", 0.4), {'auc': 0.81}) == first
+    assert registry.versions() == [first]
+    assert registry.load(first).metrics == {'auc': 0.81}
+
+    second = registry.publish(rf, feature_info("Random Forest", 0.6), {'auc': 0.85})
+    assert registry.versions() == [first, second] and registry.current_version() == second
+    customer = customers[RAW_FEATURES].iloc[0].to_dict()
+    expected_rf = rf.predict_proba(customers[MODEL_FEATURES].head(1))[0, 1]
+    assert churn_scoring.predict_churn(customer)['churn_probability'] == pytest.approx(expected_rf)
+
+    # Roll back: scoring follows CURRENT, with the old version's threshold
+    registry.activate(first)
+    assert churn_scoring.load_current_model().version == first
+    result = churn_scoring.predict_churn(customer)
+    expected_lr = lr.predict_proba(customers[MODEL_FEATURES].head(1))[0, 1]
+    assert result['churn_probability'] == pytest.approx(expected_lr)
+    assert result['threshold_used'] == 0.4
+    churn_scoring._load_version.cache_clear()
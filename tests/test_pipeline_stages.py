@@ -0,0 +1,72 @@
+"""A checkpoint must go stale when what it was computed from changes: upstream outputs or helper code"""
+
+import importlib
+import textwrap
+
+from pipeline_stages import Stage, StagePipeline
+
+SOURCE = {'value': 1}
+
+
+def stage_source(ctx):
+    return {'value': SOURCE['value']}
+
+
+def stage_double(ctx):
+    return {'doubled': 2 * ctx['value']}
+
+
+def stage_report(ctx):
+    return {'report': f"doubled={ctx['doubled']}"}
+
+
+def make_pipeline(cache_dir):
+    stages = [Stage('source', stage_source), Stage('double', stage_double, deps=('source',)),
+              Stage('report', stage_report, deps=('double',))]
+    return StagePipeline(stages, {}, cache_dir=cache_dir)
+
+
+def test_rerunning_a_stage_clears_its_downstream_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setitem(SOURCE, 'value', 1)
+    assert list(make_pipeline(tmp_path).run()) == ['source', 'double', 'report']
+
+    # Same code and config, different outputs: downstream must not stay cached
+    monkeypatch.setitem(SOURCE, 'value', 5)
+    assert list(make_pipeline(tmp_path).run(only='source')) == ['source']
+    pipeline = make_pipeline(tmp_path)
+    assert not pipeline.is_valid('double') and not pipeline.is_valid('report')
+    assert list(pipeline.run()) == ['double', 'report']
+    assert make_pipeline(tmp_path).outputs('report') == {'report': 'doubled=10'}
+
+
+def test_only_reruns_upstream_stages_whose_inputs_change(tmp_path, monkeypatch):
+    monkeypatch.setitem(SOURCE, 'value', 1)
+    pipeline = make_pipeline(tmp_path)
+    pipeline.run()
+    pipeline.checkpoint_path('source').unlink()
+    # 'double' is cached but reads from 'source', which has to run again
+    assert make_pipeline(tmp_path).plan(only='report') == ['source', 'double', 'report']
+
+
+def test_fingerprint_follows_helper_modules(tmp_path, monkeypatch):
+    (tmp_path / "helper_mod.py").write_text("def scale(x):\n    return 2 * x\n")
+    (tmp_path / "stages_mod.py").write_text(textwrap.dedent("""
+        from helper_mod import scale
+
+        def offset(x):
+            return x + 1
+
+        def stage_scaled(ctx):
+            return {'scaled': offset(scale(3))}
+    """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    stages_mod = importlib.import_module("stages_mod")
+
+    def fingerprint():
+        pipeline = StagePipeline([Stage('scaled', stages_mod.stage_scaled)], {}, cache_dir=tmp_path / "cache")
+        return pipeline.fingerprints()['scaled']
+
+    before = fingerprint()
+    assert fingerprint() == before
+    (tmp_path / "helper_mod.py").write_text("def scale(x):\n    return 3 * x\n")
+    assert fingerprint() != before
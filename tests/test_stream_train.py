@@ -0,0 +1,76 @@
+"""Out-of-core training: stable disjoint partitions, a uniform bounded sample, and unpublished runs stay off the live files"""
+
+import numpy as np
+import pytest
+
+from churn_features import FEATURE_INFO_PATH, METRICS_PATH, SCORER_DIR
+from stream_train import (
+    HOLDOUT, TRAIN, VALIDATION, ChunkedTable, Reservoir, plan_memory, save_streaming_model, train_streaming
+)
+from synth_data import generate_frame, load_spec
+
+
+@pytest.fixture
+def customer_csv(tmp_path):
+    path = tmp_path / "customers.csv"
+    generate_frame(load_spec(), 3000, seed=3).to_csv(path, index=False)
+    return path
+
+
+def partition_ids(table):
+    return {part: np.concatenate([X['CustomerId'].to_numpy() for X, _ in table.partition(part)])
+            for part in (TRAIN, VALIDATION, HOLDOUT)}
+
+
+def test_partitions_are_disjoint_and_independent_of_chunking(customer_csv):
+    parts = partition_ids(ChunkedTable(customer_csv, chunksize=700))
+    ids = np.concatenate(list(parts.values()))
+    assert len(ids) == len(set(ids)) == 3000
+    assert abs(len(parts[HOLDOUT]) / 3000 - 0.2) < 0.03
+    assert abs(len(parts[VALIDATION]) / 3000 - 0.1) < 0.03
+
+    rechunked = partition_ids(ChunkedTable(customer_csv, chunksize=1100))
+    for part, part_ids in parts.items():
+        np.testing.assert_array_equal(np.sort(rechunked[part]), np.sort(part_ids))
+
+
+def test_reservoir_is_bounded_and_uniform():
+    n_rows, capacity, runs = 200, 20, 1000
+    picked = np.zeros(n_rows)
+    for seed in range(runs):
+        reservoir = Reservoir(capacity, 1, random_state=seed)
+        for start in range(0, n_rows, 37):  # Chunks that do not line up with the capacity
+            reservoir.add(np.arange(start, min(start + 37, n_rows))[:, None])
+        sample = reservoir.sample()[:, 0].astype(int)
+        assert len(sample) == capacity and len(set(sample)) == capacity and reservoir.seen == n_rows
+        picked[sample] += 1
+    # Every row is kept with probability capacity / n_rows, early or late in the stream
+    per_decile = picked.reshape(10, -1).sum(axis=1) / (runs * capacity / 10)
+    np.testing.assert_allclose(per_decile, 1.0, atol=0.08)
+
+    small = Reservoir(capacity, 1)
+    small.add(np.arange(5)[:, None])
+    np.testing.assert_array_equal(small.sample()[:, 0], np.arange(5))
+
+
+def test_plan_memory_scales_with_the_cap(customer_csv):
+    small, large = plan_memory(customer_csv, 2048), plan_memory(customer_csv, 4096)
+    for key in ('chunksize', 'xgb_rows', 'reservoir_rows'):
+        assert 0 < small[key] < large[key]
+    with pytest.raises(MemoryError, match="below"):
+        plan_memory(customer_csv, 1)
+
+
+def test_unpublished_run_leaves_the_live_model_alone(customer_csv, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / FEATURE_INFO_PATH).write_bytes(b"live feature info")
+    (tmp_path / METRICS_PATH).write_text("{}")
+    run = train_streaming(customer_csv, memory_cap_mb=2048, epochs=1, cache_dir=tmp_path / "extmem")
+
+    assert save_streaming_model(run, publish=False, output_dir=tmp_path / "candidate") is None
+    out = tmp_path / "candidate"
+    assert (out / FEATURE_INFO_PATH).exists() and (out / SCORER_DIR).is_dir() and (out / METRICS_PATH).exists()
+    assert (tmp_path / FEATURE_INFO_PATH).read_bytes() == b"live feature info"
+    assert (tmp_path / METRICS_PATH).read_text() == "{}"
+    assert not (tmp_path / SCORER_DIR).exists() and not (tmp_path / "model_registry").exists()
+    assert not list(tmp_path.glob("best_churn_model_*.pkl"))
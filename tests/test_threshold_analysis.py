@@ -0,0 +1,66 @@
+"""The cumulative-sum threshold sweep must agree with confusion matrices computed threshold by threshold"""
+
+import numpy as np
+import pytest
+from sklearn.metrics import confusion_matrix, f1_score
+
+from threshold_analysis import metrics_at, optimal_threshold, threshold_curve
+
+
+@pytest.fixture
+def labelled_scores():
+    rng = np.random.default_rng(0)
+    y = rng.random(400) < 0.2
+    # Rounded, so many customers share a score (ties must form one threshold)
+    scores = np.round(np.clip(0.3 * y + rng.normal(0.3, 0.2, len(y)), 0, 1), 2)
+    return y.astype(int), scores
+
+
+def brute_force(y, scores, threshold, cost_fp, cost_fn):
+    tn, fp, fn, tp = confusion_matrix(y, scores >= threshold, labels=[0, 1]).ravel()
+    return {'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn, 'cost': cost_fp * fp + cost_fn * fn,
+            'f1': f1_score(y, scores >= threshold, zero_division=0)}
+
+
+def test_curve_matches_confusion_matrix(labelled_scores):
+    y, scores = labelled_scores
+    curve = threshold_curve(y, scores, cost_fp=1.0, cost_fn=5.0)
+    assert list(curve['threshold']) == sorted(set(scores), reverse=True)
+    for row in curve.itertuples():
+        expected = brute_force(y, scores, row.threshold, 1.0, 5.0)
+        assert (row.tp, row.fp, row.fn, row.tn) == (expected['tp'], expected['fp'], expected['fn'], expected['tn'])
+        assert row.cost == pytest.approx(expected['cost'])
+        assert row.f1 == pytest.approx(expected['f1'])
+
+
+def test_metrics_at_arbitrary_thresholds(labelled_scores):
+    y, scores = labelled_scores
+    curve = threshold_curve(y, scores, cost_fp=2.0, cost_fn=3.0)
+    thresholds = [0.0, 0.123, 0.5, 0.999, 1.5]
+    for threshold, row in zip(thresholds, metrics_at(curve, thresholds).itertuples()):
+        expected = brute_force(y, scores, threshold, 2.0, 3.0)
+        assert (row.tp, row.fp, row.fn, row.tn, row.cost) == pytest.approx(
+            (expected['tp'], expected['fp'], expected['fn'], expected['tn'], expected['cost']))
+
+
+@pytest.mark.parametrize("cost_fp, cost_fn", [(1.0, 5.0), (1.0, 1.0), (50.0, 1.0)])
+def test_cost_optimum_is_the_cheapest_policy(labelled_scores, cost_fp, cost_fn):
+    y, scores = labelled_scores
+    best = optimal_threshold(threshold_curve(y, scores, cost_fp, cost_fn), objective='cost')
+    candidates = sorted(set(scores)) + [np.inf]
+    cheapest = min(brute_force(y, scores, t, cost_fp, cost_fn)['cost'] for t in candidates)
+    assert best['cost'] == pytest.approx(cheapest)
+    assert best['cost'] == pytest.approx(brute_force(y, scores, best['threshold'], cost_fp, cost_fn)['cost'])
+
+
+def test_flags_nobody_when_interventions_cost_more_than_churn():
+    # Every cut point flags a retained customer (cost 10) to catch a churner (cost 1)
+    y, scores = [0, 1, 0, 1], [0.9, 0.8, 0.7, 0.1]
+    best = optimal_threshold(threshold_curve(y, scores, cost_fp=10.0, cost_fn=1.0), objective='cost')
+    assert best['threshold'] == np.inf
+    assert (best['tp'], best['fp'], best['fn'], best['tn'], best['cost']) == (0, 0, 2, 2, 2.0)
+
+
+def test_rejects_single_class_labels():
+    with pytest.raises(ValueError, match="both churned and retained"):
+        threshold_curve([0, 0, 0], [0.1, 0.2, 0.3])
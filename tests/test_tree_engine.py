@@ -0,0 +1,47 @@
+"""The flat tree engine must reproduce the ensembles, and contributions must add up to the output"""
+
+import numpy as np
+import pytest
+
+from churn_features import MODEL_FEATURES, RAW_FEATURES
+from fast_scorer import CompiledScorer
+from tree_engine import FlatForest
+
+TREE_MODELS = ["Random Forest", "XGBoost", "XGBoost (native categoricals)"]
+
+
+@pytest.fixture(params=TREE_MODELS)
+def model(request, pipelines, customers):
+    """(pipeline, flat forest, preprocessed matrix of ``customers``)"""
+    pipeline = pipelines[request.param]
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    return pipeline, FlatForest.from_model(pipeline.named_steps["clf"]), scorer.transform_frame(customers)
+
+
+def test_forest_matches_classifier(model, customers):
+    pipeline, forest, X = model
+    expected = pipeline.predict_proba(customers[MODEL_FEATURES])[:, 1]
+    np.testing.assert_allclose(forest.predict_proba(X), expected, rtol=0, atol=1e-6)
+
+
+def test_contributions_sum_to_margin(model):
+    _, forest, X = model
+    bias, contrib = forest.contributions(X)
+    assert contrib.shape == (X.shape[0], forest.n_features)
+    np.testing.assert_allclose(bias + contrib.sum(axis=1), forest.predict_margin(X), rtol=0, atol=1e-9)
+
+
+def test_xgboost_contributions_sum_to_logit(pipelines, customers):
+    pipeline = pipelines["XGBoost"]
+    proba = pipeline.predict_proba(customers[MODEL_FEATURES])[:, 1]
+    bias, contrib = CompiledScorer.from_pipeline(pipeline).explain_frame(customers)
+    np.testing.assert_allclose(bias + contrib.sum(axis=1), np.log(proba / (1 - proba)), rtol=0, atol=1e-5)
+
+
+def test_explain_one_matches_score(pipelines, customers):
+    scorer = CompiledScorer.from_pipeline(pipelines["Random Forest"])
+    for row in customers.head(20)[RAW_FEATURES].to_dict("records"):
+        explanation = scorer.explain_one(row)
+        assert explanation['output'] == pytest.approx(explanation['base'] + sum(explanation['contributions'].values()))
+        assert explanation['churn_probability'] == pytest.approx(scorer.predict_proba_one(row), abs=1e-12)
+        assert set(explanation['contributions']) == set(scorer.features)
@@ -0,0 +1,38 @@
+"""Fits on a shared QuantizedSplit must match fresh fits, and tuning must quantize each rung's rows once"""
+
+import numpy as np
+from xgboost import XGBClassifier
+
+import xgb_fast
+from churn_features import MODEL_FEATURES, TARGET
+from hyperparam_search import successive_halving
+from xgb_fast import FastXGBClassifier
+
+
+def test_shared_split_fits_like_a_fresh_one(train_customers, customers):
+    X, y = train_customers[MODEL_FEATURES], train_customers[TARGET].astype(int)
+    model = FastXGBClassifier(XGBClassifier(max_depth=3), n_jobs=1, max_rounds=40)
+    cache = {}
+    split = model.quantize(X, y, cache, "train")
+    assert model.quantize(X, y, cache, "train") is split
+    shared = model.fit(X, y, split=split).predict_proba(customers[MODEL_FEATURES])
+    fresh = FastXGBClassifier(XGBClassifier(max_depth=3), n_jobs=1, max_rounds=40).fit(X, y)
+    np.testing.assert_array_equal(shared, fresh.predict_proba(customers[MODEL_FEATURES]))
+
+
+def test_halving_quantizes_each_rung_once(train_customers, monkeypatch):
+    built = []
+
+    class CountingSplit(xgb_fast.QuantizedSplit):
+        def __init__(self, X_train, *args, **kwargs):
+            built.append(len(X_train))
+            super().__init__(X_train, *args, **kwargs)
+
+    monkeypatch.setattr(xgb_fast, "QuantizedSplit", CountingSplit)
+    space = {'classifier__max_depth': [2, 3, 4, 5], 'classifier__learning_rate': [0.1, 0.3]}
+    clf = FastXGBClassifier(XGBClassifier(max_depth=3, learning_rate=0.1), n_jobs=1, max_rounds=20)
+    _, trace = successive_halving("XGBoost", clf, space, train_customers[MODEL_FEATURES],
+                                  train_customers[TARGET].astype(int), n_configs=6, eta=2, n_cpus=1)
+    rungs = sorted({trial['rows'] for trial in trace})
+    assert len(trace) > len(rungs) > 1
+    assert sorted(built) == rungs
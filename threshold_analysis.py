@@ -0,0 +1,119 @@
+"""
+Full-resolution threshold analysis
+Sorts the scores once and uses cumulative sums to get the confusion matrix,
+precision, recall, F1 and a cost-weighted objective at every distinct
+threshold in O(n log n), instead of re-scanning y_true per threshold.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def threshold_curve(y_true, scores, cost_fp=1.0, cost_fn=1.0):
+    """
+    Classification metrics at every distinct score threshold
+
+    A customer is predicted to churn when ``score >= threshold``.
+
+    Parameters:
+    -----------
+    y_true : array-like of {0, 1}
+        Actual churn labels
+    scores : array-like of float
+        Predicted churn probabilities
+    cost_fp, cost_fn : float
+        Cost of a false positive (e.g. an unneeded retention offer) and of a
+        false negative (a churner we missed), used for the ``cost`` column
+
+    Returns:
+    --------
+    pd.DataFrame : one row per distinct threshold, in decreasing threshold
+        order, with tp/fp/fn/tn, precision, recall, f1 and cost (the costs
+        are kept in ``attrs`` for metrics_at)
+
+    Raises:
+    -------
+    ValueError
+        If there are no scores, or the labels hold only one class
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) == 0 or len(y_true) != len(scores):
+        raise ValueError(f"Expected the same non-zero number of labels and scores, "
+                         f"got {len(y_true)} and {len(scores)}")
+    if y_true.all() or not y_true.any():
+        raise ValueError("Threshold analysis needs both churned and retained customers in y_true")
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores = scores[order]
+    tp_cum = np.cumsum(y_true[order], dtype=np.int64)
+
+    # Last position of every run of equal scores = one distinct threshold
+    last = np.append(np.flatnonzero(np.diff(sorted_scores)), len(scores) - 1)
+
+    n_pos = int(tp_cum[-1])
+    n_neg = len(scores) - n_pos
+    tp = tp_cum[last]
+    fp = (last + 1) - tp
+    fn = n_pos - tp
+    tn = n_neg - fp
+
+    # Every row predicts at least one customer positive and there is at least one churner
+    precision = tp / (tp + fp)
+    recall = tp / n_pos
+    f1 = 2 * tp / (2 * tp + fp + fn)
+
+    curve = pd.DataFrame({
+        'threshold': sorted_scores[last],
+        'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'cost': cost_fp * fp + cost_fn * fn,
+    })
+    curve.attrs.update(cost_fp=cost_fp, cost_fn=cost_fn)
+    return curve
+
+
+def metrics_at(curve, thresholds):
+    """Rows of ``curve`` in effect at the given thresholds (``score >= threshold``)"""
+    # curve is sorted by decreasing threshold; the row in effect for t is the
+    # smallest curve threshold that is still >= t
+    ascending = curve['threshold'].to_numpy()[::-1]
+    pos = np.searchsorted(ascending, np.asarray(thresholds, dtype=np.float64), side="left")
+    rows = []
+    for t, p in zip(thresholds, pos):
+        if p >= len(ascending):  # Nothing predicted positive
+            fn = int(curve['tp'].iloc[0] + curve['fn'].iloc[0])
+            tn = int(curve['fp'].iloc[0] + curve['tn'].iloc[0])
+            row = {'tp': 0, 'fp': 0, 'fn': fn, 'tn': tn, 'precision': 0.0,
+                   'recall': 0.0, 'f1': 0.0, 'cost': curve.attrs.get('cost_fn', np.nan) * fn}
+        else:
+            row = curve.iloc[len(ascending) - 1 - p].to_dict()
+        row['threshold'] = float(t)
+        rows.append(row)
+    return pd.DataFrame(rows)[curve.columns]
+
+
+def optimal_threshold(curve, objective='f1'):
+    """
+    Best row of ``curve``: maximum F1 (``objective='f1'``) or minimum cost
+    (``objective='cost'``); ties go to the highest threshold
+
+    The cost objective also weighs flagging nobody (threshold ``inf``, every
+    churner missed), which wins when each intervention costs more than the
+    churn it prevents.
+    """
+    if objective == 'f1':
+        best = int(np.argmax(curve['f1'].to_numpy()))
+    elif objective == 'cost':
+        best = int(np.argmin(curve['cost'].to_numpy()))
+        nobody = metrics_at(curve, [np.inf]).iloc[0]
+        if nobody['cost'] <= curve['cost'].iloc[best]:
+            curve, best = nobody.to_frame().T, 0
+    else:
+        raise ValueError(f"Unknown threshold objective: {objective!r}")
+    row = curve.iloc[best].to_dict()
+    row['threshold'] = float(row['threshold'])
+    for count in ('tp', 'fp', 'fn', 'tn'):
+        row[count] = int(row[count])
+    return row
@@ -0,0 +1,325 @@
+"""
+Concurrent training of the candidate models under an explicit CPU budget
+Runs every candidate in its own worker process and gives each one a fixed
+share of the cores (Logistic Regression gets one core, the tree ensembles
+split the rest in proportion to their weight), so the fits neither
+oversubscribe the CPUs nor leave cores idle.
+
+Stratified k-fold cross-validation uses the same pool: the fold indices and
+each fold's preprocessed matrices are computed once in the parent, and every
+candidate x fold task runs single-threaded in a worker, so the cores stay
+busy with independent fits.
+
+Candidates with ``raw_features = True`` (the XGBoost fast path,
+xgb_fast.FastXGBClassifier) take the unpreprocessed feature frames instead
+of the shared matrices, but are scheduled and budgeted like the others. In
+cross-validation a worker quantizes a fold's rows once and reuses them for
+every raw-feature fit on that fold.
+
+Usage:
+    python train_scheduler.py Churn_Modelling.csv --cpus 8 --compare-sequential
+    python train_scheduler.py Churn_Modelling.csv --cv 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+from churn_models import PreprocessingCache, evaluate_model
+
+# Relative share of the cores; None means a fixed single core
+CPU_WEIGHTS = {
+    "Logistic Regression": None,
+    "Random Forest": 2,
+    "XGBoost": 1,
+}
+
+
+def allocate_cpus(names, total=None, weights=CPU_WEIGHTS):
+    """
+    Split ``total`` cores between the candidates
+
+    Candidates with weight None (single-threaded learners) get one core; the
+    remaining cores are split proportionally to the weights using largest
+    remainders, with at least one core per candidate. The cores in use at
+    once never exceed ``total``: with at least as many candidates as cores,
+    each gets one core and train_candidates runs them ``total`` at a time.
+    """
+    total = total or os.cpu_count() or 1
+    if len(names) >= total:
+        return {n: 1 for n in names}
+    fixed = [n for n in names if weights.get(n, 1) is None]
+    weighted = [n for n in names if weights.get(n, 1) is not None]
+    shares = {n: 1 for n in fixed}
+    remaining = total - len(fixed)
+    weight_sum = sum(weights.get(n, 1) for n in weighted)
+    if weighted:
+        exact = {n: remaining * weights.get(n, 1) / weight_sum for n in weighted}
+        shares.update({n: max(1, int(exact[n])) for n in weighted})
+        leftover = remaining - sum(shares[n] for n in weighted)
+        for n in sorted(weighted, key=lambda n: exact[n] - int(exact[n]), reverse=True):
+            if leftover <= 0:
+                break
+            shares[n] += 1
+            leftover -= 1
+    return {n: shares[n] for n in names}
+
+
+def _set_threads(model, n_threads):
+    """Limit a pipeline's classifier to ``n_threads`` if it is multi-threaded"""
+    clf = model.named_steps["clf"] if hasattr(model, "named_steps") else model
+    if clf.get_params().get("n_jobs") is not None:
+        clf.set_params(n_jobs=n_threads)
+
+
+def _takes_raw(model):
+    return getattr(model, "raw_features", False)
+
+
+def _fit_candidate(name, model, n_threads, X_train, y_train, X_test, y_test):
+    """Fit and evaluate one candidate with a fixed thread budget (runs in a worker)"""
+    _set_threads(model, n_threads)
+    with threadpool_limits(limits=n_threads):
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        result = evaluate_model(model, X_test, y_test)
+    result['fit_time'] = fit_time
+    result['n_threads'] = n_threads
+    return name, result
+
+
+def pool_context():
+    """Process-pool context: fork where available, so workers do not re-import the training script"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+
+def train_candidates(models, X_train, y_train, X_test, y_test, n_cpus=None, parallel=True, raw=None):
+    """
+    Fit every candidate and pick the best by test AUC
+
+    Parameters:
+    -----------
+    raw : (X_train, X_test) DataFrames, optional
+        Unpreprocessed features, required when a candidate has ``raw_features``
+
+    Returns:
+    --------
+    results : dict
+        ``{name: {'model', 'auc', 'accuracy', ..., 'fit_time', 'n_threads'}}``
+    best_name : str
+        Candidate with the highest AUC
+    wall_time : float
+        Wall-clock seconds for the whole training stage
+    """
+    if raw is None and any(_takes_raw(model) for model in models.values()):
+        raise ValueError("A candidate trains on raw features; pass raw=(X_train, X_test)")
+    inputs = {name: raw if _takes_raw(model) else (X_train, X_test) for name, model in models.items()}
+    n_cpus = n_cpus or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = {}
+    workers = min(len(models), n_cpus)
+    if parallel and workers > 1:
+        shares = allocate_cpus(list(models), n_cpus)
+        # Heaviest candidates first, so a short budget queues the light ones
+        order = sorted(models, key=lambda n: CPU_WEIGHTS.get(n) or 0, reverse=True)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+            futures = {
+                name: pool.submit(_fit_candidate, name, models[name], shares[name],
+                                  inputs[name][0], y_train, inputs[name][1], y_test)
+                for name in order
+            }
+            for name in models:
+                results[name] = futures[name].result()[1]
+    else:
+        for name, model in models.items():
+            X_fit, X_eval = inputs[name]
+            name, result = _fit_candidate(name, model, n_cpus, X_fit, y_train, X_eval, y_test)
+            results[name] = result
+    wall_time = time.perf_counter() - start
+
+    best_name = max(results, key=lambda n: results[n]['auc'])
+    return results, best_name, wall_time
+
+
+def stratified_folds(y, n_splits=5, random_state=42):
+    """Shuffled stratified (train_idx, test_idx) pairs, computed once and reused by every candidate"""
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return list(skf.split(np.zeros(len(y)), y))
+
+
+# Fold design matrices, set in the parent before the pool starts (inherited by
+# forked workers, passed once per worker otherwise)
+_CV_FOLDS = []
+# Quantized fold rows for raw-feature candidates, built once per worker and fold
+_CV_SPLITS = {}
+
+
+def _init_cv_worker(folds):
+    global _CV_FOLDS, _CV_SPLITS
+    _CV_FOLDS, _CV_SPLITS = folds, {}
+
+
+def _fit_fold(name, clf, fold, n_threads):
+    """Fit one candidate on one CV fold and score it on the fold's held-out part"""
+    X_train, y_train, X_test, y_test, raw_train, raw_test = _CV_FOLDS[fold]
+    clf = clone(clf)
+    _set_threads(clf, n_threads)
+    fit_params = {}
+    with threadpool_limits(limits=n_threads):
+        start = time.perf_counter()
+        if _takes_raw(clf):
+            X_train, X_test = raw_train, raw_test
+            fit_params['split'] = clf.quantize(X_train, y_train, _CV_SPLITS, fold)
+        clf.fit(X_train, y_train, **fit_params)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        proba = clf.predict_proba(X_test)[:, 1]
+        predict_time = time.perf_counter() - start
+    pred = (proba >= 0.5).astype(int)
+    return name, fold, {
+        'auc': roc_auc_score(y_test, proba),
+        'f1': f1_score(y_test, pred, zero_division=0),
+        'accuracy': accuracy_score(y_test, pred),
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+    }
+
+
+def cross_validate_candidates(models, preprocessor, X, y, n_splits=5, n_cpus=None,
+                              threads_per_task=1, random_state=42):
+    """
+    Stratified k-fold evaluation of every candidate, candidate x fold in parallel
+
+    Parameters:
+    -----------
+    models : dict
+        ``{name: unfitted classifier}`` (bare classifiers, as in make_classifiers,
+        or raw-feature candidates, which get the fold's rows of X)
+    preprocessor : ColumnTransformer
+        Unfitted preprocessor; fitted once per fold on the fold's training part
+    X, y : DataFrame, Series/array
+        Data to cross-validate on (the training split, so the holdout stays unseen)
+    n_splits : int
+        Number of folds
+    n_cpus : int, optional
+        CPU budget (default: all cores)
+    threads_per_task : int
+        Threads each fit may use; workers = n_cpus // threads_per_task
+
+    Returns:
+    --------
+    cv_results : dict
+        ``{name: {'auc_mean', 'auc_std', 'f1_mean', 'f1_std', 'accuracy_mean',
+        'fit_time_mean', 'predict_time_mean', 'folds': [per-fold metrics]}}``
+    wall_time : float
+        Wall-clock seconds, including building the fold matrices
+    task_time : float
+        Sum of the per-task fit + predict seconds (the sequential cost)
+    """
+    n_cpus = n_cpus or os.cpu_count() or 1
+    start = time.perf_counter()
+    y = np.asarray(y)
+
+    cache = PreprocessingCache(preprocessor)
+    folds = []
+    for k, (train_idx, test_idx) in enumerate(stratified_folds(y, n_splits, random_state)):
+        split = cache.get(k, X.iloc[train_idx], X.iloc[test_idx])
+        folds.append((split.X_train, y[train_idx], split.X_test, y[test_idx],
+                      X.iloc[train_idx], X.iloc[test_idx]))
+
+    # Heaviest candidates first (longest-processing-time scheduling keeps the tail short)
+    order = sorted(models, key=lambda n: CPU_WEIGHTS.get(n) or 0, reverse=True)
+    tasks = [(name, k) for name in order for k in range(n_splits)]
+    workers = min(len(tasks), max(1, n_cpus // threads_per_task))
+    fold_metrics = {name: [None] * n_splits for name in models}
+    _init_cv_worker(folds)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(),
+                                 initializer=_init_cv_worker, initargs=(folds,)) as pool:
+            futures = [pool.submit(_fit_fold, name, models[name], k, threads_per_task)
+                       for name, k in tasks]
+            for future in futures:
+                name, k, metrics = future.result()
+                fold_metrics[name][k] = metrics
+    else:
+        for name, k in tasks:
+            _, _, fold_metrics[name][k] = _fit_fold(name, models[name], k, n_cpus)
+    wall_time = time.perf_counter() - start
+
+    cv_results = {}
+    task_time = 0.0
+    for name, per_fold in fold_metrics.items():
+        summary = {}
+        for key in ('auc', 'f1', 'accuracy', 'fit_time', 'predict_time'):
+            values = np.array([m[key] for m in per_fold])
+            summary[f'{key}_mean'] = float(values.mean())
+            summary[f'{key}_std'] = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+        summary['folds'] = per_fold
+        task_time += sum(m['fit_time'] + m['predict_time'] for m in per_fold)
+        cv_results[name] = summary
+    return cv_results, wall_time, task_time
+
+
+def main():
+    from sklearn.model_selection import train_test_split
+
+    from churn_data import load_customers
+    from churn_features import MODEL_FEATURES, TARGET, add_engineered_features
+    from churn_models import PreprocessedSplit, make_classifiers, make_preprocessor
+
+    parser = argparse.ArgumentParser(description="Train the candidates concurrently")
+    parser.add_argument("data", help="Customer CSV")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU budget (default: all cores)")
+    parser.add_argument("--compare-sequential", action="store_true",
+                        help="Also train one model after another for a wall-clock comparison")
+    parser.add_argument("--cv", type=int, default=0, metavar="K",
+                        help="Run stratified K-fold CV on the training split instead")
+    args = parser.parse_args()
+
+    df = add_engineered_features(load_customers(args.data))
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[MODEL_FEATURES], df[TARGET].astype(int), test_size=0.2, random_state=42,
+        stratify=df[TARGET]
+    )
+    n_cpus = args.cpus or os.cpu_count() or 1
+    if args.cv:
+        cv_results, wall, task_time = cross_validate_candidates(
+            make_classifiers(), make_preprocessor(), X_train, y_train, n_splits=args.cv, n_cpus=n_cpus
+        )
+        for name, r in cv_results.items():
+            print(f"  {name:<20} AUC {r['auc_mean']:.4f} ± {r['auc_std']:.4f}  "
+                  f"F1 {r['f1_mean']:.4f} ± {r['f1_std']:.4f}  fit {r['fit_time_mean']:.2f}s")
+        print(f"⏱ {args.cv}-fold CV wall time: {wall:.1f}s on {n_cpus} core(s) "
+              f"(sequential fit+predict time: {task_time:.1f}s)")
+        return
+
+    holdout = PreprocessedSplit(make_preprocessor(), X_train, X_test)
+    print(f"CPU budget: {n_cpus} -> {allocate_cpus(list(CPU_WEIGHTS), n_cpus)}")
+
+    results, best_name, wall = train_candidates(
+        make_classifiers(), holdout.X_train, y_train, holdout.X_test, y_test, n_cpus=n_cpus
+    )
+    for name, r in results.items():
+        print(f"  {name:<20} AUC {r['auc']:.4f}  fit {r['fit_time']:.1f}s on {r['n_threads']} core(s)")
+    print(f"🏆 Best: {best_name}   ⏱ concurrent wall time: {wall:.1f}s")
+
+    if args.compare_sequential:
+        _, _, seq_wall = train_candidates(
+            make_classifiers(n_jobs=n_cpus), holdout.X_train, y_train, holdout.X_test, y_test,
+            n_cpus=n_cpus, parallel=False
+        )
+        print(f"⏱ sequential wall time: {seq_wall:.1f}s  (speedup {seq_wall / wall:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Flat array-backed tree ensemble inference
+Exports a fitted RandomForestClassifier or binary XGBClassifier into contiguous
+node arrays (feature, threshold, left/right child, value) and scores a batch by
+walking every tree level by level with vectorised NumPy indexing. XGBoost
+categorical splits (native categorical support) are kept as per-node category
+bitmasks. The same walk attributes each prediction to the input columns
+(``FlatForest.contributions``): every split is credited with the change in
+the node's expected value along the row's path.
+
+The exported artifact is a directory of uncompressed ``.npy`` files plus a
+``meta.json`` and can be opened with ``mmap_mode='r'``.
+
+Usage:
+    python tree_engine.py best_churn_model_random_forest.pkl flat_forest/
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "cover", "roots", "cat_bits")
+# Arrays that forests exported before categorical support do not have
+OPTIONAL_ARRAYS = ("cat_bits",)
+
+# Category codes are stored as bits of a uint64 per node
+MAX_CATEGORY_CODE = 63
+
+# Rows are scored in blocks so the (n_trees, n_rows) index matrix stays small
+_BLOCK_CELLS = 1 << 18
+
+
+def _sibling_order(left, right):
+    """Breadth-first node order in which the two children of every split are adjacent"""
+    order = [0]
+    for node in order:  # Appending while iterating walks the tree breadth-first
+        if left[node] != -1:
+            order.append(left[node])
+            order.append(right[node])
+    return np.asarray(order, dtype=np.int64)
+
+
+def _flatten_tree(parts, left, right, feature, threshold, missing_left, value, cover, offset,
+                  cat_bits=None):
+    """
+    Append one tree to ``parts`` in sibling order and return (n_nodes, depth)
+
+    Children are renumbered so that ``right == left + 1``; leaves point to
+    themselves with an infinite threshold so every step can be computed as
+    ``left[idx] + (x > threshold[idx])``. ``cat_bits`` marks categorical
+    splits: bit c set means category code c goes right.
+    """
+    order = _sibling_order(left, right)
+    n = len(order)
+    new_id = np.empty(n, dtype=np.int64)
+    new_id[order] = np.arange(n)
+    leaf = left[order] == -1
+    own = np.arange(n, dtype=np.int64)
+    new_left = np.where(leaf, own, new_id[np.where(leaf, 0, left[order])])
+
+    depth = np.zeros(n, dtype=np.int64)
+    for node in range(n):  # Parents precede children in sibling order
+        if not leaf[node]:
+            depth[new_left[node]] = depth[new_left[node] + 1] = depth[node] + 1
+
+    parts["feature"].append(np.where(leaf, 0, feature[order]))
+    parts["threshold"].append(np.where(leaf, np.inf, threshold[order]))
+    parts["left"].append(new_left + offset)
+    parts["right"].append(np.where(leaf, own, new_left + 1) + offset)
+    parts["missing_left"].append(leaf | missing_left[order])
+    parts["value"].append(value[order])
+    parts["cover"].append(cover[order])
+    parts["cat_bits"].append(np.zeros(n, dtype=np.uint64) if cat_bits is None else cat_bits[order])
+    return n, int(depth.max())
+
+
+def _category_bits(tree, n_nodes):
+    """Per-node bitmask of the categories an XGBoost categorical split sends right"""
+    bits = np.zeros(n_nodes, dtype=np.uint64)
+    if not any(tree["split_type"]):
+        return bits
+    categories = tree["categories"]
+    for node, start, size in zip(tree["categories_nodes"], tree["categories_segments"],
+                                 tree["categories_sizes"]):
+        codes = categories[start:start + size]
+        if codes and max(codes) > MAX_CATEGORY_CODE:
+            raise NotImplementedError(f"Categorical splits on codes above {MAX_CATEGORY_CODE} are not supported")
+        bits[node] = np.uint64(sum(1 << int(c) for c in codes))
+    return bits
+
+
+class FlatForest:
+    """
+    Tree ensemble stored as flat node arrays
+
+    Nodes are laid out so that ``right == left + 1`` and leaves point to
+    themselves with an infinite threshold, so a fixed number of ``max_depth``
+    steps of ``left[idx] + (x > threshold[idx])`` brings every row to its leaf.
+    ``value`` holds a value for every node: the class-1 probability for Random
+    Forest nodes, the leaf margin (and cover-weighted mean margin for internal
+    nodes) for XGBoost. Nodes with a non-zero ``cat_bits`` are categorical
+    splits: the row goes right when the bit of its category code is set.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, cover,
+                 roots, kind, decision, max_depth, n_features, base_margin=0.0, cat_bits=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.cover = cover
+        self.roots = roots
+        self.kind = kind            # "rf": average of leaf probabilities, "xgb": sum of margins
+        self.decision = decision    # "le": x <= threshold goes left (sklearn), "lt": x < threshold (XGBoost)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.base_margin = float(base_margin)
+        self.cat_bits = np.zeros(len(feature), dtype=np.uint64) if cat_bits is None else cat_bits
+        self.has_categorical = bool(np.any(self.cat_bits))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def is_leaf(self):
+        """Boolean mask of leaf nodes"""
+        return self.left == np.arange(self.n_nodes)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_model(cls, model):
+        """Flatten a fitted RandomForestClassifier or XGBClassifier (or a Pipeline ending in one)"""
+        if hasattr(model, "named_steps"):
+            model = model.named_steps["clf"]
+        kind = type(model).__name__
+        if kind == "RandomForestClassifier":
+            return cls._from_random_forest(model)
+        if kind == "XGBClassifier":
+            return cls._from_xgboost(model)
+        raise NotImplementedError(f"Cannot flatten {kind}")
+
+    @classmethod
+    def _from_random_forest(cls, model):
+        if model.n_outputs_ != 1 or model.n_classes_ != 2:
+            raise NotImplementedError("Only binary single-output forests are supported")
+        parts = {name: [] for name in ARRAYS if name != "roots"}
+        roots, offset, max_depth = [], 0, 0
+        for est in model.estimators_:
+            tree = est.tree_
+            proba = tree.value[:, 0, :]
+            normalizer = proba.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            missing = getattr(tree, "missing_go_to_left", None)
+            n, depth = _flatten_tree(
+                parts, tree.children_left, tree.children_right, tree.feature,
+                tree.threshold,
+                np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool),
+                proba[:, 1] / normalizer, tree.weighted_n_node_samples, offset,
+            )
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, depth)
+
+        return cls._assemble(parts, roots, kind="rf", decision="le",
+                             max_depth=max_depth, n_features=model.n_features_in_)
+
+    @classmethod
+    def _from_xgboost(cls, model):
+        booster = model.get_booster()
+        config = json.loads(booster.save_raw("json"))
+        learner = config["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise NotImplementedError("Only binary:logistic boosters are supported")
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        trees = learner["gradient_booster"]["model"]["trees"]
+        best_iteration = getattr(model, "best_iteration", None)
+        if best_iteration is not None:
+            trees = trees[:best_iteration + 1]  # Same trees as predict_proba uses
+
+        parts = {name: [] for name in ARRAYS if name != "roots"}
+        roots, offset, max_depth = [], 0, 0
+        for tree in trees:
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            leaf = left == -1
+            # XGBoost stores float32 split conditions (and leaf values in the same slot)
+            cond = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+            cover = np.asarray(tree["sum_hessian"], dtype=np.float64)
+
+            # Internal nodes get the cover-weighted mean of their leaves' margins
+            value = np.where(leaf, cond, 0.0)
+            for node in _sibling_order(left, right)[::-1]:  # Children before parents
+                if not leaf[node]:
+                    l, r = left[node], right[node]
+                    total = cover[l] + cover[r]
+                    value[node] = ((value[l] * cover[l] + value[r] * cover[r]) / total
+                                   if total > 0 else 0.5 * (value[l] + value[r]))
+
+            n, depth = _flatten_tree(
+                parts, left, right, np.asarray(tree["split_indices"], dtype=np.int64), cond,
+                np.asarray(tree["default_left"], dtype=bool), value, cover, offset,
+                cat_bits=_category_bits(tree, len(left)),
+            )
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, depth)
+
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+        n_features = int(learner["learner_model_param"]["num_feature"])
+        return cls._assemble(parts, roots, kind="xgb", decision="lt", max_depth=max_depth,
+                             n_features=n_features, base_margin=base_margin)
+
+    @classmethod
+    def _assemble(cls, parts, roots, **meta):
+        return cls(
+            feature=np.concatenate(parts["feature"]).astype(np.int32),
+            threshold=np.concatenate(parts["threshold"]).astype(np.float64),
+            left=np.concatenate(parts["left"]).astype(np.int32),
+            right=np.concatenate(parts["right"]).astype(np.int32),
+            missing_left=np.concatenate(parts["missing_left"]).astype(bool),
+            value=np.concatenate(parts["value"]).astype(np.float64),
+            cover=np.concatenate(parts["cover"]).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            cat_bits=np.concatenate(parts["cat_bits"]).astype(np.uint64),
+            **meta,
+        )
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def meta(self):
+        return {
+            "kind": self.kind,
+            "decision": self.decision,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "base_margin": self.base_margin,
+            "n_trees": self.n_trees,
+            "n_nodes": self.n_nodes,
+        }
+
+    def save(self, path):
+        """Write the node arrays as uncompressed .npy files plus meta.json"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        (path / "meta.json").write_text(json.dumps(self.meta(), indent=2))
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Open a saved forest; with ``mmap_mode='r'`` nodes are paged in on demand"""
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in ARRAYS
+                  if name not in OPTIONAL_ARRAYS or (path / f"{name}.npy").exists()}
+        return cls(**arrays, kind=meta["kind"], decision=meta["decision"],
+                   max_depth=meta["max_depth"], n_features=meta["n_features"],
+                   base_margin=meta["base_margin"])
+
+    # ------------------------------------------------------------------
+    # Inference
+    # ------------------------------------------------------------------
+    def apply(self, X):
+        """Leaf index reached in every tree: array of shape (n_trees, n_rows)"""
+        # Trees see float32 features, exactly like sklearn and XGBoost
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        block = max(1, _BLOCK_CELLS // max(self.n_trees, 1))
+        out = np.empty((self.n_trees, n_rows), dtype=np.int32)
+        for start in range(0, n_rows, block):
+            out[:, start:start + block] = self._apply_block(X[start:start + block])
+        return out
+
+    def _walk(self, X):
+        """
+        Yield (parent, child) node indices, each of shape (n_trees, n_rows),
+        for each of the ``max_depth`` steps from the roots to the leaves
+        """
+        n_rows, n_cols = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int64) * n_cols)[np.newaxis, :]
+        has_nan = bool(np.isnan(flat).any())
+        # sklearn sends x <= threshold left, XGBoost sends x < threshold left
+        go_right = np.greater if self.decision == "le" else np.greater_equal
+        idx = np.repeat(self.roots[:, np.newaxis].astype(np.int64), n_rows, axis=1)
+        for _ in range(self.max_depth):
+            x = np.take(flat, row_offset + np.take(self.feature, idx))
+            step = go_right(x, np.take(self.threshold, idx))
+            if self.has_categorical:
+                bits = np.take(self.cat_bits, idx)
+                categorical = bits != 0
+                if categorical.any():
+                    # Category in the node's set goes right; missing/unknown codes use missing_left
+                    known = categorical & (x >= 0) & (x <= MAX_CATEGORY_CODE)
+                    codes = np.where(known, x, 0).astype(np.uint64)
+                    in_set = ((bits >> codes) & np.uint64(1)).astype(bool) & known
+                    step = np.where(categorical, in_set, step)
+            if has_nan:
+                step |= np.isnan(x) & ~np.take(self.missing_left, idx)
+            child = np.take(self.left, idx) + step
+            yield idx, child
+            idx = child
+
+    def _apply_block(self, X):
+        idx = np.repeat(self.roots[:, np.newaxis].astype(np.int64), X.shape[0], axis=1)
+        for _, idx in self._walk(X):
+            pass
+        return idx
+
+    def contributions(self, X):
+        """
+        Tree-path (Saabas) attribution of every row's raw output to its columns
+
+        Walking a row down a tree, each split moves the expected output from
+        the parent's ``value`` to the child's. The change is credited to the
+        split's feature, so per row ``bias + contributions.sum()`` equals
+        ``predict_margin`` exactly. Units are the raw output: probability
+        (rf) or log-odds margin (xgb).
+
+        Returns:
+        --------
+        bias : float
+            Expected output over the training data (mean root value for rf,
+            summed root values plus the base margin for xgb)
+        contributions : np.ndarray of shape (n_rows, n_features)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        scale = 1.0 / self.n_trees if self.kind == "rf" else 1.0
+        roots = self.value[self.roots]
+        bias = float(roots.mean() if self.kind == "rf" else roots.sum() + self.base_margin)
+        out = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        block = max(1, _BLOCK_CELLS // max(self.n_trees, 1))
+        for start in range(0, n_rows, block):
+            X_block = X[start:start + block]
+            rows = np.arange(X_block.shape[0], dtype=np.int64)[np.newaxis, :]
+            cells = np.zeros(X_block.shape[0] * self.n_features, dtype=np.float64)
+            for parent, child in self._walk(X_block):
+                # Leaves step to themselves, so finished paths add zero
+                delta = np.take(self.value, child) - np.take(self.value, parent)
+                cells += np.bincount((rows * self.n_features + np.take(self.feature, parent)).ravel(),
+                                     weights=delta.ravel(), minlength=len(cells))
+            out[start:start + block] = cells.reshape(-1, self.n_features) * scale
+        return bias, out
+
+    def predict_margin(self, X):
+        """Raw ensemble output: mean leaf probability (rf) or summed margin (xgb)"""
+        leaf_values = self.value[self.apply(X)]
+        if self.kind == "rf":
+            return leaf_values.mean(axis=0)
+        return leaf_values.sum(axis=0) + self.base_margin
+
+    def predict_proba(self, X):
+        """Class-1 probability for every row of the preprocessed matrix ``X``"""
+        margin = self.predict_margin(X)
+        if self.kind == "rf":
+            return margin
+        return 1.0 / (1.0 + np.exp(-margin))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a tree ensemble to flat arrays")
+    parser.add_argument("model", help="Saved pipeline or classifier (.pkl)")
+    parser.add_argument("output", help="Output directory")
+    args = parser.parse_args()
+
+    import joblib
+
+    forest = FlatForest.from_model(joblib.load(args.model))
+    forest.save(args.output)
+    size = sum((Path(args.output) / f"{name}.npy").stat().st_size for name in ARRAYS)
+    print(f"✓ Exported {forest.n_trees} trees / {forest.n_nodes:,} nodes "
+          f"({size / 1e6:.1f} MB) to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()